@@ -0,0 +1,72 @@
+"""
+Compares AsyncDownloader.download_bulk with the thread pool of DownloaderTool.download_bulk on many small files.
+Both download the same files from a local server, the server runs in this process so its CPU time is included.
+Run it from the repository root:
+
+    python -m benchmarks.async_vs_threads --files 2000 --size 65536 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from benchmarks.local_server import LocalServer
+from mizue.network.downloader import AsyncDownloader, DownloaderTool, DownloadEventType
+from mizue.util import Utility
+
+
+def run_async(urls, output, concurrency) -> int:
+    downloader = AsyncDownloader()
+    downloader.max_concurrency = concurrency
+    downloader.resumable = False
+    completed = []
+    downloader.add_event(DownloadEventType.COMPLETED, completed.append)
+    asyncio.run(downloader.download_bulk(urls, output))
+    return len(completed)
+
+
+def run_threads(urls, output, concurrency) -> int:
+    tool = DownloaderTool()
+    tool.display_report = False
+    tool.max_connections = concurrency
+    with ExitStack() as stack:
+        if os.name != "nt": # The cursor is toggled through the Windows console API
+            stack.enter_context(mock.patch.object(Utility, "hide_cursor"))
+            stack.enter_context(mock.patch.object(Utility, "show_cursor"))
+        tool.download_bulk(urls, output, parallel=concurrency)
+    return tool._success_count
+
+
+def measure(name, runner, urls, concurrency) -> str:
+    output = tempfile.mkdtemp(prefix="mizue-bench-")
+    try:
+        wall, cpu = time.perf_counter(), time.process_time()
+        completed = runner(urls, output, concurrency)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    return (f"{name:<8} {completed:>6}/{len(urls)} files {wall:8.2f} s wall {cpu:8.2f} s CPU "
+          f"{len(urls) / wall:9.1f} files/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per file")
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    with LocalServer() as server:
+        urls = [server.url(args.size, f"file-{i}.bin") for i in range(args.files)]
+        # Printed at the end, the progress bar of DownloaderTool would overwrite them otherwise
+        results = [measure("async", run_async, urls, args.concurrency),
+                   measure("threads", run_threads, urls, args.concurrency)]
+    print(os.linesep + os.linesep.join(results))
+
+
+if __name__ == "__main__":
+    main()
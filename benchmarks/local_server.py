@@ -0,0 +1,83 @@
+"""Range-capable HTTP server on 127.0.0.1 shared by the benchmarks, so they measure the client and not the network."""
+import multiprocessing
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves /<size>/<name> as <size> bytes of a repeating pattern, honouring Range requests."""
+
+    protocol_version = "HTTP/1.1"
+    block = bytes(range(256)) * 4096 # 1 MB written per send call
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        size = int(self.path.split("/")[1])
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("ETag", f'"{size}"')
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        remaining = size - start
+        view = memoryview(self.block)
+        while remaining > 0:
+            n = min(remaining, len(view))
+            self.wfile.write(view[:n])
+            remaining -= n
+
+
+def _create_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    return server
+
+
+def _serve(connection):
+    server = _create_server()
+    connection.send(server.server_port)
+    server.serve_forever()
+
+
+class LocalServer:
+    """
+    Runs the server on a background thread, or in a child process when separate_process is set,
+    which keeps its CPU time out of the measurements of the benchmark process.
+    """
+
+    def __init__(self, separate_process: bool = False):
+        self._port = 0
+        self._process: Optional[multiprocessing.Process] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._separate_process = separate_process
+
+    def __enter__(self) -> "LocalServer":
+        if self._separate_process:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            self._process = multiprocessing.Process(target=_serve, args=(sender,), daemon=True)
+            self._process.start()
+            self._port = receiver.recv()
+        else:
+            self._server = _create_server()
+            self._port = self._server.server_port
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+        else:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def url(self, size: int, name: str) -> str:
+        return f"http://127.0.0.1:{self._port}/{size}/{name}"
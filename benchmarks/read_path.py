@@ -0,0 +1,55 @@
+"""
+Compares the CPU cost of the two read paths of Downloader: readinto a reused buffer (reuse_read_buffer=True)
+and requests' iter_content, which allocates a new bytes object for every chunk.
+The server runs in a child process, so only the client's CPU time is counted. Run it from the repository root:
+
+    python -m benchmarks.read_path --size-mb 1024 --repeat 3
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from benchmarks.local_server import LocalServer
+from mizue.network.downloader import Downloader, DownloadEventType
+
+
+def measure(url: str, output: str, reuse_read_buffer: bool, chunk_size: int) -> float:
+    """Downloads the file once and returns the CPU seconds it took."""
+    downloader = Downloader()
+    downloader.chunk_size = chunk_size
+    downloader.force_download = True
+    downloader.resumable = False
+    downloader.reuse_read_buffer = reuse_read_buffer
+    failures = []
+    downloader.add_event(DownloadEventType.FAILED, failures.append)
+    cpu = time.process_time()
+    downloader.download(url, output)
+    cpu = time.process_time() - cpu
+    if failures:
+        raise RuntimeError(f"Download failed: {failures[0].reason}")
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    output = tempfile.mkdtemp(prefix="mizue-bench-")
+    try:
+        with LocalServer(separate_process=True) as server:
+            url = server.url(size, "read-path.bin")
+            for name, reuse_read_buffer in (("readinto", True), ("iter_content", False)):
+                # The best run is reported, the others include noise from the rest of the system
+                cpu = min(measure(url, output, reuse_read_buffer, args.chunk_kb * 1024) for _ in range(args.repeat))
+                print(f"{name:<13} {cpu / (size / 1024 ** 3):7.3f} CPU s/GB")
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
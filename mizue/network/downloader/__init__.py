@@ -1,14 +1,81 @@
+from .async_downloader import AsyncDownloader
+from .bandwidth_limiter import BandwidthLimiter, TokenBucket
+from .cancellation_token import CancellationToken, DownloadCancelledError
+from .checksum import ChecksumMismatchError
+from .concurrency_controller import ConcurrencyController, ConcurrencySample
+from .connection_pool import ConnectionPool
+from .directory_index import DirectoryIndex, IndexedFile
 from .download_event import DownloadEventType, ProgressEventArgs, DownloadStartEvent, DownloadFailureEvent, \
     DownloadCompleteEvent
+from .download_pipeline import DownloadPipeline, StageStatistics
+from .download_job_store import DownloadJobStore
+from .download_record_writer import DownloadRecord, DownloadRecordWriter
+from .download_scheduler import DownloadScheduler
+from .download_shard import DownloadShard, DownloadShardRecord, DownloadShardResult
+from .download_shard_queue import DownloadShardQueue
+from .download_statistics import DownloadStatistics
+from .download_task import DownloadTask
+from .download_task_reader import DownloadTaskReader
 from .downloader import Downloader
+from .durability_policy import DurabilityPolicy
+from .hedge_policy import HedgePolicy
+from .memory_budget import MemoryBudget
+from .mirror_ranking import MirrorRanking
+from .processing_stage import ProcessingStage
+from .progress_policy import ProgressPolicy
+from .scheduling_policy import SchedulingPolicy
+from .sync_mode import SyncMode
+from .task_state import TaskState
+from .timeout_policy import TimeoutPolicy
+from .transfer_watchdog import TransferTimeoutError, TransferWatchdog
 from .downloader_tool import DownloaderTool
+from .retry_policy import RetryPolicy
+from .write_behind_writer import WriteBehindWriter
 
 __all__ = [
+    'AsyncDownloader',
+    'BandwidthLimiter',
+    'CancellationToken',
+    'ChecksumMismatchError',
+    'ConcurrencyController',
+    'ConcurrencySample',
+    'ConnectionPool',
+    'DirectoryIndex',
     'DownloadEventType',
     'ProgressEventArgs',
     'DownloadStartEvent',
     'DownloadFailureEvent',
     'DownloadCompleteEvent',
+    'DownloadCancelledError',
+    'DownloadJobStore',
+    'DownloadPipeline',
+    'DownloadRecord',
+    'DownloadRecordWriter',
+    'DownloadScheduler',
+    'DownloadShard',
+    'DownloadShardQueue',
+    'DownloadShardRecord',
+    'DownloadShardResult',
+    'DownloadStatistics',
+    'DownloadTask',
+    'DownloadTaskReader',
     'Downloader',
-    'DownloaderTool'
+    'DownloaderTool',
+    'DurabilityPolicy',
+    'HedgePolicy',
+    'IndexedFile',
+    'MemoryBudget',
+    'MirrorRanking',
+    'ProcessingStage',
+    'ProgressPolicy',
+    'RetryPolicy',
+    'SchedulingPolicy',
+    'StageStatistics',
+    'SyncMode',
+    'TaskState',
+    'TimeoutPolicy',
+    'TokenBucket',
+    'TransferTimeoutError',
+    'TransferWatchdog',
+    'WriteBehindWriter'
 ]
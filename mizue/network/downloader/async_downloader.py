@@ -0,0 +1,294 @@
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is only needed for the asyncio engine
+    aiohttp = None
+
+from mizue.util import EventListener
+from .download_event import (DownloadEventType, DownloadFailureEvent,
+                             DownloadCompleteEvent, DownloadStartEvent,
+                             ProgressEventArgs, DownloadSkipEvent)
+from .download_metadata import DownloadMetadata
+from .downloader import Downloader
+from .progress_policy import ProgressPolicy
+from .resume_journal import ResumeJournal
+from .retry_policy import RetryPolicy
+
+
+class AsyncDownloader(EventListener):
+    """
+    Downloads files on a single asyncio event loop and fires the same events as Downloader.
+    Suited for thousands of concurrent transfers where one thread per socket is too expensive.
+    Requires the optional aiohttp package.
+    Interrupted downloads continue from their .part file like Downloader's, but this engine is deliberately
+    minimal otherwise: it has no manifest, expected hashes, mirrors or segmented downloads, and writes on the
+    loop thread, which suits local disks rather than slow network storage.
+    """
+
+    def __init__(self):
+        super().__init__()
+        if aiohttp is None:
+            raise ImportError("AsyncDownloader requires the 'aiohttp' package. Install it with 'pip install aiohttp'.")
+        self._alive = True
+
+        self.chunk_size: int = 1024 * 64
+        """Chunk size for downloading file content"""
+
+        self.force_download: bool = False
+        """Whether to force the download even if the file already exists"""
+
+        self.journal_interval: int = 1024 * 1024
+        """Number of bytes written between two updates of the resume journal"""
+
+        self.max_concurrency: int = 100
+        """Maximum number of transfers in flight at the same time"""
+
+        self.output_path: str = "."
+        """Default output path if not specified in download method"""
+
+        self.pool_size_per_host: int = 0
+        """Maximum number of connections to a single host (0 means only max_concurrency applies)"""
+
+        self.progress_policy: ProgressPolicy = ProgressPolicy()
+        """How often PROGRESS events are fired for a download"""
+
+        self.resumable: bool = True
+        """Whether to keep a resume journal next to the .part file so interrupted downloads can continue"""
+
+        self.retry_policy: RetryPolicy = RetryPolicy()
+        """Backoff, retryable status codes and deadline used for failed requests"""
+
+        self.timeout: int = 10
+        """The timeout in seconds for connecting and for each read"""
+
+        self.user_agent: str = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                                'AppleWebKit/537.36 (KHTML, like Gecko) '
+                                'Chrome/91.0.4472.124 Safari/537.36')
+        """User agent string to use for requests"""
+
+    def close(self):
+        """Signals the downloader to stop any ongoing downloads at their next chunk."""
+        self._alive = False
+
+    def open(self):
+        """Resets the downloader's alive status, allowing new downloads if it was previously closed."""
+        self._alive = True
+
+    async def download(self, url: str, output_path: Optional[str] = None):
+        """
+        Downloads a single file from a URL.
+
+        Args:
+            url: The URL to download from.
+            output_path: The directory to save the file in. If None, uses self.output_path.
+        """
+        async with self._create_session() as session:
+            await self._download(session, url, output_path or self.output_path or ".")
+
+    async def download_bulk(self, urls: Union[Iterable[str], Iterable[Tuple[str, str]]],
+                            output_path: Optional[str] = None):
+        """
+        Downloads many files concurrently, keeping at most max_concurrency transfers in flight.
+
+        Args:
+            urls: URLs, or (url, output_path) tuples.
+            output_path: The common output directory for plain URLs. If None, uses self.output_path.
+        """
+        tasks = iter(urls)
+        default_path = output_path or self.output_path or "."
+
+        async def worker():
+            # Workers pull from the shared iterator, so no coroutine exists for URLs that haven't started yet
+            for task in tasks:
+                if not self._alive:
+                    return
+                url, path = task if isinstance(task, tuple) else (task, default_path)
+                await self._download(session, url, path)
+
+        async with self._create_session() as session:
+            await asyncio.gather(*(worker() for _ in range(max(self.max_concurrency, 1))))
+
+    def _create_session(self) -> "aiohttp.ClientSession":
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.pool_size_per_host)
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'User-Agent': self.user_agent})
+
+    async def _download(self, session: "aiohttp.ClientSession", url: str, output_path: str):
+        if not self._alive:
+            self._fire_failure_event(url, None, Exception("Download cancelled by user"))
+            return
+        try:
+            async with await self._get_response(session, url) as response:
+                response.raise_for_status()
+                metadata = Downloader._create_metadata(response.headers, str(response.url), output_path)
+                if os.path.exists(metadata.filepath) and not self.force_download:
+                    self._fire_event(DownloadEventType.SKIPPED, DownloadSkipEvent(
+                        url=metadata.url,
+                        filename=metadata.filename,
+                        filepath=metadata.filepath,
+                        reason="File already exists"
+                    ))
+                    return
+                os.makedirs(os.path.dirname(metadata.filepath), exist_ok=True)
+                journal = self._load_journal(response, metadata)
+                if journal is None:
+                    await self._download_content(response, metadata, self._create_journal(response, metadata))
+                    return
+            # The probe response is released at this point, the rest of the file is requested with a range
+            range_headers = {'Range': f'bytes={journal.committed}-', 'If-Range': journal.validator,
+                             'Accept-Encoding': 'identity'}
+            async with await self._get_response(session, url, range_headers) as response:
+                response.raise_for_status()
+                if response.status != 206:
+                    # The file changed since the journal was written and the server sent all of it again
+                    await self._download_content(response, metadata, self._create_journal(response, metadata))
+                else:
+                    await self._download_content(response, metadata, journal, journal.committed)
+        except aiohttp.ClientResponseError as e:
+            self._fire_failure_event(url, e.status, e, reason=e.message)
+        except Exception as e:
+            self._fire_failure_event(url, None, e)
+
+    async def _get_response(self, session: "aiohttp.ClientSession", url: str,
+                            headers: Optional[Dict[str, str]] = None) -> "aiohttp.ClientResponse":
+        """Initiates the request and retries connection errors, timeouts and retryable status codes."""
+        deadline = self.retry_policy.get_deadline()
+        attempt = 0
+        while True:
+            try:
+                response = await session.get(url, allow_redirects=True, headers=headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                delay = self.retry_policy.get_delay(attempt)
+                if not self._alive or not self.retry_policy.allows_retry(attempt, delay, deadline):
+                    raise
+            else:
+                if not self.retry_policy.is_retryable_status(response.status):
+                    return response
+                delay = self.retry_policy.get_delay(attempt, response.headers)
+                if not self._alive or not self.retry_policy.allows_retry(attempt, delay, deadline):
+                    return response
+                response.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _create_journal(self, response: "aiohttp.ClientResponse",
+                        metadata: DownloadMetadata) -> Optional[ResumeJournal]:
+        """Creates the resume journal for a fresh download, or None if the download can't be resumed later."""
+        if not self.resumable or not self._is_identity_encoded(response) or metadata.validator is None:
+            return None
+        journal = ResumeJournal(url=metadata.url, filesize=metadata.filesize,
+                                etag=metadata.etag, last_modified=metadata.last_modified)
+        journal.save(ResumeJournal.get_part_path(metadata.filepath))
+        return journal
+
+    def _load_journal(self, response: "aiohttp.ClientResponse",
+                      metadata: DownloadMetadata) -> Optional[ResumeJournal]:
+        """Loads the journal of an earlier attempt if its .part file can be continued, discarding stale ones."""
+        if not self.resumable:
+            return None
+        part_path = ResumeJournal.get_part_path(metadata.filepath)
+        journal = ResumeJournal.load(part_path)
+        if journal is None:
+            return None
+        usable = (journal.url == metadata.url and journal.filesize == metadata.filesize
+                  and journal.validator is not None and self._is_identity_encoded(response)
+                  and journal.etag == metadata.etag and journal.last_modified == metadata.last_modified
+                  and journal.segments is None and os.path.exists(part_path))
+        if usable and journal.committed > 0:
+            journal.committed = min(journal.committed, os.path.getsize(part_path))
+            return journal
+        ResumeJournal.delete(part_path)
+        return None
+
+    async def _download_content(self, response: "aiohttp.ClientResponse", metadata: DownloadMetadata,
+                                journal: Optional[ResumeJournal], offset: int = 0):
+        """Writes the body into the .part file, keeping it with its journal on failure so it can be continued."""
+        self._fire_event(DownloadEventType.STARTED, DownloadStartEvent(
+            url=metadata.url,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize,
+        ))
+
+        part_path = ResumeJournal.get_part_path(metadata.filepath)
+        downloaded = offset
+        last_progress_bytes = offset
+        last_progress_time = time.monotonic()
+        try:
+            # Writes go to the page cache and return quickly, so they stay on the loop thread
+            with open(part_path, 'r+b' if offset > 0 else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    if not self._alive:
+                        raise Exception("Download cancelled")
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if journal is not None and downloaded - journal.committed >= self.journal_interval:
+                        f.flush()
+                        journal.committed = downloaded
+                        journal.save(part_path)
+                    now = time.monotonic()
+                    if self.progress_policy.is_due(now - last_progress_time, downloaded - last_progress_bytes):
+                        self._fire_progress_event(metadata, downloaded)
+                        last_progress_bytes = downloaded
+                        last_progress_time = now
+            os.replace(part_path, metadata.filepath)
+            ResumeJournal.delete(part_path)
+        except Exception as e:
+            self._abort_partial_file(part_path, journal, downloaded)
+            self._fire_failure_event(metadata.url, response.status, e, filepath=metadata.filepath)
+            return
+
+        self._fire_progress_event(metadata, downloaded, 100)
+        self._fire_event(DownloadEventType.COMPLETED, DownloadCompleteEvent(
+            url=metadata.url,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize,
+            etag=metadata.etag,
+            last_modified=metadata.last_modified,
+        ))
+
+    @staticmethod
+    def _abort_partial_file(part_path: str, journal: Optional[ResumeJournal], downloaded: int):
+        """Keeps the .part file for a later resume if it has a journal, otherwise removes it."""
+        try:
+            if journal is not None:
+                # The file is closed at this point, so every written byte is in it
+                journal.committed = downloaded
+                journal.save(part_path)
+            else:
+                os.remove(part_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_identity_encoded(response: "aiohttp.ClientResponse") -> bool:
+        return response.headers.get("Content-Encoding", "identity").lower() == "identity"
+
+    def _fire_failure_event(self, url: str, status_code: Optional[int], exception: Optional[BaseException],
+                            filepath: Optional[str] = None, reason: Optional[str] = None):
+        self._fire_event(DownloadEventType.FAILED, DownloadFailureEvent(
+            url=url,
+            status_code=status_code,
+            reason=reason or (str(exception) if exception else "Request Failed"),
+            exception=exception,
+            filepath=filepath,
+        ))
+
+    def _fire_progress_event(self, metadata: DownloadMetadata, downloaded: int, percent: Optional[int] = None):
+        if percent is None:
+            percent = min(int(downloaded * 100 / metadata.filesize), 100) if metadata.filesize > 0 else 0
+        self._fire_event(DownloadEventType.PROGRESS, ProgressEventArgs(
+            downloaded=downloaded,
+            percent=percent,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize,
+            url=metadata.url,
+        ))
@@ -0,0 +1,98 @@
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting a byte rate. A rate of None or 0 means unlimited."""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self._burst = burst
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = self._get_capacity()
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Bytes per second that may pass the bucket"""
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: Optional[float]):
+        with self._lock:
+            self._refill()
+            self._rate = value
+            self._tokens = min(self._tokens, self._get_capacity())
+
+    def consume(self, amount: int):
+        """Takes the given number of bytes from the bucket, sleeping until the rate allows them."""
+        with self._lock:
+            if not self._rate:
+                return
+            self._refill()
+            # Going into debt lets chunks larger than the burst pass while keeping the average rate
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+    def _get_capacity(self) -> float:
+        if self._burst is not None:
+            return self._burst
+        return self._rate or 0.0 # One second worth of bytes
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate:
+            self._tokens = min(self._get_capacity(), self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class BandwidthLimiter:
+    """Applies a global byte rate limit and optional per-host limits. Limits may be changed during a download."""
+
+    def __init__(self, global_rate: Optional[float] = None):
+        self._global_bucket = TokenBucket(global_rate)
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def global_rate(self) -> Optional[float]:
+        """Bytes per second shared by all downloads (None for unlimited)"""
+        return self._global_bucket.rate
+
+    @global_rate.setter
+    def global_rate(self, value: Optional[float]):
+        self._global_bucket.rate = value
+
+    @property
+    def host_rates(self) -> Dict[str, float]:
+        """Bytes per second allowed for each host with a limit"""
+        return {host: bucket.rate for host, bucket in list(self._host_buckets.items()) if bucket.rate}
+
+    def consume(self, host: str, amount: int):
+        """Blocks until both the host's and the global limit allow the given number of bytes."""
+        host_bucket = self._host_buckets.get(host)
+        if host_bucket is not None:
+            host_bucket.consume(amount)
+        self._global_bucket.consume(amount)
+
+    def get_host_rate(self, host: str) -> Optional[float]:
+        host_bucket = self._host_buckets.get(host)
+        return host_bucket.rate if host_bucket is not None else None
+
+    def set_host_rate(self, host: str, rate: Optional[float]):
+        """Sets the bytes per second allowed for a host (None removes the limit)."""
+        with self._lock:
+            if rate is None:
+                self._host_buckets.pop(host, None)
+            elif host in self._host_buckets:
+                self._host_buckets[host].rate = rate
+            else:
+                self._host_buckets[host] = TokenBucket(rate)
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        return urllib.parse.urlparse(url).netloc.lower()
@@ -0,0 +1,45 @@
+import threading
+from typing import Callable, List
+
+
+class DownloadCancelledError(Exception):
+    """Reported through the FAILED event of a download that was cancelled."""
+
+
+class CancellationToken:
+    """
+    Cancels a single download from any thread. Pass it to Downloader.download() before the download starts.
+    Cancelling shuts the connections of the download down, so a read blocked on a slow server returns at once
+    instead of after the read timeout. A token only cancels the downloads it was passed to.
+    """
+
+    def __init__(self):
+        self._callbacks: List[Callable[[], None]] = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Registers a function called on cancellation, right away if the token is already cancelled."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
@@ -0,0 +1,41 @@
+import hashlib
+from typing import Optional, Tuple
+
+
+class ChecksumMismatchError(Exception):
+    """Reported through the FAILED event when a downloaded file doesn't match its expected digest."""
+
+    def __init__(self, algorithm: str, expected: str, actual: str):
+        super().__init__(f"{algorithm} checksum mismatch: expected {expected}, got {actual}")
+        self.actual: str = actual
+        self.algorithm: str = algorithm
+        self.expected: str = expected
+
+
+class Checksum:
+    @staticmethod
+    def create_hasher(algorithm: str) -> "hashlib._Hash":
+        """Creates a hashlib object, raising ValueError for unknown algorithms."""
+        return hashlib.new(algorithm)
+
+    @staticmethod
+    def hash_file(hasher: "hashlib._Hash", filepath: str, length: Optional[int] = None,
+                  block_size: int = 1024 * 1024):
+        """Feeds the first length bytes of a file (the whole file if None) into the hasher."""
+        remaining = length
+        with open(filepath, 'rb') as f:
+            while remaining is None or remaining > 0:
+                block = f.read(block_size if remaining is None else min(block_size, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                if remaining is not None:
+                    remaining -= len(block)
+
+    @staticmethod
+    def split(expected_hash: str, default_algorithm: str) -> Tuple[str, str]:
+        """Splits 'algorithm:hexdigest' into its parts. A bare hexdigest uses the default algorithm."""
+        algorithm, separator, digest = expected_hash.partition(":")
+        if not separator:
+            return default_algorithm, expected_hash.strip().lower()
+        return algorithm.strip().lower(), digest.strip().lower()
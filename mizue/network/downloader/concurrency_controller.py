@@ -0,0 +1,186 @@
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass(frozen=True)
+class ConcurrencySample:
+    elapsed: float # Seconds since the controller was created
+    error_rate: float
+    limit: int # The limit chosen at the end of the window
+    reason: str # What the decision was based on, e.g. "increase", "plateau", "throttled", "errors" or "latency"
+    throughput: float # Bytes per second of the window
+    time_to_first_byte: Optional[float] # Median of the window
+
+
+class ConcurrencyController:
+    """
+    Tunes the number of downloads in flight with additive increase, multiplicative decrease (AIMD).
+    Like TCP, it starts by doubling the limit every interval until the first sign of saturation.
+    After that, every interval the limit grows by one while the aggregate throughput keeps rising, and shrinks by the
+    decrease factor on 429/503 responses, a high rate of server errors or a time to first byte well above the
+    best seen. Throttling and errors end the interval early, since failed requests return much faster than
+    downloads and would otherwise burn through the queue. The decisions are kept in history for inspection.
+    """
+
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 32, interval: float = 1.0,
+                 decrease: float = 0.5, max_error_rate: float = 0.1, latency_factor: float = 2.0,
+                 min_gain: float = 0.05, history_size: int = 3600):
+        self._best_first_byte: Optional[float] = None
+        self._condition = threading.Condition()
+        self._created = time.monotonic()
+        self._history: deque = deque(maxlen=history_size)
+        self._in_flight = 0
+        self._limit = max(min(initial, max_limit), min_limit)
+        self._previous_throughput: Optional[float] = None
+        self._reset_window(self._created)
+        self._slow_start = True
+
+        self.decrease: float = decrease
+        """Factor the limit is multiplied with when the servers push back"""
+
+        self.interval: float = interval
+        """Seconds of observations behind every decision"""
+
+        self.latency_factor: float = latency_factor
+        """How many times the best median time to first byte a window may reach before the limit shrinks"""
+
+        self.max_error_rate: float = max_error_rate
+        """Fraction of failed downloads in a window above which the limit shrinks"""
+
+        self.max_limit: int = max_limit
+        """Upper bound of the limit, also the number of worker threads of an auto bulk download"""
+
+        self.min_gain: float = min_gain
+        """Relative throughput gain over the previous window needed to grow the limit further"""
+
+        self.min_limit: int = min_limit
+        """Lower bound of the limit"""
+
+    @property
+    def history(self) -> List[ConcurrencySample]:
+        """The decisions made so far, oldest first"""
+        with self._condition:
+            return list(self._history)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of downloads currently holding a slot"""
+        return self._in_flight
+
+    @property
+    def limit(self) -> int:
+        """The current maximum number of downloads in flight"""
+        return self._limit
+
+    def acquire(self):
+        """Blocks until a download may start under the current limit."""
+        with self._condition:
+            while self._in_flight >= self._limit:
+                self._condition.wait(self.interval)
+                self._update_if_due()
+            self._in_flight += 1
+            self._window_peak = max(self._window_peak, self._in_flight)
+
+    def record_bytes(self, amount: int):
+        with self._condition:
+            self._window_bytes += amount
+            self._update_if_due()
+
+    def record_first_byte(self, seconds: float):
+        """Adds the time a download waited for its response headers."""
+        with self._condition:
+            self._window_first_bytes.append(seconds)
+
+    def record_result(self, success: bool, status_code: Optional[int] = None):
+        """
+        Adds the outcome of a finished download, before its slot is released. 429 and 503 count as throttling,
+        other client errors (e.g. 404) are not caused by the load and only count as results.
+        """
+        with self._condition:
+            if success or (status_code is not None and 400 <= status_code < 500 and status_code != 429):
+                self._window_successes += 1
+                self._update_if_due()
+                return
+            if self._in_flight > self._limit:
+                return # Started before the last decrease, so it says nothing about the current limit
+            self._window_failures += 1
+            if status_code in (429, 503):
+                self._window_throttled += 1
+            now = time.monotonic()
+            if self._decide_on_failures() is not None:
+                self._update(now)
+            else:
+                self._update_if_due()
+
+    def release(self):
+        """Frees the slot of a finished download."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def _decide(self, throughput: float, first_byte: Optional[float]) -> str:
+        reason = self._decide_on_failures()
+        if reason is not None:
+            return reason
+        if first_byte is not None and self._best_first_byte is not None and \
+                first_byte > self._best_first_byte * self.latency_factor:
+            return "latency"
+        if self._window_peak < self._limit:
+            return "idle" # The limit wasn't reached, so it didn't hold the throughput back
+        if self._previous_throughput is None or throughput >= self._previous_throughput * (1 + self.min_gain):
+            return "increase"
+        return "plateau"
+
+    def _decide_on_failures(self) -> Optional[str]:
+        if self._window_throttled > 0:
+            return "throttled"
+        results = self._window_successes + self._window_failures
+        if self._window_failures > 1 and self._window_failures / results > self.max_error_rate:
+            return "errors"
+        return None
+
+    def _reset_window(self, now: float):
+        self._window_bytes = 0
+        self._window_failures = 0
+        self._window_first_bytes: List[float] = []
+        self._window_peak = self._in_flight
+        self._window_start = now
+        self._window_successes = 0
+        self._window_throttled = 0
+
+    def _update(self, now: float):
+        """Ends the window and adjusts the limit (condition must be held)."""
+        elapsed = max(now - self._window_start, 1e-9)
+        throughput = self._window_bytes / elapsed
+        results = self._window_successes + self._window_failures
+        error_rate = self._window_failures / results if results else 0.0
+        first_byte = statistics.median(self._window_first_bytes) if self._window_first_bytes else None
+
+        reason = self._decide(throughput, first_byte)
+        if reason == "increase":
+            self._limit = min(self._limit * 2 if self._slow_start else self._limit + 1, self.max_limit)
+            self._previous_throughput = throughput
+        elif reason in ("throttled", "errors", "latency"):
+            self._limit = max(int(self._limit * self.decrease), self.min_limit)
+            self._previous_throughput = None # Probe upwards again from the new limit
+            self._slow_start = False
+        elif reason == "plateau":
+            self._previous_throughput = throughput
+            self._slow_start = False
+        if first_byte is not None and reason != "latency":
+            self._best_first_byte = first_byte if self._best_first_byte is None else \
+                min(self._best_first_byte, first_byte)
+
+        self._history.append(ConcurrencySample(now - self._created, error_rate, self._limit, reason, throughput,
+                                               first_byte))
+        self._reset_window(now)
+        self._condition.notify_all()
+
+    def _update_if_due(self):
+        now = time.monotonic()
+        if now - self._window_start >= self.interval:
+            self._update(now)
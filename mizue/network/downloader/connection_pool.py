@@ -0,0 +1,153 @@
+import functools
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import EmptyPoolError
+
+
+class _HostSession:
+    def __init__(self, session: requests.Session):
+        self.in_use: int = 0
+        self.last_used: float = time.monotonic()
+        self.session: requests.Session = session
+
+
+class _PoolTimeoutMixin:
+    """Makes a blocking urllib3 pool wait at most pool_timeout seconds for a free connection."""
+
+    def __init__(self, *args, pool_timeout: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_timeout: Optional[float] = pool_timeout
+
+    def _get_conn(self, timeout: Optional[float] = None):
+        # requests never passes a pool timeout, so urllib3 would wait forever
+        return super()._get_conn(self.pool_timeout if timeout is None else timeout)
+
+
+class _HTTPConnectionPool(_PoolTimeoutMixin, urllib3.HTTPConnectionPool):
+    pass
+
+
+class _HTTPSConnectionPool(_PoolTimeoutMixin, urllib3.HTTPSConnectionPool):
+    pass
+
+
+class _BlockingAdapter(HTTPAdapter):
+    """Adapter with a hard connection limit per host, whose requests fail once they waited pool_timeout seconds."""
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["pool_timeout"]
+
+    def __init__(self, pool_maxsize: int, pool_timeout: Optional[float]):
+        self.pool_timeout: Optional[float] = pool_timeout
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(_HTTPConnectionPool, pool_timeout=self.pool_timeout),
+            "https": functools.partial(_HTTPSConnectionPool, pool_timeout=self.pool_timeout),
+        }
+
+    def send(self, request, **kwargs):
+        try:
+            return super().send(request, **kwargs)
+        except EmptyPoolError as e:
+            # Reported like other connection failures, so the retry policy applies
+            raise requests.exceptions.ConnectionError(e, request=request) from e
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive sessions, one per host, shared by all download threads."""
+
+    def __init__(self, pool_size_per_host: int = 10, idle_timeout: float = 60.0, max_connections: int = 100,
+                 pool_timeout: float = 60.0):
+        self._lock = threading.Lock()
+        self._max_connections = max_connections
+        self._sessions: Dict[str, _HostSession] = {}
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+        self.idle_timeout: float = idle_timeout
+        """Seconds a host session may stay unused before its connections are closed"""
+
+        self.pool_size_per_host: int = pool_size_per_host
+        """Maximum number of keep-alive connections kept open for a single host (applies to new host sessions)"""
+
+        self.pool_timeout: float = pool_timeout
+        """
+        Seconds a request waits for a free connection of its host before it fails with a ConnectionError,
+        so a connection that is never handed back can't block the downloads forever (applies to new host sessions)
+        """
+
+    @property
+    def max_connections(self) -> int:
+        """Maximum number of connections in use at the same time across all hosts"""
+        return self._max_connections
+
+    def close(self):
+        """Closes every pooled session and the connections they hold."""
+        with self._lock:
+            for host_session in self._sessions.values():
+                host_session.session.close()
+            self._sessions.clear()
+
+    @contextmanager
+    def connection(self, url: str) -> Iterator[requests.Session]:
+        """
+        Reserves a connection slot and yields the keep-alive session for the URL's host.
+        The slot is released when the context exits, so the response must be consumed inside it.
+
+        Args:
+            url: The URL that is about to be requested.
+        """
+        self._slots.acquire()
+        try:
+            host_session = self._checkout(url)
+            try:
+                yield host_session.session
+            finally:
+                self._checkin(host_session)
+        finally:
+            self._slots.release()
+
+    def _checkin(self, host_session: _HostSession):
+        with self._lock:
+            host_session.in_use -= 1
+            host_session.last_used = time.monotonic()
+
+    def _checkout(self, url: str) -> _HostSession:
+        key = self._get_host_key(url)
+        with self._lock:
+            self._evict_idle_sessions()
+            host_session = self._sessions.get(key)
+            if host_session is None:
+                host_session = _HostSession(self._create_session())
+                self._sessions[key] = host_session
+            host_session.in_use += 1
+            return host_session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        # Blocking makes pool_size_per_host a hard limit instead of opening throwaway connections
+        adapter = _BlockingAdapter(self.pool_size_per_host, self.pool_timeout)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _evict_idle_sessions(self):
+        """Closes sessions that have been idle longer than idle_timeout (lock must be held)."""
+        now = time.monotonic()
+        idle_keys = [key for key, host_session in self._sessions.items()
+                     if host_session.in_use == 0 and now - host_session.last_used > self.idle_timeout]
+        for key in idle_keys:
+            self._sessions.pop(key).session.close()
+
+    @staticmethod
+    def _get_host_key(url: str) -> str:
+        parsed_url = urllib.parse.urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
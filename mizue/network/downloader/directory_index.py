@@ -0,0 +1,117 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class IndexedFile:
+    size: int
+    mtime: float
+
+
+class DirectoryIndex:
+    """
+    In-memory index of the files in output directories, so checking whether a file exists costs a dictionary
+    lookup instead of a stat call, which matters for large directories on network filesystems.
+    Each directory is read with a single scandir pass the first time one of its files is looked up,
+    and the downloader adds every file it completes. Changes made by other programs afterwards aren't seen,
+    so create a new index (or call clear()) for each run.
+    """
+
+    def __init__(self):
+        self._directories: Dict[str, Dict[str, Optional[IndexedFile]]] = {}
+        self._lock = threading.Lock()
+        self._scan_locks: Dict[str, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._directories.values())
+
+    def add(self, filepath: str):
+        """Records a file that was written to an indexed directory."""
+        directory, name = self._split(filepath)
+        with self._lock:
+            entries = self._directories.get(directory)
+            if entries is None:
+                return # The directory is read when it's first looked up, which will include the file
+        stat = os.stat(filepath)
+        with self._lock:
+            entries[name] = IndexedFile(stat.st_size, stat.st_mtime)
+
+    def clear(self):
+        """Forgets every directory, so they are read again on their next lookup."""
+        with self._lock:
+            self._directories.clear()
+
+    def contains(self, filepath: str) -> bool:
+        directory, name = self._split(filepath)
+        entries = self._get_entries(directory)
+        with self._lock:
+            return name in entries
+
+    def get(self, filepath: str) -> Optional[IndexedFile]:
+        """Returns the size and modification time of an indexed file, or None if the file doesn't exist."""
+        directory, name = self._split(filepath)
+        entries = self._get_entries(directory)
+        with self._lock:
+            if name not in entries:
+                return None
+            indexed = entries[name]
+        if indexed is None:
+            # Only Windows returns the size and time with the directory listing, elsewhere they are read on demand
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                return None
+            indexed = IndexedFile(stat.st_size, stat.st_mtime)
+            with self._lock:
+                entries[name] = indexed
+        return indexed
+
+    def remove(self, filepath: str):
+        directory, name = self._split(filepath)
+        with self._lock:
+            entries = self._directories.get(directory)
+            if entries is not None:
+                entries.pop(name, None)
+
+    def _get_entries(self, directory: str) -> Dict[str, Optional[IndexedFile]]:
+        with self._lock:
+            entries = self._directories.get(directory)
+            if entries is not None:
+                return entries
+            scan_lock = self._scan_locks.setdefault(directory, threading.Lock())
+        # Only one thread reads a directory, the others wait for its result instead of reading it again
+        with scan_lock:
+            with self._lock:
+                entries = self._directories.get(directory)
+                if entries is not None:
+                    return entries
+            entries = self._scan(directory)
+            with self._lock:
+                self._directories[directory] = entries
+                self._scan_locks.pop(directory, None)
+            return entries
+
+    @staticmethod
+    def _scan(directory: str) -> Dict[str, Optional[IndexedFile]]:
+        entries = {}
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if not entry.is_file(): # Answered from the listing itself on most filesystems
+                        continue
+                    indexed = None
+                    if os.name == "nt":
+                        stat = entry.stat()
+                        indexed = IndexedFile(stat.st_size, stat.st_mtime)
+                    entries[os.path.normcase(entry.name)] = indexed
+        except (FileNotFoundError, NotADirectoryError):
+            pass # Downloads create the directory, so it starts out empty
+        return entries
+
+    @staticmethod
+    def _split(filepath: str) -> Tuple[str, str]:
+        directory, name = os.path.split(os.path.abspath(filepath))
+        return os.path.normcase(directory), os.path.normcase(name)
@@ -37,6 +37,9 @@ class ProgressEventArgs(DownloadBaseEvent):
 @dataclass(frozen=True)
 class DownloadCompleteEvent(DownloadBaseEvent):
     filesize: int
+    digest: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
 
 @dataclass(frozen=True)
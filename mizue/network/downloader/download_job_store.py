@@ -0,0 +1,175 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .download_task import DownloadTask
+from .task_state import TaskState
+
+
+class DownloadJobStore:
+    """
+    SQLite database recording the state of every task of bulk download jobs, so a job survives a crash.
+    Writes are queued and committed in batches, at most every commit_interval seconds or commit_batch_size writes,
+    so a crash loses only the last batch: those tasks are downloaded again (or skipped if the file exists).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            job_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            expected_hash TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            size INTEGER,
+            mirrors TEXT,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            etag TEXT,
+            last_modified TEXT,
+            error TEXT,
+            PRIMARY KEY (job_id, url, output_path)
+        );
+        CREATE INDEX IF NOT EXISTS tasks_state ON tasks (job_id, state);
+    """
+
+    _INSERT_TASK = ("INSERT OR IGNORE INTO tasks (job_id, url, output_path, expected_hash, priority, size, mirrors, "
+                    "state) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+    _START_TASK = ("UPDATE tasks SET state = ?, attempts = attempts + 1 "
+                   "WHERE job_id = ? AND url = ? AND output_path = ?")
+    _FINISH_TASK = ("UPDATE tasks SET state = ?, bytes = ?, etag = ?, last_modified = ?, error = ? "
+                    "WHERE job_id = ? AND url = ? AND output_path = ?")
+
+    def __init__(self, path: str, commit_batch_size: int = 1000, commit_interval: float = 1.0):
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL") # WAL stays consistent, only the last commits may be lost
+        self._connection.executescript(self._SCHEMA)
+        self._last_commit = time.monotonic()
+        self._lock = threading.RLock()
+        self._writes: List[Tuple[str, tuple]] = []
+
+        self.commit_batch_size: int = commit_batch_size
+        """Number of queued writes that triggers a commit"""
+
+        self.commit_interval: float = commit_interval
+        """Seconds after which queued writes are committed, even if the batch isn't full"""
+
+        self.path: str = path
+        """Path of the database file"""
+
+    def add_tasks(self, job_id: str, tasks: Iterable[DownloadTask]):
+        """Records tasks as pending. Tasks already in the job keep their state."""
+        with self._lock:
+            for task in tasks:
+                self._writes.append((self._INSERT_TASK, (job_id, task.url, task.output_path, task.expected_hash,
+                                                         task.priority, task.size,
+                                                         json.dumps(task.mirrors) if task.mirrors else None,
+                                                         TaskState.PENDING.value)))
+            self._flush_if_due()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._connection.close()
+
+    def create_job(self, job_id: Optional[str] = None) -> str:
+        """Creates a job (or keeps an existing one with the same id) and returns its id."""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._flush()
+            self._connection.execute("INSERT OR IGNORE INTO jobs (job_id, created_at) VALUES (?, ?)",
+                                     (job_id, time.time()))
+        return job_id
+
+    def flush(self):
+        """Commits all queued writes."""
+        with self._lock:
+            self._flush()
+
+    def get_counts(self, job_id: str) -> Dict[TaskState, int]:
+        """Returns the number of tasks in each state."""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute("SELECT state, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY state",
+                                            (job_id,)).fetchall()
+        counts = {state: 0 for state in TaskState}
+        counts.update({TaskState(state): count for state, count in rows})
+        return counts
+
+    def has_job(self, job_id: str) -> bool:
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def has_task(self, job_id: str, url: str, output_path: str) -> bool:
+        with self._lock:
+            self._flush()
+            return self._connection.execute("SELECT 1 FROM tasks WHERE job_id = ? AND url = ? AND output_path = ?",
+                                            (job_id, url, output_path)).fetchone() is not None
+
+    def iter_tasks(self, job_id: str, states: Iterable[TaskState], page_size: int = 1000) -> Iterator[DownloadTask]:
+        """Yields the tasks in the given states page by page, so a job of any size is never loaded at once."""
+        state_values = [state.value for state in states]
+        placeholders = ", ".join("?" * len(state_values))
+        query = (f"SELECT rowid, url, output_path, expected_hash, priority, size, mirrors FROM tasks "
+                 f"WHERE job_id = ? AND state IN ({placeholders}) AND rowid > ? ORDER BY rowid LIMIT ?")
+        last_rowid = 0
+        while True:
+            with self._lock:
+                self._flush()
+                rows = self._connection.execute(query, (job_id, *state_values, last_rowid, page_size)).fetchall()
+            if not rows:
+                return
+            for rowid, url, output_path, expected_hash, priority, size, mirrors in rows:
+                last_rowid = rowid
+                yield DownloadTask(url, output_path, expected_hash, priority, size, json.loads(mirrors) if mirrors else [])
+
+    def mark_finished(self, job_id: str, task: DownloadTask, state: TaskState, size: int = 0,
+                      etag: Optional[str] = None, last_modified: Optional[str] = None, error: Optional[str] = None):
+        """Records the outcome of an attempt."""
+        with self._lock:
+            self._writes.append((self._FINISH_TASK, (state.value, size, etag, last_modified, error,
+                                                     job_id, task.url, task.output_path)))
+            self._flush_if_due()
+
+    def mark_in_flight(self, job_id: str, task: DownloadTask):
+        """Records that an attempt has started."""
+        with self._lock:
+            self._writes.append((self._START_TASK, (TaskState.IN_FLIGHT.value, job_id, task.url, task.output_path)))
+            self._flush_if_due()
+
+    def reset_tasks(self, job_id: str, states: Iterable[TaskState]) -> int:
+        """Moves the tasks in the given states back to pending and returns how many were moved."""
+        state_values = [state.value for state in states]
+        placeholders = ", ".join("?" * len(state_values))
+        with self._lock:
+            self._flush()
+            cursor = self._connection.execute(f"UPDATE tasks SET state = ? WHERE job_id = ? AND state IN ({placeholders})",
+                                              (TaskState.PENDING.value, job_id, *state_values))
+            return cursor.rowcount
+
+    def _flush(self):
+        if self._writes:
+            with self._connection: # One transaction for the whole batch
+                self._connection.execute("BEGIN")
+                start = 0
+                # Consecutive writes of the same statement go through a single executemany, keeping their order
+                for end in range(1, len(self._writes) + 1):
+                    if end == len(self._writes) or self._writes[end][0] != self._writes[start][0]:
+                        self._connection.executemany(self._writes[start][0],
+                                                     [params for _, params in self._writes[start:end]])
+                        start = end
+            self._writes.clear()
+        self._last_commit = time.monotonic()
+
+    def _flush_if_due(self):
+        if (len(self._writes) >= self.commit_batch_size or
+                time.monotonic() - self._last_commit >= self.commit_interval):
+            self._flush()
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, TextIO
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    filename: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class DownloadManifest:
+    """
+    Persistent record of the validators (ETag/Last-Modified) of every URL downloaded into a directory.
+    Updates are appended to a JSON lines log so a run over many files never rewrites the whole manifest,
+    and the log is compacted when it grows well beyond the number of entries.
+    """
+
+    FILENAME = ".mizue-manifest.jsonl"
+
+    def __init__(self, directory: str):
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self._log: Optional[TextIO] = None
+        self._log_lines = 0
+        self.path: str = os.path.join(directory, self.FILENAME)
+        self._load()
+
+    def close(self):
+        """Saves the manifest and closes its log file."""
+        with self._lock:
+            self._save()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def get(self, url: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.get(url)
+
+    def save(self):
+        """Flushes pending updates to disk, compacting the log if it is mostly superseded lines."""
+        with self._lock:
+            self._save()
+
+    def update(self, url: str, entry: ManifestEntry):
+        """Records the validators of a URL. Unchanged entries aren't written again."""
+        with self._lock:
+            if self._entries.get(url) == entry:
+                return
+            self._entries[url] = entry
+            if self._log is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._log = open(self.path, "a", encoding="utf-8")
+            self._log.write(json.dumps({"url": url, **asdict(entry)}) + "\n")
+            self._log_lines += 1
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        url = record.pop("url")
+                        self._entries[url] = ManifestEntry(**record)
+                    except (ValueError, TypeError, KeyError):
+                        continue # A line cut short by a crash only loses that single entry
+                    self._log_lines += 1
+        except FileNotFoundError:
+            pass
+
+    def _save(self):
+        if self._log is not None:
+            self._log.flush()
+        if self._log_lines <= 2 * len(self._entries):
+            return
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for url, entry in self._entries.items():
+                f.write(json.dumps({"url": url, **asdict(entry)}) + "\n")
+        os.replace(temp_path, self.path)
+        self._log_lines = len(self._entries)
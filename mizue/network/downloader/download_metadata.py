@@ -1,4 +1,12 @@
 from dataclasses import dataclass
+from typing import Optional
+
+
+def get_range_validator(etag: Optional[str], last_modified: Optional[str]) -> Optional[str]:
+    """Returns the value to send in If-Range. Weak ETags are not allowed there, so Last-Modified is used instead."""
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified
 
 
 @dataclass(frozen=True)
@@ -8,3 +16,11 @@ class DownloadMetadata:
     filesize: int
     url: str
     uuid: str
+    accepts_ranges: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def validator(self) -> Optional[str]:
+        """The value to send in If-Range, see get_range_validator"""
+        return get_range_validator(self.etag, self.last_modified)
@@ -0,0 +1,143 @@
+import concurrent.futures
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .processing_stage import ProcessingStage
+
+
+@dataclass(frozen=True)
+class StageStatistics:
+    name: str
+    failed: int
+    processed: int
+    seconds: float # Total time spent in the stage
+
+
+class DownloadPipeline:
+    """
+    Runs processing stages on completed downloads while the next files are still downloading.
+    Every stage has its own workers and a bounded queue in front of it, so a slow stage holds back the stage
+    before it and finally the downloads themselves instead of buffering an unbounded number of files.
+    """
+
+    def __init__(self, stages: Optional[List[ProcessingStage]] = None):
+        self._condition = threading.Condition()
+        self._errors: List[Tuple[str, str, str]] = []
+        self._executors: List[Optional[concurrent.futures.Executor]] = []
+        self._pending = 0 # Files submitted that haven't left the pipeline yet
+        self._queues: List[queue.Queue] = []
+        self._statistics: Dict[str, List] = {}
+        self._threads: List[threading.Thread] = []
+
+        self.max_errors: int = 100
+        """Number of failures kept for the report, later ones are only counted"""
+
+        self.stages: List[ProcessingStage] = list(stages or [])
+        """The stages every file goes through, in order. Add stages before the first file is submitted."""
+
+    @property
+    def pending_count(self) -> int:
+        """Number of files waiting for or going through the stages"""
+        return self._pending
+
+    def add_stage(self, stage: ProcessingStage) -> "DownloadPipeline":
+        if self._threads:
+            raise RuntimeError("Stages can't be added after the pipeline has started.")
+        self.stages.append(stage)
+        return self
+
+    def close(self):
+        """Waits for the submitted files and stops the stage workers. The pipeline restarts on the next submit."""
+        self.join()
+        with self._condition:
+            threads, self._threads = self._threads, []
+            executors, self._executors = self._executors, []
+            queues, self._queues = self._queues, []
+        for stage, stage_queue in zip(self.stages, queues):
+            for _ in range(max(stage.workers, 1)):
+                stage_queue.put(None)
+        for thread in threads:
+            thread.join()
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown()
+
+    def get_errors(self) -> List[Tuple[str, str, str]]:
+        """Returns (url, stage name, error) of the first max_errors failures."""
+        with self._condition:
+            return list(self._errors)
+
+    def get_statistics(self) -> List[StageStatistics]:
+        """Returns the counts and timings of every stage that has processed a file, in stage order."""
+        with self._condition:
+            return [StageStatistics(stage.name, *self._statistics[stage.name])
+                    for stage in self.stages if stage.name in self._statistics]
+
+    def join(self):
+        """Blocks until every submitted file has left the pipeline."""
+        with self._condition:
+            while self._pending > 0:
+                self._condition.wait()
+
+    def submit(self, filepath: str, url: Optional[str] = None):
+        """Hands a completed file to the first stage, waiting while its queue is full."""
+        if not self.stages:
+            return
+        self._start()
+        with self._condition:
+            self._pending += 1
+        self._queues[0].put((url or filepath, filepath))
+
+    def _run_stage(self, index: int):
+        stage = self.stages[index]
+        stage_queue = self._queues[index]
+        executor = self._executors[index]
+        while True:
+            item = stage_queue.get()
+            if item is None:
+                return
+            url, path = item
+            start_time = time.perf_counter()
+            error = None
+            try:
+                if executor is not None:
+                    output = executor.submit(stage.function, path).result()
+                else:
+                    output = stage.function(path)
+            except Exception as e:
+                output = None
+                error = e
+            elapsed = time.perf_counter() - start_time
+
+            with self._condition:
+                statistics = self._statistics.setdefault(stage.name, [0, 0, 0.0]) # failed, processed, seconds
+                statistics[1] += 1
+                statistics[2] += elapsed
+                if error is not None:
+                    statistics[0] += 1
+                    if len(self._errors) < self.max_errors:
+                        self._errors.append((url, stage.name, str(error) or type(error).__name__))
+            if output is not None and index + 1 < len(self.stages):
+                self._queues[index + 1].put((url, output)) # Waits while the next stage is full
+            else:
+                with self._condition:
+                    self._pending -= 1
+                    if self._pending == 0:
+                        self._condition.notify_all()
+
+    def _start(self):
+        with self._condition:
+            if self._threads:
+                return
+            self._queues = [queue.Queue(maxsize=max(stage.queue_size, 1)) for stage in self.stages]
+            self._executors = [concurrent.futures.ProcessPoolExecutor(max_workers=max(stage.workers, 1))
+                               if stage.use_processes else None for stage in self.stages]
+            for index, stage in enumerate(self.stages):
+                for worker in range(max(stage.workers, 1)):
+                    thread = threading.Thread(target=self._run_stage, args=(index,), daemon=True,
+                                              name=f"mizue-pipeline-{stage.name}-{worker}")
+                    thread.start()
+                    self._threads.append(thread)
@@ -0,0 +1,56 @@
+import csv
+import json
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import Optional, TextIO
+
+from .download_event import DownloadEventType
+
+
+@dataclass(frozen=True)
+class DownloadRecord:
+    duration: float
+    filename: str
+    reason: Optional[str]
+    size: int
+    status: DownloadEventType
+    status_code: Optional[int]
+    url: str
+
+
+class DownloadRecordWriter:
+    """
+    Streams one record per finished download to a file instead of keeping them in memory.
+    Paths ending in .csv are written as CSV, anything else as JSON lines.
+    """
+
+    def __init__(self, path: str):
+        self._csv_writer: Optional[csv.DictWriter] = None
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        self.path: str = path
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._csv_writer = None
+
+    def write(self, record: DownloadRecord):
+        row = asdict(record)
+        row["status"] = record.status.value
+        row["duration"] = round(record.duration, 3)
+        with self._lock:
+            if self._file is None:
+                self._open()
+            if self._csv_writer is not None:
+                self._csv_writer.writerow(row)
+            else:
+                self._file.write(json.dumps(row) + "\n")
+
+    def _open(self):
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        if self.path.lower().endswith(".csv"):
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=[field.name for field in fields(DownloadRecord)])
+            self._csv_writer.writeheader()
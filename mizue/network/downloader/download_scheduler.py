@@ -0,0 +1,212 @@
+import heapq
+import itertools
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .download_task import DownloadTask
+from .scheduling_policy import SchedulingPolicy
+
+
+class DownloadScheduler:
+    """
+    Hands bulk download tasks to worker threads while keeping every host under its in-flight limit.
+    When a host is at its limit, the next free worker takes a task of another host instead of waiting.
+    Tasks with a higher priority start first, ties are ordered by the scheduling policy.
+    With max_pending set, add() blocks while the queue is full, so inputs can be streamed in with backpressure.
+    """
+
+    def __init__(self, max_per_host: int = 0, policy: SchedulingPolicy = SchedulingPolicy.HOST_ROUND_ROBIN,
+                 max_pending: int = 0):
+        self._cancelled = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._entries: Dict[int, list] = {}
+        self._host_limits: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._pending: Dict[str, List[list]] = OrderedDict() # Heap of [sort key, push id, task] entries per host
+        self._push_ids = itertools.count()
+        self._pending_count = 0
+        self._sequence = itertools.count()
+
+        self.max_pending: int = max_pending
+        """Number of queued tasks after which add() blocks until workers take some (0 for no limit)"""
+
+        self.max_per_host: int = max_per_host
+        """Default maximum number of downloads in flight for a single host (0 for no limit)"""
+
+        self.max_requeues: int = 0
+        """Number of times requeue() puts the same task back"""
+
+        self.policy: SchedulingPolicy = policy
+        """Order of tasks with equal priority. Set it before adding tasks."""
+
+    @property
+    def pending_count(self) -> int:
+        """Number of tasks that have not been handed to a worker yet"""
+        return self._pending_count
+
+    def add(self, task: DownloadTask) -> bool:
+        """Queues a task for the workers, waiting for room if the queue is full. Returns False once cancelled."""
+        with self._condition:
+            while self.max_pending > 0 and self._pending_count >= self.max_pending and not self._cancelled:
+                self._condition.wait()
+            if self._cancelled:
+                return False
+            self._push(task, next(self._sequence))
+            self._pending_count += 1
+            self._condition.notify_all()
+            return True
+
+    def cancel(self):
+        """Drops every pending task and releases all waiting workers."""
+        with self._condition:
+            self._entries.clear()
+            self._pending.clear()
+            self._pending_count = 0
+            self._cancelled = True
+            self._closed = True
+            self._condition.notify_all()
+
+    def close(self):
+        """Marks that no more tasks will be added, so workers stop once the queue is empty."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def get(self) -> Optional[DownloadTask]:
+        """Blocks until a task whose host has a free slot is available. Returns None when no work is left."""
+        with self._condition:
+            while True:
+                task = self._pop_ready_task()
+                if task is not None:
+                    self._in_flight[task.host] += 1
+                    if self.max_pending > 0:
+                        self._condition.notify_all() # A producer may be waiting for room
+                    return task
+                if self._closed and self._pending_count == 0:
+                    return None
+                self._condition.wait()
+
+    def remove_url(self, url: str) -> int:
+        """Drops every queued task of a URL and returns how many were dropped."""
+        with self._condition:
+            entries = [entry for entry in self._entries.values() if entry[2].url == url]
+            for entry in entries:
+                del self._entries[id(entry[2])]
+                entry[2] = None # The stale heap entry is dropped when it reaches the top
+            self._pending_count -= len(entries)
+            self._condition.notify_all()
+            return len(entries)
+
+    def requeue(self, task: DownloadTask) -> bool:
+        """
+        Puts a handed out task back at the end of the queue. Unlike add() it never waits for room, since it is
+        called by the workers that empty the queue. Returns False once the task has been requeued max_requeues
+        times or the scheduler is cancelled.
+        """
+        with self._condition:
+            if self._cancelled or task.requeues >= self.max_requeues:
+                return False
+            task.requeues += 1
+            self._push(task, next(self._sequence))
+            self._pending_count += 1
+            self._condition.notify_all()
+            return True
+
+    def set_host_limit(self, host: str, limit: Optional[int]):
+        """Overrides max_per_host for one host (None restores the default). Takes effect immediately."""
+        with self._condition:
+            if limit is None:
+                self._host_limits.pop(host, None)
+            else:
+                self._host_limits[host] = limit
+            self._condition.notify_all()
+
+    def set_priority(self, task: DownloadTask, priority: int) -> bool:
+        """Changes the priority of a queued task. Returns False if the task has already been handed out."""
+        with self._condition:
+            entry = self._entries.get(id(task))
+            task.priority = priority
+            if entry is None:
+                return False
+            entry[2] = None # The stale heap entry is dropped when it reaches the top
+            self._push(task, entry[0][-1])
+            return True
+
+    def set_url_priority(self, url: str, priority: int) -> int:
+        """Changes the priority of every queued task of a URL and returns how many were changed."""
+        with self._condition:
+            tasks = [entry[2] for entry in self._entries.values() if entry[2].url == url]
+            for task in tasks:
+                self.set_priority(task, priority) # The condition is reentrant
+            return len(tasks)
+
+    def task_done(self, task: DownloadTask):
+        """Frees the host slot held by a finished task."""
+        with self._condition:
+            self._in_flight[task.host] -= 1
+            if self._in_flight[task.host] <= 0:
+                del self._in_flight[task.host]
+            self._condition.notify_all()
+
+    def _get_sort_key(self, task: DownloadTask, sequence: int) -> Tuple:
+        # The sequence number keeps the input order among equal keys and is never equal for two tasks
+        if self.policy == SchedulingPolicy.LARGEST_FIRST:
+            return -task.priority, -task.size if task.size is not None else 1, sequence
+        if self.policy == SchedulingPolicy.SHORTEST_FIRST:
+            return -task.priority, task.size if task.size is not None else math.inf, sequence
+        return -task.priority, sequence
+
+    def _has_free_slot(self, host: str) -> bool:
+        limit = self._host_limits.get(host, self.max_per_host)
+        return limit <= 0 or self._in_flight.get(host, 0) < limit
+
+    def _peek(self, host: str) -> Optional[list]:
+        """Returns the first live entry of a host, dropping stale ones and the host itself once it's empty."""
+        heap = self._pending[host]
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        if not heap:
+            del self._pending[host]
+            return None
+        return heap[0]
+
+    def _pop_ready_task(self) -> Optional[DownloadTask]:
+        """Takes the next task from a host with a free slot according to the policy (condition must be held)."""
+        best_host = None
+        best_entry = None
+        for host in list(self._pending):
+            if not self._has_free_slot(host):
+                continue
+            entry = self._peek(host)
+            if entry is None:
+                continue
+            if self.policy == SchedulingPolicy.HOST_ROUND_ROBIN:
+                # Rotate among the hosts whose next task has the highest priority, the first of them in order wins
+                if best_entry is None or entry[0][0] < best_entry[0][0]:
+                    best_host, best_entry = host, entry
+                continue
+            if best_entry is None or entry[0] < best_entry[0]:
+                best_host, best_entry = host, entry
+        if best_host is None:
+            return None
+
+        heap = self._pending.pop(best_host)
+        task = heapq.heappop(heap)[2]
+        if heap:
+            self._pending[best_host] = heap # Re-append so round-robin starts with another host next time
+        del self._entries[id(task)]
+        self._pending_count -= 1
+        return task
+
+    def _push(self, task: DownloadTask, sequence: int):
+        # The push id tells a re-queued entry apart from its stale copy with the same key
+        entry = [self._get_sort_key(task, sequence), next(self._push_ids), task]
+        self._entries[id(task)] = entry
+        heap = self._pending.get(task.host)
+        if heap is None:
+            heap = []
+            self._pending[task.host] = heap
+        heapq.heappush(heap, entry)
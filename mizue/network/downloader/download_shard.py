@@ -0,0 +1,278 @@
+import concurrent.futures
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from .bandwidth_limiter import BandwidthLimiter
+from .connection_pool import ConnectionPool
+from .download_event import (DownloadCompleteEvent, DownloadEventType, DownloadFailureEvent, DownloadSkipEvent,
+                             DownloadStartEvent, ProgressEventArgs)
+from .directory_index import DirectoryIndex
+from .download_scheduler import DownloadScheduler
+from .downloader import Downloader
+from .durability_policy import DurabilityPolicy
+from .hedge_policy import HedgePolicy
+from .progress_policy import ProgressPolicy
+from .scheduling_policy import SchedulingPolicy
+from .timeout_policy import TimeoutPolicy
+from .transfer_watchdog import TransferTimeoutError
+
+if TYPE_CHECKING:
+    from .downloader_tool import DownloaderTool
+
+
+def configure_downloader(downloader: Downloader, settings: Union["DownloaderTool", "DownloadShard"]):
+    """
+    Copies the download settings that DownloaderTool passes on to its shards, so single, bulk and sharded
+    downloads (and the downloader prefetching metadata) behave the same.
+    Bandwidth limits, the pipeline and the connection pool differ between them and are set by the callers.
+    """
+    downloader.durability_policy = settings.durability_policy
+    downloader.force_download = settings.force_download
+    downloader.hash_algorithm = settings.hash_algorithm
+    downloader.hedge_policy = settings.hedge_policy
+    downloader.progress_policy = settings.progress_policy
+    downloader.directory_index = DirectoryIndex() if settings.use_directory_index else None
+    downloader.segment_count = settings.segment_count
+    downloader.skip_known_files = settings.skip_known_files
+    downloader.staging_directory = settings.staging_directory
+    downloader.timeout_policy = settings.timeout_policy
+    downloader.use_manifest = settings.use_manifest
+    downloader.write_behind = settings.write_behind
+
+
+@dataclass(frozen=True)
+class DownloadShardRecord:
+    duration: float
+    etag: Optional[str]
+    filename: str
+    filesize: int
+    last_modified: Optional[str]
+    output_path: str
+    reason: Optional[str]
+    status: DownloadEventType
+    status_code: Optional[int]
+    url: str
+
+
+@dataclass(frozen=True)
+class DownloadShardResult:
+    shard_id: int
+    downloaded: int # Bytes received since the previous result
+    records: List[DownloadShardRecord] = field(default_factory=list)
+    finished: bool = False
+
+
+class DownloadShard:
+    """
+    One process of a sharded bulk download. It takes tasks from a queue shared by all shards, downloads them with
+    its own worker threads and sends the byte deltas and finished downloads back in batches, once per interval,
+    so the parent only handles a few messages per second no matter how many files are downloaded.
+    The shard is pickled into the child process, so it only holds plain settings.
+    """
+
+    def __init__(self, shard_id: int, parallel: int):
+        self.durability_policy: DurabilityPolicy = DurabilityPolicy()
+        """Whether downloaded files are synced to disk when they are renamed into place"""
+
+        self.force_download: bool = False
+        """Whether to download files even if they already exist"""
+
+        self.global_rate: Optional[float] = None
+        """This shard's part of the global byte rate limit"""
+
+        self.hash_algorithm: Optional[str] = None
+        """hashlib algorithm computed while downloading"""
+
+        self.hedge_policy: Optional[HedgePolicy] = None
+        """When a download with mirrors races a slow mirror against the next one"""
+
+        self.host_rates: Dict[str, float] = {}
+        """This shard's part of the per-host byte rate limits"""
+
+        self.max_connections: int = 100
+        """Upper limit of open connections of this shard"""
+
+        self.max_per_host: int = 0
+        """Maximum number of downloads of this shard in flight for a single host (0 for no limit)"""
+
+        self.max_requeues: int = 2
+        """Number of times a task whose transfer stalled is put back at the end of this shard's queue"""
+
+        self.parallel: int = parallel
+        """Number of worker threads"""
+
+        self.progress_policy: ProgressPolicy = ProgressPolicy()
+        """How often each download reports progress inside the shard"""
+
+        self.report_interval: float = 0.1
+        """Seconds between two results sent to the parent"""
+
+        self.scheduling_policy: SchedulingPolicy = SchedulingPolicy.HOST_ROUND_ROBIN
+        """Order in which the tasks taken by this shard start"""
+
+        self.segment_count: int = 1
+        """Number of concurrent byte-range connections per large file"""
+
+        self.skip_known_files: bool = False
+        """Whether downloads whose file is known without a request and exists are skipped before the request"""
+
+        self.staging_directory: Optional[str] = None
+        """Directory receiving running downloads before they are renamed into their output directory"""
+
+        self.shard_id: int = shard_id
+        """Index of the shard, sent with every result"""
+
+        self.timeout_policy: TimeoutPolicy = TimeoutPolicy()
+        """Timeouts and minimum throughput of every download"""
+
+        self.use_directory_index: bool = False
+        """Whether existence checks are answered from one scandir pass per output directory"""
+
+        self.use_manifest: bool = False
+        """Whether to keep a validator manifest in each output directory"""
+
+        self.write_behind: bool = False
+        """Whether files are written on background threads"""
+
+    def run(self, task_queue, result_queue):
+        """Downloads tasks from task_queue until it yields None, sending DownloadShardResult objects to result_queue."""
+        downloader = self._create_downloader()
+        # Only a few tasks per worker are taken ahead, so the other shards get the rest of the queue
+        scheduler = DownloadScheduler(self.max_per_host, self.scheduling_policy, self.parallel * 4)
+        scheduler.max_requeues = self.max_requeues
+        lock = threading.Lock()
+        state = _ShardState()
+        downloader.add_event(DownloadEventType.STARTED, lambda event: self._on_start(event, state, lock))
+        downloader.add_event(DownloadEventType.PROGRESS, lambda event: self._on_progress(event, state, lock))
+        downloader.add_event(DownloadEventType.COMPLETED, lambda event: self._on_complete(event, state, lock))
+        downloader.add_event(DownloadEventType.FAILED, lambda event: self._on_failure(event, state, lock, scheduler))
+        downloader.add_event(DownloadEventType.SKIPPED, lambda event: self._on_skip(event, state, lock))
+
+        feeder = threading.Thread(target=self._feed, args=(task_queue, scheduler), daemon=True)
+        feeder.start()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.parallel)
+        futures = [executor.submit(self._run_worker, downloader, scheduler, state, lock) for _ in range(self.parallel)]
+        try:
+            while not all(future.done() for future in futures):
+                concurrent.futures.wait(futures, timeout=self.report_interval)
+                self._send(result_queue, state, lock, False)
+        except KeyboardInterrupt:
+            scheduler.cancel()
+            downloader.close()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            downloader.connection_pool.close()
+            downloader.save_manifests()
+            downloader.durability_policy.flush()
+            self._send(result_queue, state, lock, True)
+
+    def _create_downloader(self) -> Downloader:
+        downloader = Downloader()
+        downloader.bandwidth_limiter = BandwidthLimiter(self.global_rate)
+        for host, rate in self.host_rates.items():
+            downloader.bandwidth_limiter.set_host_rate(host, rate)
+        configure_downloader(downloader, self)
+        pool_size = self.parallel * max(self.segment_count, 1)
+        downloader.connection_pool = ConnectionPool(pool_size_per_host=pool_size,
+                                                    max_connections=max(pool_size, self.max_connections))
+        return downloader
+
+    @staticmethod
+    def _feed(task_queue, scheduler: DownloadScheduler):
+        try:
+            while True:
+                task = task_queue.get()
+                if task is None or not scheduler.add(task):
+                    return
+        finally:
+            scheduler.close()
+
+    def _run_worker(self, downloader: Downloader, scheduler: DownloadScheduler, state: "_ShardState", lock: threading.Lock):
+        while True:
+            task = scheduler.get()
+            if task is None:
+                return
+            state.current.task = task # Events of the download are fired on this thread
+            try:
+                downloader.download(task.url, task.output_path, task.expected_hash, task.mirrors)
+            except Exception as exc:
+                # Downloader reports its own failures through events, so this is an unexpected error
+                with lock:
+                    self._add_record(state, task.url, task.url, 0, DownloadEventType.FAILED, str(exc))
+            finally:
+                state.current.task = None
+                scheduler.task_done(task)
+
+    def _send(self, result_queue, state: "_ShardState", lock: threading.Lock, finished: bool):
+        with lock:
+            downloaded, records = state.downloaded, state.records
+            state.downloaded, state.records = 0, []
+        if downloaded or records or finished:
+            result_queue.put(DownloadShardResult(self.shard_id, downloaded, records, finished))
+
+    @staticmethod
+    def _add_record(state: "_ShardState", url: str, filename: str, filesize: int, status: DownloadEventType,
+                    reason: Optional[str] = None, status_code: Optional[int] = None,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None):
+        # Lock must be held. Events name the URL that served the file (a mirror or a redirect target),
+        # records name the task's URL so the parent can match them with the job store.
+        start_time = state.start_times.pop(url, None)
+        state.progress.pop(url, None)
+        task = getattr(state.current, "task", None)
+        state.records.append(DownloadShardRecord(
+            duration=time.monotonic() - start_time if start_time is not None else 0.0,
+            etag=etag,
+            filename=filename,
+            filesize=filesize,
+            last_modified=last_modified,
+            output_path=task.output_path if task is not None else "",
+            reason=reason,
+            status=status,
+            status_code=status_code,
+            url=task.url if task is not None else url,
+        ))
+
+    @staticmethod
+    def _on_start(event: DownloadStartEvent, state: "_ShardState", lock: threading.Lock):
+        with lock:
+            state.start_times[event.url] = time.monotonic()
+
+    @staticmethod
+    def _on_progress(event: ProgressEventArgs, state: "_ShardState", lock: threading.Lock):
+        with lock:
+            state.downloaded += event.downloaded - state.progress.get(event.url, 0)
+            state.progress[event.url] = event.downloaded
+
+    def _on_complete(self, event: DownloadCompleteEvent, state: "_ShardState", lock: threading.Lock):
+        with lock:
+            self._add_record(state, event.url, event.filename, event.filesize, DownloadEventType.COMPLETED,
+                             etag=event.etag, last_modified=event.last_modified)
+
+    def _on_failure(self, event: DownloadFailureEvent, state: "_ShardState", lock: threading.Lock,
+                    scheduler: DownloadScheduler):
+        task = getattr(state.current, "task", None)
+        if isinstance(event.exception, TransferTimeoutError) and event.exception.stalled and task is not None \
+                and scheduler.requeue(task):
+            with lock:
+                state.start_times.pop(event.url, None) # The task is back in the queue and reports later
+            return
+        with lock:
+            self._add_record(state, event.url, event.filepath or event.url, 0, DownloadEventType.FAILED,
+                             event.reason, event.status_code)
+
+    def _on_skip(self, event: DownloadSkipEvent, state: "_ShardState", lock: threading.Lock):
+        with lock:
+            self._add_record(state, event.url, event.filename, 0, DownloadEventType.SKIPPED, event.reason)
+
+
+class _ShardState:
+    """Results of a shard collected between two sends (guarded by the shard's lock)."""
+
+    def __init__(self):
+        self.downloaded: int = 0
+        self.current = threading.local() # Task of each worker thread
+        self.progress: Dict[str, int] = {}
+        self.records: List[DownloadShardRecord] = []
+        self.start_times: Dict[str, float] = {}
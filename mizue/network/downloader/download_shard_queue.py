@@ -0,0 +1,37 @@
+import queue
+import threading
+from typing import Optional
+
+from .download_task import DownloadTask
+
+
+class DownloadShardQueue:
+    """The parent side of the task queue shared by the shards, used by the bulk feeder like a DownloadScheduler."""
+
+    def __init__(self, task_queue, shard_count: int):
+        self._cancelled = threading.Event()
+        self._shard_count = shard_count
+        self._task_queue = task_queue
+
+    def add(self, task: DownloadTask) -> bool:
+        """Queues a task, waiting for room if the queue is full. Returns False once cancelled."""
+        return self._put(task)
+
+    def cancel(self):
+        """Stops add() and close() from waiting for room. Tasks already queued are dropped with the shards."""
+        self._cancelled.set()
+
+    def close(self):
+        """Tells every shard that no more tasks will be added."""
+        for _ in range(self._shard_count):
+            if not self._put(None):
+                return
+
+    def _put(self, item: Optional[DownloadTask]) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._task_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import os
+import threading
+import urllib.parse
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .download_event import DownloadEventType
+from .download_record_writer import DownloadRecord
+
+
+class DownloadStatistics:
+    """
+    Aggregates finished downloads into counters, so a report over millions of files uses bounded memory.
+    Keeps counts and bytes per status, host and extension, the top_n slowest and largest files,
+    and failure reasons grouped by HTTP status code.
+    """
+
+    MAX_REASONS_PER_STATUS: int = 20
+    """Distinct failure reasons kept per status code, the rest are counted as 'Other'"""
+
+    def __init__(self, top_n: int = 10):
+        self._by_extension: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self._by_host: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self._by_status: Dict[DownloadEventType, List[int]] = defaultdict(lambda: [0, 0])
+        self._failures: Dict[Optional[int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._largest: List[Tuple[int, int, DownloadRecord]] = []
+        self._lock = threading.Lock()
+        self._sequence = itertools.count() # Breaks ties so records are never compared
+        self._slowest: List[Tuple[float, int, DownloadRecord]] = []
+        self.top_n: int = top_n
+        """Number of slowest and largest files that are kept"""
+
+    @property
+    def total_count(self) -> int:
+        """Number of downloads added so far"""
+        return sum(count for count, _ in self._by_status.values())
+
+    def add(self, record: DownloadRecord):
+        with self._lock:
+            host = urllib.parse.urlparse(record.url).netloc.lower()
+            extension = os.path.splitext(record.filename or urllib.parse.urlparse(record.url).path)[1][1:].lower()
+            for counter in (self._by_status[record.status], self._by_host[host], self._by_extension[extension]):
+                counter[0] += 1
+                counter[1] += record.size
+            if record.status == DownloadEventType.FAILED:
+                reasons = self._failures[record.status_code]
+                reason = record.reason or "Unknown"
+                if reason not in reasons and len(reasons) >= self.MAX_REASONS_PER_STATUS:
+                    reason = "Other"
+                reasons[reason] += 1
+            if record.status == DownloadEventType.COMPLETED and self.top_n > 0:
+                sequence = next(self._sequence)
+                self._push_top(self._slowest, (record.duration, sequence, record))
+                self._push_top(self._largest, (record.size, sequence, record))
+
+    def get_by_extension(self, limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """Returns (extension, count, bytes) sorted by bytes, then count."""
+        return self._get_sorted(self._by_extension, limit)
+
+    def get_by_host(self, limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """Returns (host, count, bytes) sorted by bytes, then count."""
+        return self._get_sorted(self._by_host, limit)
+
+    def get_by_status(self) -> Dict[DownloadEventType, Tuple[int, int]]:
+        """Returns (count, bytes) per status."""
+        with self._lock:
+            return {status: (count, size) for status, (count, size) in self._by_status.items()}
+
+    def get_failures(self) -> Dict[Optional[int], Dict[str, int]]:
+        """Returns the count of every failure reason, grouped by status code (None if there was no response)."""
+        with self._lock:
+            return {status_code: dict(reasons) for status_code, reasons in self._failures.items()}
+
+    def get_largest(self) -> List[DownloadRecord]:
+        with self._lock:
+            return [record for _, _, record in sorted(self._largest, reverse=True)]
+
+    def get_slowest(self) -> List[DownloadRecord]:
+        with self._lock:
+            return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def _get_sorted(self, counters: Dict[str, List[int]], limit: Optional[int]) -> List[Tuple[str, int, int]]:
+        with self._lock:
+            rows = [(key, count, size) for key, (count, size) in counters.items()]
+        rows.sort(key=lambda row: (row[2], row[1]), reverse=True)
+        return rows[:limit] if limit is not None else rows
+
+    def _push_top(self, heap: list, item: tuple):
+        # A min-heap of top_n items, so the smallest kept item is the one to replace
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
@@ -0,0 +1,19 @@
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class DownloadTask:
+    """A single entry of a bulk download."""
+    url: str
+    output_path: str
+    expected_hash: Optional[str] = None
+    priority: int = 0
+    size: Optional[int] = None
+    mirrors: List[str] = field(default_factory=list) # Other URLs serving the same file
+    requeues: int = 0 # Times the task was put back into the queue after its transfer stalled
+
+    @property
+    def host(self) -> str:
+        return urllib.parse.urlparse(self.url).netloc.lower()
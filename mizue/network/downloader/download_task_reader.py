@@ -0,0 +1,39 @@
+import json
+from typing import Iterator, Optional
+
+from .download_task import DownloadTask
+
+
+class DownloadTaskReader:
+    """Reads bulk download tasks from files one line at a time, so inputs of any size can be streamed."""
+
+    @staticmethod
+    def read_jsonl(path: str, output_path: Optional[str] = None, encoding: str = "utf-8") -> Iterator[DownloadTask]:
+        """
+        Yields a task per line of a JSON lines manifest. Every object needs a "url" and may have a "path"
+        (defaults to output_path), an "expected_hash", a "priority" and a list of "mirrors". Blank lines are ignored.
+        """
+        with open(path, "r", encoding=encoding) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    url = record["url"]
+                    task_path = record.get("path", output_path)
+                    mirrors = list(record.get("mirrors") or [])
+                except (ValueError, TypeError, KeyError) as e:
+                    raise ValueError(f"{path}:{line_number}: invalid manifest line ({e!r})") from e
+                if task_path is None:
+                    raise ValueError(f"{path}:{line_number}: no path given and no default output_path")
+                yield DownloadTask(url, task_path, record.get("expected_hash"), int(record.get("priority", 0)),
+                                   mirrors=mirrors)
+
+    @staticmethod
+    def read_url_file(path: str, output_path: str, encoding: str = "utf-8") -> Iterator[DownloadTask]:
+        """Yields a task per URL of a text file. Blank lines and lines starting with '#' are ignored."""
+        with open(path, "r", encoding=encoding) as f:
+            for line in f:
+                url = line.strip()
+                if url and not url.startswith("#"):
+                    yield DownloadTask(url, output_path)
@@ -1,27 +1,73 @@
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import http.client
 import os
 import re
+import threading
 import time
 import urllib.parse
 import uuid
-from typing import Callable, Optional
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
 import requests
 from pathvalidate import sanitize_filename
 
 from mizue.util import EventListener
+from .bandwidth_limiter import BandwidthLimiter
+from .cancellation_token import CancellationToken, DownloadCancelledError
+from .checksum import Checksum, ChecksumMismatchError
+from .connection_pool import ConnectionPool
+from .download_manifest import DownloadManifest, ManifestEntry
 from .download_event import (DownloadEventType, DownloadFailureEvent,
                              DownloadCompleteEvent, DownloadStartEvent,
                              ProgressEventArgs, DownloadSkipEvent)
+from .directory_index import DirectoryIndex
 from .download_metadata import DownloadMetadata
+from .download_pipeline import DownloadPipeline
+from .durability_policy import DurabilityPolicy
+from .hedge_policy import HedgePolicy
+from .memory_budget import MemoryBudget
+from .mirror_ranking import MirrorRanking
 from .progress_data import ProgressData
+from .progress_policy import ProgressPolicy
+from .resume_journal import ResumeJournal
+from .retry_policy import RetryPolicy
+from .timeout_policy import TimeoutPolicy
+from .transfer_watchdog import TransferTimeoutError, TransferWatchdog, WatchedTransfer
+from .write_behind_writer import WriteBehindWriter
 
 
 class Downloader(EventListener):
     """Handles downloading single files with progress events and retries."""
 
+    _STREAM_ERRORS = (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError,
+                      requests.exceptions.Timeout)
+    """Errors raised while reading a response body that are worth continuing from the last written byte"""
+
+    _MAX_NAME_LENGTH = 255
+    """Bytes allowed in a file name by common filesystems (NAME_MAX), staged names are kept within it"""
+
+    _RACE_POLL_INTERVAL = 0.1
+    """Seconds between two checks of the transfer while a mirror race waits for its requests"""
+
     def __init__(self):
         super().__init__()
         self._alive = True
+        self._watchdog = TransferWatchdog()
+        self._manifest_lock = threading.Lock()
+        self._manifests: Dict[str, DownloadManifest] = {}
+        self._metadata_cache: Dict[Tuple[str, str], DownloadMetadata] = {}
+
+        self.bandwidth_limiter: Optional[BandwidthLimiter] = None
+        """Global and per-host byte rate limits applied to every chunk (None for unlimited)"""
+
+        self.connection_pool: ConnectionPool = ConnectionPool()
+        """Keep-alive sessions shared by every download made through this instance"""
+
+        self.directory_index: Optional[DirectoryIndex] = None
+        """Answers the existence checks of skipped downloads from memory instead of a stat call per file"""
 
         self.force_download: bool = False
         """Whether to force the download even if the file already exists"""
@@ -29,29 +75,120 @@ class Downloader(EventListener):
         self.output_path: str = "."
         """Default output path if not specified in download method"""
 
-        self.retry_count: int = 3 # Reduced default, maybe 3 is enough?
-        """The number of times to retry the download on specific errors"""
+        self.hash_algorithm: Optional[str] = None
+        """hashlib algorithm (e.g. 'sha256', 'blake2b') computed while downloading, reported in COMPLETED"""
+
+        self.hedge_policy: Optional[HedgePolicy] = None
+        """When a download with mirrors starts a request to the next mirror while waiting for the first byte
+        (None to only fail over to the next mirror after an error)"""
+
+        self.mirror_ranking: MirrorRanking = MirrorRanking()
+        """Throughput observed per mirror host, the mirrors of a download are tried fastest first"""
+
+        self.journal_interval: int = 1024 * 1024
+        """Number of bytes written between two updates of the resume journal"""
+
+        self.use_manifest: bool = False
+        """Whether to remember ETag/Last-Modified per URL in the output directory and only re-download changed files"""
+
+        self.pipeline: Optional[DownloadPipeline] = None
+        """Processing stages that receive every completed file while the next downloads continue"""
+
+        self.progress_policy: ProgressPolicy = ProgressPolicy()
+        """How often PROGRESS events are fired for a download"""
 
-        self.retry_delay: float = 1.0 # Seconds to wait between retries
-        """Delay in seconds between retries"""
+        self.durability_policy: DurabilityPolicy = DurabilityPolicy()
+        """Whether completed files are synced to disk when they are renamed into place, one by one or in batches"""
+
+        self.resumable: bool = True
+        """Whether to keep a resume journal next to the .part file so interrupted downloads can continue"""
+
+        self.staging_directory: Optional[str] = None
+        """
+        Directory receiving the .part files of running downloads, which are renamed to their final path once
+        complete. It should be on the output's filesystem to keep the rename atomic (None keeps them next to the file)
+        """
+
+        self.retry_policy: RetryPolicy = RetryPolicy()
+        """Backoff, retryable status codes and deadline used for failed requests and broken transfers"""
 
         self.timeout: int = 10
-        """The timeout in seconds for the connection"""
+        """Default timeout in seconds for connecting and for each read, see timeout_policy"""
+
+        self.timeout_policy: TimeoutPolicy = TimeoutPolicy()
+        """Separate connect and read timeouts, the total timeout and the minimum throughput of a download"""
 
         self.chunk_size: int = 1024 * 8 # Increased default chunk size to 8KB
         """Chunk size for downloading file content"""
 
+        self.adaptive_chunk_size: bool = False
+        """Whether each download tunes its read size between chunk_size_min and chunk_size_max to its throughput"""
+
+        self.chunk_interval: float = 0.02
+        """Seconds of transfer a single read should cover when adaptive_chunk_size is enabled"""
+
+        self.chunk_size_max: int = 1024 * 1024 * 4
+        """Largest read size that adaptive chunk sizing may grow to"""
+
+        self.chunk_size_min: int = 1024 * 8
+        """Smallest read size that adaptive chunk sizing may shrink to"""
+
+        self.reuse_read_buffer: bool = True
+        """Whether identity-encoded bodies are read into one reused buffer instead of a new bytes object per chunk"""
+
+        self.segment_count: int = 1
+        """Number of concurrent byte-range connections used for a single file (1 disables segmented mode)"""
+
+        self.skip_known_files: bool = False
+        """
+        Whether a download is skipped without any request when the file its URL maps to already exists.
+        The filename comes from prefetched metadata, the manifest, or else the last segment of the URL path,
+        so only enable it for URLs whose path names the file. Manifest entries are then no longer revalidated.
+        """
+
+        self.segment_min_size: int = 1024 * 1024 * 16
+        """Files smaller than this are always downloaded over a single connection"""
+
+        self.write_behind: bool = False
+        """Whether file writes run on a background thread with preallocated files, for slow or network storage"""
+
+        self.write_behind_buffer: int = 1024 * 1024 * 8
+        """Maximum number of bytes a single download may have queued for its writer thread"""
+
+        self.write_behind_budget: MemoryBudget = MemoryBudget(1024 * 1024 * 64)
+        """Caps the bytes queued by all writer threads of this downloader. Share one instance for a wider cap."""
+
         self.user_agent: str = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
                                 'AppleWebKit/537.36 (KHTML, like Gecko) '
                                 'Chrome/91.0.4472.124 Safari/537.36') # Example modern UA
         """User agent string to use for requests"""
 
+    @property
+    def retry_count(self) -> int:
+        """The number of times to retry the download on specific errors (same as retry_policy.max_retries)"""
+        return self.retry_policy.max_retries
+
+    @retry_count.setter
+    def retry_count(self, value: int):
+        self.retry_policy.max_retries = value
+
+    @property
+    def retry_delay(self) -> float:
+        """Delay in seconds before the first retry (same as retry_policy.backoff_base)"""
+        return self.retry_policy.backoff_base
+
+    @retry_delay.setter
+    def retry_delay(self, value: float):
+        self.retry_policy.backoff_base = value
+
     def close(self):
         """
-        Signals the downloader to stop any ongoing downloads gracefully.
-        Downloads might take a moment to fully stop iterating chunks.
+        Stops all ongoing downloads and rejects new ones until open() is called.
+        The connections of running downloads are shut down, so downloads blocked in a read stop at once.
+        Use a CancellationToken to stop a single download instead.
         """
         self._alive = False
+        self._watchdog.abort_all(DownloadCancelledError("Download cancelled"))
 
     def open(self):
         """
@@ -60,13 +197,27 @@ class Downloader(EventListener):
         """
         self._alive = True
 
-    def download(self, url: str, output_path: Optional[str] = None):
+    def save_manifests(self):
+        """Writes pending manifest updates to disk. Call it after downloading with use_manifest enabled."""
+        with self._manifest_lock:
+            manifests = list(self._manifests.values())
+        for manifest in manifests:
+            manifest.save()
+
+    def download(self, url: str, output_path: Optional[str] = None, expected_hash: Optional[str] = None,
+                 mirrors: Optional[Sequence[str]] = None, cancel_token: Optional[CancellationToken] = None):
         """
         Downloads a file from a URL.
 
         Args:
             url: The URL to download from.
             output_path: The directory to save the file in. If None, uses self.output_path.
+            expected_hash: Hex digest the file must match, optionally prefixed with its algorithm
+                           ('sha256:...'). A bare digest uses hash_algorithm, or sha256 if that is None.
+            mirrors: Other URLs serving the same file. They are ranked with the url by mirror_ranking, failed
+                     mirrors fall over to the next one, and hedge_policy may race a slow one against the next.
+            cancel_token: Token that stops this download when cancelled from another thread. A cancelled download
+                          fires FAILED with a DownloadCancelledError and keeps its .part file for a later resume.
         """
         if not self._alive:
             print("Downloader is closed. Call open() before downloading.") # Or raise an error
@@ -76,26 +227,99 @@ class Downloader(EventListener):
         if not path_to_save: # Ensure path_to_save is never empty
              path_to_save = "."
 
+        deadline = self.retry_policy.get_deadline()
+        manifest = self._get_manifest(path_to_save) if self.use_manifest else None
+        manifest_entry = self._get_manifest_entry(manifest, url, path_to_save)
+        conditional_headers = self._get_conditional_headers(manifest_entry)
+        prefetched = self._metadata_cache.pop((url, path_to_save), None)
+        if prefetched is not None and manifest is None and not self.force_download \
+                and self._file_exists(prefetched.filepath):
+            # The prefetched headers already name the file, so no request is needed to skip it
+            self._fire_event(DownloadEventType.SKIPPED, DownloadSkipEvent(
+                url=prefetched.url,
+                filename=prefetched.filename,
+                filepath=prefetched.filepath,
+                reason="File already exists"
+            ))
+            return
+        known_filepath = self._get_known_filepath(url, path_to_save, manifest_entry)
+        if known_filepath is not None and self._file_exists(known_filepath):
+            self._fire_event(DownloadEventType.SKIPPED, DownloadSkipEvent(
+                url=url,
+                filename=os.path.basename(known_filepath),
+                filepath=known_filepath,
+                reason="File already exists"
+            ))
+            return
+        total_deadline = self.timeout_policy.get_deadline()
+        if total_deadline is not None:
+            deadline = total_deadline if deadline is None else min(deadline, total_deadline)
+        # Every download is watched, so close() and its token can abort it
+        transfer = self._watchdog.watch(total_deadline, self.timeout_policy.min_throughput,
+                                        self.timeout_policy.throughput_window)
+        cancel = functools.partial(transfer.abort, DownloadCancelledError("Download cancelled"))
+        if cancel_token is not None:
+            cancel_token.add_callback(cancel)
         try:
-            # Use response as context manager for automatic connection closing
-            with self._get_response(url) as response:
+            # Hold a pooled connection for the whole transfer so it returns to the pool afterwards
+            with self._open_response(url, mirrors, conditional_headers, deadline, transfer) as \
+                    (session, response, request_url):
+                transfer_start = time.monotonic()
+                if response.status_code == 304:
+                    self._fire_event(DownloadEventType.SKIPPED, DownloadSkipEvent(
+                        url=response.url,
+                        filename=manifest_entry.filename,
+                        filepath=os.path.join(path_to_save, manifest_entry.filename),
+                        reason="Not modified"
+                    ))
+                    return
+
                 # Check for HTTP errors immediately after getting response
                 response.raise_for_status() # Raises HTTPError for 4xx/5xx
 
                 metadata = self._get_download_metadata(response, path_to_save)
 
-                if not os.path.exists(metadata.filepath) or self.force_download:
-                    # Ensure output directory exists
-                    os.makedirs(os.path.dirname(metadata.filepath), exist_ok=True)
-                    self._download_content(response, metadata)
-                else:
+                # A 200 to a conditional request means the file changed, so the existing copy is replaced
+                if not self.force_download and not conditional_headers and self._file_exists(metadata.filepath):
+                    if manifest is not None:
+                        # Remember the validators so the next run can ask the server instead of trusting the file
+                        manifest.update(url, self._create_manifest_entry(metadata))
                     self._fire_event(DownloadEventType.SKIPPED, DownloadSkipEvent(
                         url=metadata.url,
                         filename=metadata.filename,
                         filepath=metadata.filepath,
                         reason="File already exists"
                     ))
+                    return
+
+                # Ensure output directory exists
+                os.makedirs(os.path.dirname(metadata.filepath), exist_ok=True)
+                if self.staging_directory is not None:
+                    os.makedirs(self.staging_directory, exist_ok=True)
+                journal = self._load_journal(response, metadata)
+                segmented = False
+                if journal is not None and journal.segments is None:
+                    response.close() # The full body isn't needed, the .part file is continued instead
+                    completed = self._resume_content(session, metadata, journal, deadline, expected_hash, transfer)
+                else:
+                    segmented = journal is not None or self._can_download_segmented(response, metadata)
+                    if not segmented:
+                        completed = self._download_content(session, response, metadata, deadline=deadline,
+                                                           expected_hash=expected_hash, transfer=transfer)
+
+            # The probe response is closed at this point, so the segments can use its connection slot
+            if segmented:
+                completed = self._download_segmented(metadata, journal, deadline, expected_hash, transfer)
+
+            if completed and manifest is not None:
+                manifest.update(url, self._create_manifest_entry(metadata))
+            if completed and mirrors:
+                # Recorded for the mirror that was requested, metadata.url may be the target of a redirect
+                self.mirror_ranking.record_transfer(request_url, metadata.filesize, time.monotonic() - transfer_start)
 
+        except (DownloadCancelledError, TransferTimeoutError) as e:
+            # Raised while waiting for the response
+            self._fire_failure_event(url, None, exception=e, reason=str(e))
         except requests.exceptions.HTTPError as e:
             # Handle HTTP errors (4xx, 5xx) specifically
             self._fire_failure_event(url, e.response, exception=e)
@@ -106,122 +330,799 @@ class Downloader(EventListener):
         except Exception as e:
              # Catch potential other errors (e.g., filesystem errors)
             self._fire_failure_event(url, None, exception=e)
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(cancel)
+            self._watchdog.unwatch(transfer)
 
 
-    def _get_response(self, url: str) -> requests.Response:
-        """Initiates the request, handles retries, and returns the response object."""
+    def fetch_metadata(self, url: str, output_path: Optional[str] = None, cache: bool = True) -> DownloadMetadata:
+        """
+        Resolves the filename, size and range support of a download without transferring its body.
+        Uses a HEAD request, or a GET that is closed after its headers if the server rejects HEAD or
+        leaves out Content-Length there. Unless cache is False, the result is kept for the next download()
+        of the url, so only cache metadata of downloads this instance is going to make.
+        """
+        path_to_save = output_path or self.output_path or "."
+        with self.connection_pool.connection(url) as session:
+            with self._get_response(session, url, method='HEAD') as response:
+                if response.ok and 'Content-Length' in response.headers:
+                    metadata = self._get_download_metadata(response, path_to_save)
+                else:
+                    metadata = None
+            if metadata is None:
+                with self._get_response(session, url) as response:
+                    response.raise_for_status()
+                    metadata = self._get_download_metadata(response, path_to_save)
+        if cache:
+            self._metadata_cache[(url, path_to_save)] = metadata
+        return metadata
+
+    def prefetch_metadata(self, tasks: Iterable[Tuple[str, str]], parallel: int = 16,
+                          cache: bool = True) -> Dict[Tuple[str, str], DownloadMetadata]:
+        """
+        Resolves the metadata of many (url, output_path) tasks concurrently with fetch_metadata.
+        Tasks whose metadata can't be resolved are left out, their download reports the error later.
+        """
+        def fetch(task: Tuple[str, str]) -> Tuple[Tuple[str, str], Optional[DownloadMetadata]]:
+            try:
+                return task, self.fetch_metadata(*task, cache=cache)
+            except Exception:
+                return task, None
+
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(parallel, 1)) as executor:
+            for task, metadata in executor.map(fetch, tasks):
+                if metadata is not None:
+                    results[task] = metadata
+        return results
+
+    @contextlib.contextmanager
+    def _open_response(self, url: str, mirrors: Optional[Sequence[str]], extra_headers: Optional[Dict[str, str]],
+                       deadline: Optional[float],
+                       transfer: Optional[WatchedTransfer] = None
+                       ) -> Iterator[Tuple[requests.Session, requests.Response, str]]:
+        """
+        Yields the session, the response and the requested URL: the given URL, or the mirror that answered first
+        when there are mirrors.
+        """
+        if not mirrors:
+            with self.connection_pool.connection(url) as session:
+                request_start = time.monotonic()
+                with self._get_response(session, url, extra_headers, deadline, transfer=transfer) as response:
+                    if self.hedge_policy is not None:
+                        self.hedge_policy.record(time.monotonic() - request_start)
+                    yield session, response, url
+            return
+        attempt = self._race_mirrors(self.mirror_ranking.rank([url, *mirrors]), extra_headers, deadline, transfer)
+        with attempt.stack:
+            yield attempt.session, attempt.response, attempt.url
+
+    def _race_mirrors(self, urls: List[str], extra_headers: Optional[Dict[str, str]], deadline: Optional[float],
+                      transfer: Optional[WatchedTransfer] = None) -> "_MirrorAttempt":
+        """
+        Requests the URLs in order until one responds without an error status. A request that fails starts the
+        next one right away, and with hedge_policy a request that is slow to respond starts the next one as well.
+        Only the last URL is retried according to retry_policy, the others fail over instead.
+        Requests that lose the race are closed as soon as their response arrives.
+        An aborted transfer ends the race within _RACE_POLL_INTERVAL, even while the requests wait for a connection
+        or for their headers.
+        """
+        max_running = max(self.hedge_policy.max_requests, 1) if self.hedge_policy is not None else 1
+        hedge_delay = self.hedge_policy.get_delay() if self.hedge_policy is not None else None
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(max_running, len(urls)))
+        running: Dict[concurrent.futures.Future, str] = {}
+        remaining = list(urls)
+        next_start = 0.0 # When the next mirror may be requested without a failure
+        fallback: Optional[_MirrorAttempt] = None # An error response, reported if no mirror does better
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                if transfer is not None:
+                    transfer.check()
+                now = time.monotonic()
+                can_start = remaining and len(running) < max_running
+                if can_start and (not running or now >= next_start):
+                    request_url = remaining.pop(0)
+                    running[executor.submit(self._request_mirror, request_url, extra_headers, deadline,
+                                            not remaining, transfer)] = request_url
+                    next_start = now + hedge_delay if hedge_delay is not None else float("inf")
+                    continue
+                if not running:
+                    break
+                timeout = max(next_start - now, 0.0) if can_start and hedge_delay is not None else None
+                if transfer is not None:
+                    # The requests can't be woken up in connect or while waiting for headers, so the race polls
+                    timeout = self._RACE_POLL_INTERVAL if timeout is None else min(timeout, self._RACE_POLL_INTERVAL)
+                done, _ = concurrent.futures.wait(running, timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    request_url = running.pop(future)
+                    try:
+                        attempt = future.result()
+                    except Exception as e:
+                        error = e
+                        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                            self.mirror_ranking.record_failure(request_url)
+                        next_start = now # Fail over without waiting for the hedge delay
+                        continue
+                    if attempt.response.status_code >= 400:
+                        if attempt.response.status_code >= 500: # Errors like 404 or 416 concern the file, not the host
+                            self.mirror_ranking.record_failure(request_url)
+                        if fallback is not None:
+                            fallback.close()
+                        fallback = attempt
+                        next_start = now
+                        continue
+                    if fallback is not None:
+                        fallback.close()
+                    for loser in running:
+                        loser.add_done_callback(_MirrorAttempt.close_future)
+                    running.clear()
+                    return attempt
+        except BaseException:
+            if fallback is not None:
+                fallback.close()
+            raise
+        finally:
+            for loser in running: # Only left over if an unexpected error interrupted the race
+                loser.add_done_callback(_MirrorAttempt.close_future)
+            executor.shutdown(wait=False)
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def _request_mirror(self, url: str, extra_headers: Optional[Dict[str, str]], deadline: Optional[float],
+                        retry: bool, transfer: Optional[WatchedTransfer] = None) -> "_MirrorAttempt":
+        """Opens a pooled connection and requests the URL (runs in a race thread)."""
+        stack = contextlib.ExitStack()
+        try:
+            session = stack.enter_context(self.connection_pool.connection(url))
+            request_start = time.monotonic()
+            response = stack.enter_context(self._get_response(session, url, extra_headers, deadline, retry=retry,
+                                                              transfer=transfer))
+        except BaseException:
+            stack.close()
+            raise
+        if self.hedge_policy is not None:
+            self.hedge_policy.record(time.monotonic() - request_start)
+        return _MirrorAttempt(stack, session, response, url)
+
+    def _get_response(self, session: requests.Session, url: str, extra_headers: Optional[Dict[str, str]] = None,
+                      deadline: Optional[float] = None, method: str = 'GET', retry: bool = True,
+                      transfer: Optional[WatchedTransfer] = None) -> requests.Response:
+        """
+        Initiates the request and returns the response object.
+        Connection errors, timeouts and retryable status codes are retried according to retry_policy,
+        unless retry is False. An aborted transfer stops the retries.
+        """
         headers = {'User-Agent': self.user_agent}
-        last_exception = None
+        if extra_headers:
+            headers.update(extra_headers)
 
-        for attempt in range(self.retry_count + 1):
+        attempt = 0
+        while True:
             if not self._alive:
-                 raise Exception("Download cancelled by user") # Or a custom exception
+                 raise DownloadCancelledError("Download cancelled")
+            if transfer is not None:
+                transfer.check()
 
             try:
-                response = requests.get(url, stream=True, timeout=self.timeout, headers=headers, allow_redirects=True)
-                # Check for specific retryable status codes if needed, e.g.:
-                # if response.status_code in {503, 504} and attempt < self.retry_count:
-                #    raise requests.exceptions.RetryError("Retryable status code") # Custom trigger for retry
-                return response # Return successful response immediately
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                last_exception = e
-                if attempt < self.retry_count:
-                    time.sleep(self.retry_delay * (attempt + 1)) # Exponential backoff optional
-                    continue # Retry
-                else:
+                response = session.request(method, url, stream=True, headers=headers, allow_redirects=True,
+                                           timeout=self.timeout_policy.get_request_timeout(self.timeout))
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                delay = self.retry_policy.get_delay(attempt)
+                if not retry or not self.retry_policy.allows_retry(attempt, delay, deadline):
                     raise # Raise the exception after final retry fails
-            except requests.exceptions.RequestException as e:
-                 # Non-retryable request errors (like invalid URL)
-                 last_exception = e
-                 raise # Raise immediately
+            else:
+                if not self.retry_policy.is_retryable_status(response.status_code):
+                    return response # Return successful response immediately
+                delay = self.retry_policy.get_delay(attempt, response.headers)
+                if not retry or not self.retry_policy.allows_retry(attempt, delay, deadline):
+                    return response # Out of retries, the caller reports the status code
+                response.close()
 
-        # Should not be reached if loop logic is correct, but raise last error if it is
-        raise last_exception or Exception("Failed to get response after retries")
+            self._sleep(delay, transfer)
+            attempt += 1
 
 
-    def _download_content(self, response: requests.Response, metadata: DownloadMetadata):
-        """Handles writing the file content and firing progress events."""
+    def _download_content(self, session: requests.Session, response: requests.Response, metadata: DownloadMetadata,
+                          journal: Optional[ResumeJournal] = None, offset: int = 0, fire_start_event: bool = True,
+                          deadline: Optional[float] = None, expected_hash: Optional[str] = None,
+                          transfer: Optional[WatchedTransfer] = None) -> bool:
+        """
+        Handles writing the file content and firing progress events.
+        A stream that breaks halfway is requested again from the last written byte when the server allows it.
+        The digest is computed from the chunks as they are written, so the file is never read back.
+        Returns whether the download completed.
+        """
+        if journal is None:
+            journal = self._create_journal(response, metadata)
+        hasher = self._create_hasher(expected_hash)
+        # Continuing at an offset needs raw byte positions and a validator proving it is still the same file
+        can_continue = self._is_identity_encoded(response) and metadata.validator is not None
+        host = BandwidthLimiter.get_host(metadata.url)
+        downloaded = offset
+        f = None
         try:
-            # Fire STARTED event
-            self._fire_event(DownloadEventType.STARTED, DownloadStartEvent(
-                url=metadata.url,
-                filename=metadata.filename,
-                filepath=metadata.filepath,
-                filesize=metadata.filesize,
-            ))
-
-            downloaded = 0
-            last_percent = -1
-            with open(metadata.filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=self.chunk_size):
-                    if not self._alive:
-                        # Ensure file is closed before attempting removal
-                        f.close()
-                        # Attempt cleanup on cancellation
-                        try:
-                             if os.path.exists(metadata.filepath):
-                                  os.remove(metadata.filepath)
-                        except OSError as e_os:
-                             # Log cleanup failure if necessary
-                             print(f"Warning: Could not remove partial file '{metadata.filepath}': {e_os}")
-                        # Fire failure event for cancellation
-                        self._fire_failure_event(metadata.url, response, exception=Exception("Download cancelled"), filepath=metadata.filepath)
-                        return # Exit download function
-
-                    # chunk is guaranteed to be bytes if stream=True
-                    chunk_size = len(chunk)
-                    if chunk_size > 0:
-                         f.write(chunk)
-                         downloaded += chunk_size
-
-                    # Throttle progress updates slightly if needed, e.g., only on percentage change
-                    if metadata.filesize > 0: # Avoid division by zero
-                        percent = int((downloaded / metadata.filesize) * 100)
-                        if percent != last_percent: # Update only when percentage changes
-                             self._fire_event(DownloadEventType.PROGRESS, ProgressEventArgs(
-                                 downloaded=downloaded,
-                                 percent=percent,
-                                 filename=metadata.filename,
-                                 filepath=metadata.filepath,
-                                 filesize=metadata.filesize,
-                                 url=metadata.url,
-                             ))
-                             last_percent = percent
-                    # else: handle case with unknown filesize if needed
+            if hasher is not None and offset > 0:
+                # Bytes of an earlier attempt are only on disk, so this prefix has to be read once
+                Checksum.hash_file(hasher, self._get_write_path(metadata), offset)
 
-
-            # Ensure final progress event is sent if download completes fully
-            if self._alive:
-                # Send 100% progress if not already sent
-                if last_percent != 100 and metadata.filesize > 0 :
-                    self._fire_event(DownloadEventType.PROGRESS, ProgressEventArgs(
-                        downloaded=metadata.filesize, # Assume full download if loop finished
-                        percent=100,
-                        filename=metadata.filename,
-                        filepath=metadata.filepath,
-                        filesize=metadata.filesize,
-                        url=metadata.url,
-                    ))
-                # Fire COMPLETED event
-                self._fire_event(DownloadEventType.COMPLETED, DownloadCompleteEvent(
+            if fire_start_event:
+                self._fire_event(DownloadEventType.STARTED, DownloadStartEvent(
                     url=metadata.url,
                     filename=metadata.filename,
                     filepath=metadata.filepath,
-                    filesize=metadata.filesize, # Use actual downloaded or header filesize? Header is safer.
+                    filesize=metadata.filesize,
                 ))
 
+            last_progress_bytes = downloaded
+            last_progress_time = time.monotonic()
+            attempt = 0
+            # Compressed bodies don't have a known decoded size to preallocate
+            size = metadata.filesize if self._is_identity_encoded(response) else 0
+            with contextlib.ExitStack() as retried_response, \
+                    self._open_write_file(self._get_write_path(metadata), 'r+b' if offset > 0 else 'wb',
+                                          offset, size) as f:
+                while True:
+                    try:
+                        for chunk in self._iter_chunks(response, transfer):
+                            if not self._alive:
+                                # Ensure file is closed before keeping or removing the partial file
+                                f.close()
+                                self._abort_partial_file(metadata, journal, downloaded)
+                                # Fire failure event for cancellation
+                                error = DownloadCancelledError("Download cancelled")
+                                self._fire_failure_event(metadata.url, None, exception=error,
+                                                         filepath=metadata.filepath, reason=str(error))
+                                return False # Exit download function
+
+                            # chunk is bytes, or a view into the read buffer that is only valid until the next chunk
+                            chunk_size = len(chunk)
+                            if chunk_size > 0:
+                                 if self.bandwidth_limiter is not None:
+                                      self.bandwidth_limiter.consume(host, chunk_size)
+                                 f.write(chunk)
+                                 if hasher is not None:
+                                      hasher.update(chunk)
+                                 downloaded += chunk_size
+
+                            if journal is not None and downloaded - journal.committed >= self.journal_interval:
+                                committed = self._get_committed(f, downloaded)
+                                if committed - journal.committed >= self.journal_interval:
+                                    journal.committed = committed
+                                    journal.save(self._get_write_path(metadata))
+
+                            now = time.monotonic()
+                            if self.progress_policy.is_due(now - last_progress_time, downloaded - last_progress_bytes):
+                                self._fire_progress_event(metadata, downloaded)
+                                last_progress_bytes = downloaded
+                                last_progress_time = now
+                        break
+                    except self._STREAM_ERRORS:
+                        # Hand the broken connection back first, with a full pool the retry would wait for it forever
+                        response.close()
+                        delay = self.retry_policy.get_delay(attempt)
+                        if not self._alive or not self.retry_policy.allows_retry(attempt, delay, deadline):
+                            raise
+                        self._sleep(delay, transfer)
+                        attempt += 1
+
+                    range_headers = None
+                    if can_continue and downloaded > 0:
+                        range_headers = {'Range': f'bytes={downloaded}-', 'If-Range': metadata.validator,
+                                         'Accept-Encoding': 'identity'}
+                    retried_response.close() # Only the newest retry stays open
+                    response = retried_response.enter_context(
+                        self._get_response(session, metadata.url, range_headers, deadline, transfer=transfer))
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        # The server sends the whole file again, so writing starts over
+                        f.seek(0)
+                        f.truncate()
+                        downloaded = 0
+                        last_progress_bytes = 0
+                        hasher = self._create_hasher(expected_hash)
+                        if journal is not None:
+                            journal.committed = 0
+
+
+            # Ensure final progress event is sent if download completes fully
+            if self._alive:
+                digest = self._verify_digest(hasher, expected_hash)
+                self._commit_partial_file(metadata)
+                # The final event is always sent, also for responses without Content-Length
+                self._fire_progress_event(metadata, downloaded, 100)
+                self._fire_complete_event(metadata, digest)
+                return True
+            return False
+
+        except ChecksumMismatchError as e:
+            self._discard_partial_file(metadata)
+            self._fire_failure_event(metadata.url, response, exception=e, filepath=metadata.filepath,
+                                     reason="Checksum mismatch")
+            return False
+        except (DownloadCancelledError, TransferTimeoutError) as e:
+            # The .part file stays, so the download can be continued later
+            self._abort_partial_file(metadata, journal, f.committed if isinstance(f, WriteBehindWriter) else downloaded)
+            self._fire_failure_event(metadata.url, None, exception=e, filepath=metadata.filepath, reason=str(e))
+            return False
         except Exception as e:
             # Catch errors during file writing or chunk iteration
-            self._fire_failure_event(metadata.url, response, exception=e, filepath=metadata.filepath)
-            # Re-raise the exception after firing the event
+            # Bytes still queued when a writer thread failed never reached the file
+            self._abort_partial_file(metadata, journal, f.committed if isinstance(f, WriteBehindWriter) else downloaded)
+            failed_response = getattr(e, 'response', None)
+            self._fire_failure_event(metadata.url, failed_response if failed_response is not None else response,
+                                     exception=e, filepath=metadata.filepath)
+            return False
+
+    def _resume_content(self, session: requests.Session, metadata: DownloadMetadata, journal: ResumeJournal,
+                        deadline: Optional[float], expected_hash: Optional[str] = None,
+                        transfer: Optional[WatchedTransfer] = None) -> bool:
+        """Continues a single stream download from the last committed byte of its .part file."""
+        offset = min(journal.committed, os.path.getsize(self._get_write_path(metadata)))
+        range_headers = {'Range': f'bytes={offset}-', 'If-Range': journal.validator, 'Accept-Encoding': 'identity'}
+        with self._get_response(session, metadata.url, range_headers, deadline, transfer=transfer) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                # The file changed since the journal was written and the server sent all of it again
+                offset = 0
+                journal = None
+            return self._download_content(session, response, metadata, journal, offset, deadline=deadline,
+                                          expected_hash=expected_hash, transfer=transfer)
+
+    def _create_journal(self, response: requests.Response, metadata: DownloadMetadata) -> Optional[ResumeJournal]:
+        """Creates the resume journal for a fresh download, or None if the download can't be resumed later."""
+        if not self.resumable or not self._is_identity_encoded(response):
+            return None
+        journal = ResumeJournal(url=metadata.url, filesize=metadata.filesize,
+                                etag=metadata.etag, last_modified=metadata.last_modified)
+        if journal.validator is None:
+            return None # Without a validator, If-Range can't guarantee the parts belong to the same file
+        journal.save(self._get_write_path(metadata))
+        return journal
+
+    def _load_journal(self, response: requests.Response, metadata: DownloadMetadata) -> Optional[ResumeJournal]:
+        """Loads the journal of an earlier attempt if its .part file can be continued, discarding stale ones."""
+        if not self.resumable:
+            return None
+        journal = ResumeJournal.load(self._get_write_path(metadata))
+        if journal is None:
+            return None
+
+        part_path = self._get_write_path(metadata)
+        usable = (journal.url == metadata.url and journal.filesize == metadata.filesize
+                  and journal.validator is not None and self._is_identity_encoded(response)
+                  and journal.etag == metadata.etag and journal.last_modified == metadata.last_modified
+                  and os.path.exists(part_path))
+        if usable and (journal.segments is not None or journal.committed > 0):
+            return journal
+
+        ResumeJournal.delete(part_path)
+        if not usable:
+            self._remove_partial_file(part_path)
+        return None
+
+    def _abort_partial_file(self, metadata: DownloadMetadata, journal: Optional[ResumeJournal], committed: int):
+        """Keeps the .part file for a later resume if it has a journal, otherwise removes it."""
+        if journal is None:
+            self._remove_partial_file(self._get_write_path(metadata))
+            return
+        try:
+            if journal.segments is None:
+                journal.committed = committed
+            journal.save(self._get_write_path(metadata))
+        except OSError as e_os:
+            print(f"Warning: Could not save resume journal for '{metadata.filepath}': {e_os}")
+
+    def _discard_partial_file(self, metadata: DownloadMetadata):
+        """Removes the .part file and its journal, for downloads whose bytes can't be trusted."""
+        part_path = self._get_write_path(metadata)
+        self._remove_partial_file(part_path)
+        ResumeJournal.delete(part_path)
+
+    def _commit_partial_file(self, metadata: DownloadMetadata):
+        """Renames the finished .part file to its final name as the durability policy says and drops the journal."""
+        part_path = self._get_write_path(metadata)
+        self.durability_policy.commit(part_path, metadata.filepath)
+        ResumeJournal.delete(part_path)
+        if self.directory_index is not None:
+            self.directory_index.add(metadata.filepath)
+
+    def _create_hasher(self, expected_hash: Optional[str]) -> Optional["hashlib._Hash"]:
+        """Creates the hasher for a download, or None if no digest was requested."""
+        if expected_hash:
+            algorithm, _ = Checksum.split(expected_hash, self.hash_algorithm or "sha256")
+            return Checksum.create_hasher(algorithm)
+        if self.hash_algorithm:
+            return Checksum.create_hasher(self.hash_algorithm)
+        return None
+
+    def _verify_digest(self, hasher: Optional["hashlib._Hash"], expected_hash: Optional[str]) -> Optional[str]:
+        """Returns the hex digest of a finished download, raising ChecksumMismatchError if it isn't the expected one."""
+        if hasher is None:
+            return None
+        digest = hasher.hexdigest()
+        if expected_hash:
+            algorithm, expected = Checksum.split(expected_hash, self.hash_algorithm or "sha256")
+            if digest != expected:
+                raise ChecksumMismatchError(algorithm, expected, digest)
+        return digest
+
+    def _get_manifest(self, directory: str) -> DownloadManifest:
+        key = os.path.abspath(directory)
+        with self._manifest_lock:
+            manifest = self._manifests.get(key)
+            if manifest is None:
+                manifest = DownloadManifest(key)
+                self._manifests[key] = manifest
+            return manifest
+
+    def _get_manifest_entry(self, manifest: Optional[DownloadManifest], url: str,
+                            output_path: str) -> Optional[ManifestEntry]:
+        """Returns the manifest entry of the URL if its file is still on disk and may be revalidated."""
+        if manifest is None or self.force_download:
+            return None
+        entry = manifest.get(url)
+        if entry is None or not self._file_exists(os.path.join(output_path, entry.filename)):
+            return None
+        return entry
+
+    def _get_known_filepath(self, url: str, output_path: str, entry: Optional[ManifestEntry]) -> Optional[str]:
+        """Returns the path a download will be saved to if it's known without a request and skip_known_files is set."""
+        if not self.skip_known_files or self.force_download:
+            return None
+        filename = entry.filename if entry is not None else self._get_filename({}, url)
+        return os.path.join(output_path, filename) if filename else None
+
+    def _file_exists(self, filepath: str) -> bool:
+        if self.directory_index is not None:
+            return self.directory_index.contains(filepath)
+        return os.path.exists(filepath)
+
+    @staticmethod
+    def _create_manifest_entry(metadata: DownloadMetadata) -> ManifestEntry:
+        return ManifestEntry(filename=metadata.filename, etag=metadata.etag, last_modified=metadata.last_modified)
+
+    @staticmethod
+    def _get_conditional_headers(entry: Optional[ManifestEntry]) -> Optional[Dict[str, str]]:
+        if entry is None:
+            return None
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers or None
+
+    @contextlib.contextmanager
+    def _open_write_file(self, path: str, mode: str, offset: int = 0, size: int = 0,
+                         truncate: bool = True) -> Iterator[Union[BinaryIO, WriteBehindWriter]]:
+        """
+        Opens the file that receives the bytes of a download, positioned at offset.
+        Anything after the offset is dropped unless truncate is False. With write_behind the file is
+        preallocated up to size (if known) and wrapped in a WriteBehindWriter that is drained on exit.
+        """
+        with open(path, mode) as f:
+            if offset > 0:
+                f.seek(offset)
+                if truncate:
+                    f.truncate() # Drop anything written after the last committed byte
+            if not self.write_behind:
+                yield f
+                return
+            if size > offset:
+                self._preallocate(f, offset, size)
+            writer = WriteBehindWriter(f, self.write_behind_buffer, self.write_behind_budget)
+            try:
+                yield writer
+            finally:
+                writer.close()
+
+    @staticmethod
+    def _get_committed(f: Union[BinaryIO, WriteBehindWriter], position: int, wait: bool = False) -> int:
+        """
+        Returns the file position up to which bytes may be recorded as committed in a journal.
+        A write-behind writer reports what its thread has flushed so far, unless wait is set.
+        """
+        if isinstance(f, WriteBehindWriter):
+            if wait:
+                f.flush()
+            return f.committed
+        f.flush() # Only flushed bytes may be recorded as committed
+        return position
+
+    @staticmethod
+    def _preallocate(f: BinaryIO, offset: int, size: int):
+        """Reserves the rest of the file up front, so the filesystem can allocate it in large extents."""
+        try:
+            os.posix_fallocate(f.fileno(), offset, size - offset)
+        except (AttributeError, OSError):
+            pass # Not available on Windows or on every filesystem (e.g. some NFS servers), writing works without it
+
+    def _get_write_path(self, metadata: DownloadMetadata) -> str:
+        """Returns the staging path that receives the bytes while the download is in progress."""
+        if self.staging_directory is None:
+            return ResumeJournal.get_part_path(metadata.filepath)
+        # Files of different output directories may share a name, so a digest of the full path keeps them apart.
+        # The digest also keeps shortened names unique, so the name is cut to leave room for it and the suffixes.
+        key = hashlib.sha1(os.path.abspath(metadata.filepath).encode("utf-8")).hexdigest()[:16]
+        name_limit = self._MAX_NAME_LENGTH - len(key) - len("-.part.json.tmp") # The journal is saved through a .tmp
+        name = metadata.filename.encode("utf-8")[:name_limit].decode("utf-8", "ignore")
+        return os.path.join(self.staging_directory, f"{key}-{name}.part")
+
+    def _iter_chunks(self, response: requests.Response,
+                     transfer: Optional[WatchedTransfer] = None) -> Iterator[Union[bytes, memoryview]]:
+        """
+        Yields the body of a streamed response like _read_chunks, counting the bytes of a watched transfer.
+        Raises TransferTimeoutError once the watchdog aborted the transfer.
+        """
+        if transfer is None:
+            yield from self._read_chunks(response)
+            return
+        transfer.add_response(response)
+        try:
+            for chunk in self._read_chunks(response):
+                transfer.check()
+                transfer.received += len(chunk)
+                yield chunk
+        except requests.exceptions.RequestException:
+            transfer.check() # A socket shut down by the watchdog surfaces as a broken stream
+            raise
+        finally:
+            transfer.remove_response(response)
+        transfer.check() # Or as the end of a body without Content-Length
+
+    def _read_chunks(self, response: requests.Response) -> Iterator[Union[bytes, memoryview]]:
+        """
+        Yields the body of a streamed response in chunks of at most chunk_size bytes.
+        Identity-encoded bodies are read from the socket straight into a single preallocated buffer, so each
+        chunk is a memoryview that must be consumed before the next one is requested. Bodies that need
+        content decoding go through iter_content. Only the buffered path resizes reads in adaptive mode.
+        """
+        readinto = getattr(getattr(response.raw, '_fp', None), 'readinto', None)
+        if not self.reuse_read_buffer or readinto is None or not self._is_identity_encoded(response):
+            yield from response.iter_content(chunk_size=self.chunk_size)
+            return
+
+        try:
+            expected = int(response.headers['Content-Length'])
+        except (KeyError, ValueError):
+            expected = None
+        sizer = None
+        read_size = self.chunk_size
+        if self.adaptive_chunk_size:
+            sizer = _ChunkSizer(self.chunk_size, self.chunk_size_min, self.chunk_size_max, self.chunk_interval)
+            read_size = sizer.size
+        buffer = memoryview(bytearray(read_size))
+        received = 0
+        try:
+            while True:
+                # Reading below urllib3 also skips its error translation, so map errors to what iter_content raises
+                try:
+                    size = readinto(buffer if read_size == len(buffer) else buffer[:read_size])
+                except http.client.HTTPException as e:
+                    raise requests.exceptions.ChunkedEncodingError(e) from e
+                except OSError as e:
+                    raise requests.exceptions.ConnectionError(e) from e
+                if not size:
+                    break
+                received += size
+                yield buffer[:size]
+                if sizer is not None:
+                    read_size = sizer.record(size)
+                    if read_size > len(buffer):
+                        buffer = memoryview(bytearray(read_size)) # The previous chunk has been consumed by now
+            if expected is not None and received < expected:
+                # http.client treats a connection closed early as the end of the body
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"Connection closed after {received} of {expected} bytes")
+        except Exception:
+            # urllib3's error handling would release the connection here, without it the pool slot stays taken
+            response.close()
             raise
+        # urllib3 didn't see the body end, so hand the connection back before closing the response drops it
+        response.raw.release_conn()
+
+    @staticmethod
+    def _is_identity_encoded(response: requests.Response) -> bool:
+        return response.headers.get("Content-Encoding", "identity").lower() == "identity"
 
+    def _can_download_segmented(self, response: requests.Response, metadata: DownloadMetadata) -> bool:
+        """Checks whether the probe response allows splitting the file into byte ranges."""
+        if self.segment_count <= 1 or metadata.filesize < max(self.segment_min_size, self.segment_count):
+            return False
+        if not metadata.accepts_ranges:
+            return False
+        # Ranges address encoded bytes, so compressed bodies can't be decoded piecewise
+        return self._is_identity_encoded(response)
+
+    def _download_segmented(self, metadata: DownloadMetadata, journal: Optional[ResumeJournal] = None,
+                            deadline: Optional[float] = None, expected_hash: Optional[str] = None,
+                            transfer: Optional[WatchedTransfer] = None) -> bool:
+        """
+        Downloads the file as concurrent byte ranges written in place into a preallocated file.
+        A journal from an earlier attempt continues every range from its last committed byte.
+        Falls back to a single stream if the server answers a range request with the full body.
+        Ranges arrive out of order, so a requested digest is computed from the finished file.
+        """
+        self._fire_event(DownloadEventType.STARTED, DownloadStartEvent(
+            url=metadata.url,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize,
+        ))
+
+        part_path = self._get_write_path(metadata)
+        if journal is None:
+            journal = ResumeJournal(url=metadata.url, filesize=metadata.filesize,
+                                    etag=metadata.etag, last_modified=metadata.last_modified,
+                                    segments=[[start, end, 0] for start, end in self._get_segment_ranges(metadata.filesize)])
+        persist_journal = self.resumable and journal.validator is not None
+        progress = _SegmentProgress(journal, part_path if persist_journal else None, self.progress_policy)
+        stop_event = threading.Event()
+        try:
+            if progress.downloaded == 0:
+                with open(part_path, 'wb') as f:
+                    f.truncate(metadata.filesize) # Preallocate so every segment can write at its own offset
+                if persist_journal:
+                    journal.save(part_path)
+
+            pending_segments = [segment for segment in journal.segments if segment[0] + segment[2] <= segment[1]]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(pending_segments), 1)) as executor:
+                futures = [executor.submit(self._download_segment, metadata, segment, progress, stop_event, deadline,
+                                           transfer)
+                           for segment in pending_segments]
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+                except BaseException:
+                    stop_event.set() # Make the remaining segments bail out at their next chunk
+                    raise
+
+            hasher = self._create_hasher(expected_hash)
+            if hasher is not None:
+                Checksum.hash_file(hasher, part_path)
+            digest = self._verify_digest(hasher, expected_hash)
+            self._commit_partial_file(metadata)
+
+        except _RangeNotSupportedError:
+            self._remove_partial_file(part_path)
+            ResumeJournal.delete(part_path)
+            with self.connection_pool.connection(metadata.url) as session, \
+                    self._get_response(session, metadata.url, deadline=deadline, transfer=transfer) as response:
+                response.raise_for_status()
+                return self._download_content(session, response, metadata, fire_start_event=False, deadline=deadline,
+                                              expected_hash=expected_hash, transfer=transfer)
+        except ChecksumMismatchError as e:
+            self._discard_partial_file(metadata)
+            self._fire_failure_event(metadata.url, None, exception=e, filepath=metadata.filepath,
+                                     reason="Checksum mismatch")
+            return False
+        except (DownloadCancelledError, TransferTimeoutError) as e:
+            self._abort_partial_file(metadata, journal if persist_journal else None, progress.downloaded)
+            self._fire_failure_event(metadata.url, None, exception=e, filepath=metadata.filepath, reason=str(e))
+            return False
+        except Exception as e:
+            self._abort_partial_file(metadata, journal if persist_journal else None, progress.downloaded)
+            self._fire_failure_event(metadata.url, getattr(e, 'response', None), exception=e, filepath=metadata.filepath)
+            return False
+
+        self._fire_progress_event(metadata, progress.downloaded, 100)
+        self._fire_complete_event(metadata, digest)
+        return True
+
+    def _download_segment(self, metadata: DownloadMetadata, segment: List[int], progress: "_SegmentProgress",
+                          stop_event: threading.Event, deadline: Optional[float],
+                          transfer: Optional[WatchedTransfer] = None):
+        """
+        Downloads the remaining bytes of a [start, end, committed] segment at their offset in the .part file.
+        A broken stream is requested again from the last written byte of the segment.
+        """
+        start, end, committed = segment
+        host = BandwidthLimiter.get_host(metadata.url)
+        written = committed
+        attempt = 0
+        with self._open_write_file(self._get_write_path(metadata), 'r+b', start + committed, truncate=False) as f:
+            try:
+                while True:
+                    range_headers = {'Range': f'bytes={start + written}-{end}', 'Accept-Encoding': 'identity'}
+                    if metadata.validator is not None:
+                        range_headers['If-Range'] = metadata.validator
+                    with self.connection_pool.connection(metadata.url) as session, \
+                            self._get_response(session, metadata.url, range_headers, deadline,
+                                               transfer=transfer) as response:
+                        response.raise_for_status()
+                        if response.status_code != 206:
+                            raise _RangeNotSupportedError(f"Server ignored range request for {metadata.url}")
+                        try:
+                            for chunk in self._iter_chunks(response, transfer):
+                                if not self._alive:
+                                    raise DownloadCancelledError("Download cancelled")
+                                if stop_event.is_set():
+                                    return
+                                if self.bandwidth_limiter is not None:
+                                    self.bandwidth_limiter.consume(host, len(chunk))
+                                f.write(chunk)
+                                written += len(chunk)
+                                if written - segment[2] >= self.journal_interval:
+                                    flushed = self._get_committed(f, start + written) - start
+                                    if flushed - segment[2] >= self.journal_interval:
+                                        progress.commit(segment, flushed)
+                                downloaded = progress.add(len(chunk))
+                                if downloaded is not None:
+                                    self._fire_progress_event(metadata, downloaded)
+                            return
+                        except self._STREAM_ERRORS:
+                            delay = self.retry_policy.get_delay(attempt)
+                            if not self._alive or not self.retry_policy.allows_retry(attempt, delay, deadline):
+                                raise
+                    self._sleep(delay, transfer)
+                    attempt += 1
+            finally:
+                progress.commit(segment, self._get_committed(f, start + written, wait=True) - start)
+
+    def _get_segment_ranges(self, filesize: int) -> List[Tuple[int, int]]:
+        """Splits the file into segment_count inclusive byte ranges of nearly equal size."""
+        segment_size = filesize // self.segment_count
+        ranges = []
+        for index in range(self.segment_count):
+            start = index * segment_size
+            end = filesize - 1 if index == self.segment_count - 1 else start + segment_size - 1
+            ranges.append((start, end))
+        return ranges
+
+    @staticmethod
+    def _sleep(seconds: float, transfer: Optional[WatchedTransfer]):
+        """Waits before a retry, raising right away if the transfer is aborted meanwhile."""
+        if transfer is None:
+            time.sleep(seconds)
+        else:
+            transfer.wait(seconds)
+
+    @staticmethod
+    def _remove_partial_file(filepath: str):
+        try:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        except OSError as e_os:
+            print(f"Warning: Could not remove partial file '{filepath}': {e_os}")
+
+    def _fire_complete_event(self, metadata: DownloadMetadata, digest: Optional[str] = None):
+        """Helper to fire the COMPLETED event."""
+        self._fire_event(DownloadEventType.COMPLETED, DownloadCompleteEvent(
+            url=metadata.url,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize, # Use actual downloaded or header filesize? Header is safer.
+            digest=digest,
+            etag=metadata.etag,
+            last_modified=metadata.last_modified,
+        ))
+        if self.pipeline is not None:
+            self.pipeline.submit(metadata.filepath, metadata.url) # Holds this download slot while the stages are full
+
+    def _fire_progress_event(self, metadata: DownloadMetadata, downloaded: int, percent: Optional[int] = None):
+        """Helper to fire the PROGRESS event. The percent stays 0 until completion if the filesize is unknown."""
+        if percent is None:
+            percent = min(int(downloaded * 100 / metadata.filesize), 100) if metadata.filesize > 0 else 0
+        self._fire_event(DownloadEventType.PROGRESS, ProgressEventArgs(
+            downloaded=downloaded,
+            percent=percent,
+            filename=metadata.filename,
+            filepath=metadata.filepath,
+            filesize=metadata.filesize,
+            url=metadata.url,
+        ))
 
     def _fire_failure_event(self, url: str, response: Optional[requests.Response],
-                            exception: Optional[BaseException], filepath: Optional[str] = None):
+                            exception: Optional[BaseException], filepath: Optional[str] = None,
+                            reason: Optional[str] = None):
         """Helper to fire the FAILED event."""
         status_code = response.status_code if response is not None else None
-        reason = response.reason if response is not None else "Request Failed"
+        if reason is None:
+            reason = response.reason if response is not None else "Request Failed"
         if exception and not reason : reason = str(exception)
 
         self._fire_event(DownloadEventType.FAILED, DownloadFailureEvent(
@@ -235,40 +1136,48 @@ class Downloader(EventListener):
 
     def _get_download_metadata(self, response: requests.Response, output_path: str) -> DownloadMetadata:
         """Extracts filename, filepath, and filesize."""
-        filename = self._get_filename(response)
+        return self._create_metadata(response.headers, response.url, output_path)
+
+    @staticmethod
+    def _create_metadata(headers: Mapping[str, str], url: str, output_path: str) -> DownloadMetadata:
+        """Builds the metadata from the response headers and final URL (shared with AsyncDownloader)."""
+        filename = Downloader._get_filename(headers, url)
         if not filename:
              # Generate a fallback filename if none could be determined
-             parsed_url = urllib.parse.urlparse(response.url)
+             parsed_url = urllib.parse.urlparse(url)
              fallback = os.path.basename(parsed_url.path) or f"download_{uuid.uuid4()}"
              filename = sanitize_filename(fallback)
 
 
         filepath = os.path.join(output_path, filename)
         # Get filesize, default to 0 if not present (safer than 1 for percentage calc)
-        filesize = int(response.headers.get("Content-Length", 0))
+        filesize = int(headers.get("Content-Length", 0))
 
         return DownloadMetadata(
             filename=filename,
             filepath=filepath,
             filesize=filesize,
-            url=response.url,
-            uuid=str(uuid.uuid4()) # Unique ID for this specific download attempt
+            url=url,
+            uuid=str(uuid.uuid4()), # Unique ID for this specific download attempt
+            accepts_ranges=headers.get("Accept-Ranges", "").lower() == "bytes",
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
         )
 
 
     @staticmethod
-    def _get_filename(response: requests.Response) -> Optional[str]:
+    def _get_filename(headers: Mapping[str, str], url: str) -> Optional[str]:
         """Extracts filename from Content-Disposition or URL."""
         filename = None
         # Try requests utility first for potentially better Content-Disposition parsing
         try:
             from requests.utils import get_filename_from_cd
-            cd_filename = get_filename_from_cd(response.headers.get('content-disposition'))
+            cd_filename = get_filename_from_cd(headers.get('content-disposition'))
             if cd_filename:
                  filename = sanitize_filename(cd_filename) # Sanitize immediately
         except ImportError:
              # Fallback to manual parsing if requests.utils is not available (unlikely)
-             content_disposition = response.headers.get('content-disposition')
+             content_disposition = headers.get('content-disposition')
              if content_disposition:
                   # Simple regex, might miss complex cases like filename*
                   match = re.search(r'filename\*?=(?:UTF-8\'\')?([^;\n"\']+|\"[^"]*\"|\'[^"]*\')', content_disposition, flags=re.IGNORECASE)
@@ -280,11 +1189,110 @@ class Downloader(EventListener):
         # Fallback to URL if filename still not found
         if not filename:
             try:
-                 parsed_url = urllib.parse.urlparse(response.url)
+                 parsed_url = urllib.parse.urlparse(url)
                  path_filename = os.path.basename(parsed_url.path)
                  if path_filename:
                       filename = sanitize_filename(urllib.parse.unquote(path_filename))
             except Exception:
                  pass # Ignore errors during URL parsing fallback
 
-        return filename if filename else None # Return None if no filename found
\ No newline at end of file
+        return filename if filename else None # Return None if no filename found
+
+
+class _RangeNotSupportedError(Exception):
+    """Raised when a server answers a byte-range request with the whole body."""
+
+
+class _MirrorAttempt:
+    """A response of a mirror race together with the pooled connection it holds."""
+
+    def __init__(self, stack: contextlib.ExitStack, session: requests.Session, response: requests.Response,
+                 url: str):
+        self.response: requests.Response = response
+        self.session: requests.Session = session
+        self.stack: contextlib.ExitStack = stack
+        self.url: str = url # The mirror that was requested, response.url is where its redirects led
+
+    def close(self):
+        """Closes the response and returns its connection slot to the pool."""
+        self.stack.close()
+
+    @staticmethod
+    def close_future(future: concurrent.futures.Future):
+        """Closes the attempt of a request that lost the race once it has finished."""
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+
+class _ChunkSizer:
+    """
+    Picks the read size of one download from its measured throughput and read rate.
+    Fast streams grow towards fewer, larger reads. Slow streams shrink so a read, and with it the next
+    cancellation check and progress event, never waits long for data.
+    """
+
+    WINDOW: float = 0.1
+    """Seconds of reads that are measured before the size is reconsidered"""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, interval: float):
+        self._bytes = 0
+        self._interval = interval
+        self._maximum = max(maximum, minimum)
+        self._minimum = minimum
+        self._reads = 0
+        self._window_start = time.monotonic()
+        self.size: int = self._clamp(initial)
+
+    def record(self, amount: int) -> int:
+        """Records a finished read and returns the size of the next one."""
+        self._bytes += amount
+        self._reads += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.WINDOW:
+            return self.size
+
+        # With full reads this exceeds the current size exactly when there are more reads per interval than one
+        wanted = self._bytes / elapsed * self._interval
+        # Short reads mean the socket had less data ready than asked for, so growing wouldn't save iterations
+        full_reads = self._bytes / self._reads >= self.size * 0.75
+        if (wanted > self.size and full_reads) or wanted < self.size / 2:
+            self.size = self._clamp(1 << max(int(wanted), 1).bit_length() - 1)
+        self._bytes = 0
+        self._reads = 0
+        self._window_start = now
+        return self.size
+
+    def _clamp(self, size: int) -> int:
+        return min(max(size, self._minimum), self._maximum)
+
+
+class _SegmentProgress:
+    """Aggregates the bytes written by all segments of one download and keeps their journal up to date."""
+
+    def __init__(self, journal: ResumeJournal, part_path: Optional[str], policy: ProgressPolicy):
+        self._journal = journal
+        self._part_path = part_path
+        self._lock = threading.Lock()
+        self._policy = policy
+        self.downloaded: int = sum(segment[2] for segment in journal.segments)
+        self._last_event_bytes = self.downloaded
+        self._last_event_time = time.monotonic()
+
+    def add(self, size: int) -> Optional[int]:
+        """Adds written bytes and returns the total if a progress event is due, otherwise None."""
+        with self._lock:
+            self.downloaded += size
+            now = time.monotonic()
+            if not self._policy.is_due(now - self._last_event_time, self.downloaded - self._last_event_bytes):
+                return None
+            self._last_event_bytes = self.downloaded
+            self._last_event_time = now
+            return self.downloaded
+
+    def commit(self, segment: List[int], committed: int):
+        """Records the flushed byte count of a segment and persists the journal if it is resumable."""
+        with self._lock:
+            segment[2] = committed
+            if self._part_path is not None:
+                self._journal.save(self._part_path)
@@ -1,18 +1,32 @@
 import concurrent.futures
+import itertools
 import json
+import math
+import multiprocessing
 import os
+import queue
 import threading # Import threading for Lock
+import time
 import urllib.parse # Added missing import here
 from collections import defaultdict # Use defaultdict for progress tracking
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Dict, Tuple, Optional, Union # Added Optional, Union
+from typing import Iterable, Iterator, List, Dict, Sized, Tuple, Optional, Union # Added Optional, Union
 
 from mizue.file import FileUtils
 from mizue.network.downloader import (DownloadStartEvent, ProgressEventArgs,
                                       DownloadCompleteEvent, Downloader,
-                                      DownloadEventType, DownloadFailureEvent)
+                                      DownloadEventType, DownloadFailureEvent,
+                                      CancellationToken, ConnectionPool, BandwidthLimiter, ConcurrencyController,
+                                      DownloadJobStore, DownloadPipeline, DownloadRecord,
+                                      DownloadRecordWriter, DownloadScheduler, DownloadShard, DownloadShardQueue,
+                                      DownloadShardResult, DownloadStatistics, DurabilityPolicy,
+                                      DownloadTask, HedgePolicy, ProgressPolicy, SchedulingPolicy, TaskState,
+                                      TimeoutPolicy, TransferTimeoutError)
 from mizue.network.downloader.download_event import DownloadSkipEvent
+from mizue.network.downloader.download_metadata import DownloadMetadata
+from mizue.network.downloader.download_shard import configure_downloader
+from mizue.network.downloader.task_deduplicator import TaskDeduplicator
 from mizue.printer import Printer, Colorizer
 from mizue.printer.grid import (ColumnSettings, Alignment, Grid, BorderStyle,
                                 CellRendererArgs)
@@ -47,49 +61,168 @@ class _DownloadReportGridData:
 class DownloaderTool(EventListener):
     """Orchestrates single/bulk file downloads with progress and reports."""
 
+    _REPORT_EVENT_TYPES: Dict[ReportReason, DownloadEventType] = {
+        ReportReason.COMPLETED: DownloadEventType.COMPLETED,
+        ReportReason.FAILED: DownloadEventType.FAILED,
+        ReportReason.SKIPPED: DownloadEventType.SKIPPED
+    }
+    _REPORT_REASONS: Dict[DownloadEventType, ReportReason] = {
+        event_type: reason for reason, event_type in _REPORT_EVENT_TYPES.items()
+    }
+
     def __init__(self):
         super().__init__()
         self._file_color_scheme: Dict = {}
         self._report_data: List[_DownloadReport] = []
+        self._report_statistics: DownloadStatistics = DownloadStatistics()
+        self._report_writer: Optional[DownloadRecordWriter] = None
+        self._start_times: Dict[str, float] = {} # Start time per active URL, for the durations in the report
+        self._bulk_cancelled: bool = False
         self._bulk_progress_lock = threading.Lock() # Lock for shared bulk download state
+        self._cancel_tokens: Dict[int, Tuple[DownloadTask, CancellationToken]] = {} # Running bulk tasks
         self._bulk_active_progress: Dict[str, int] = defaultdict(int) # Tracks current size per URL {url: downloaded_bytes}
         self._bulk_total_downloaded_size: int = 0 # Separate counter for total size for efficiency
+        self._bulk_counts_bytes: bool = False
+        self._bulk_start_time: float = 0.0
+        self._bulk_total_size: int = 0 # Bytes expected from prefetched metadata
         self._downloaded_count: int = 0
+        self._job_id: Optional[str] = None # Job recorded in the job store by the running bulk download
+        self._tuner: Optional[ConcurrencyController] = None # Controller of the running auto bulk download
+        self._worker_state = threading.local() # Outcome and request start of the current task of each worker thread
         self._total_download_count: int = 0
         self._failure_count: int = 0
         self._success_count: int = 0
         self._skip_count: int = 0
 
+        self.bandwidth_limiter: BandwidthLimiter = BandwidthLimiter()
+        """Global and per-host byte rate limits, can be changed while a download is running"""
+
+        self.aggregate_report: bool = False
+        """Whether the report shows totals per status, host and type instead of a row per file, using bounded memory"""
+
+        self.concurrency_controller: Optional[ConcurrencyController] = None
+        """
+        Tunes the number of downloads in flight of bulk downloads started with parallel="auto" (a default one is
+        created on first use). Its limit carries over to the next run, and its history shows the decisions made.
+        """
+
+        self.bulk_queue_size: int = 10000
+        """Maximum number of bulk tasks read ahead of the workers, keeping memory flat for inputs of any size"""
+
         self.display_report: bool = True
         """Whether to display the download report after the download is complete"""
 
+        self.durability_policy: DurabilityPolicy = DurabilityPolicy()
+        """Whether downloaded files are synced to disk when they are renamed into place, one by one or in batches"""
+
         self.force_download: bool = False
         """Whether to force the download even if the file already exists"""
 
+        self.job_store: Optional[DownloadJobStore] = None
+        """Database recording every bulk task, so an interrupted bulk download can be continued with resume_job()"""
+
+        self.hash_algorithm: Optional[str] = None
+        """hashlib algorithm computed while downloading, used for expected hashes without an algorithm prefix"""
+
+        self.hedge_policy: Optional[HedgePolicy] = None
+        """When a download with mirrors races a mirror that is slow to respond against the next one"""
+
+        self.max_connections: int = 100
+        """Upper limit of open connections across all hosts during bulk downloads"""
+
+        self.max_requeues: int = 2
+        """
+        Number of times a bulk task whose transfer stalled (see timeout_policy) is put back at the end of the queue,
+        continuing from its .part file once the other tasks had their turn
+        """
+
+        self.max_downloads_per_host: int = 0
+        """Maximum number of bulk downloads in flight for a single host (0 for no limit besides parallel)"""
+
         self.progress: Optional[ColorfulProgress] = None
         """The active progress bar instance"""
 
+        self.pipeline: Optional[DownloadPipeline] = None
+        """Processing stages run on every downloaded file while the next files download, shown in the report"""
+
+        self.process_count: int = 1
+        """
+        Number of processes sharing a bulk download, each running parallel workers, for runs of many small files
+        that are limited by the CPU. The processes send batched results, so listeners of this tool only receive
+        per-download events with a single process. Rate and connection limits are split between the processes.
+        cancel() and set_priority() aren't supported with more than one process.
+        """
+
+        self.prefetch_metadata: bool = False
+        """Whether bulk downloads resolve all file sizes with HEAD requests first, for byte-based progress and ETA"""
+
+        self.prefetch_parallel: int = 16
+        """Number of concurrent metadata requests made by the prefetch phase"""
+
+        self.progress_policy: ProgressPolicy = ProgressPolicy()
+        """How often each download reports progress, bounding the event volume of bulk downloads"""
+
+        self.report_path: Optional[str] = None
+        """File receiving a record of every download as JSON lines, or as CSV if the path ends with .csv"""
+
+        self.report_top_n: int = 10
+        """Number of hosts, types, slowest and largest files listed by the aggregated report"""
+
+        self.scheduler: Optional[DownloadScheduler] = None
+        """The active bulk download scheduler, use it to change per-host limits during a run"""
+
+        self.scheduling_policy: SchedulingPolicy = SchedulingPolicy.HOST_ROUND_ROBIN
+        """Order in which bulk downloads start. Size-based policies need prefetch_metadata to know the sizes."""
+
+        self.skip_known_files: bool = False
+        """
+        Whether downloads are skipped without a request when the file named by the prefetched metadata, the manifest
+        or the URL path already exists. Only enable it for URLs whose path names the file.
+        """
+
+        self.use_directory_index: bool = False
+        """
+        Whether each run reads the output directories once with scandir and answers existence checks from memory,
+        instead of a stat call per file, for large directories on network filesystems
+        """
+
+        self.use_manifest: bool = False
+        """Whether to keep a validator manifest in each output directory and only re-download changed files"""
+
+        self.segment_count: int = 1
+        """Number of concurrent byte-range connections per large file (1 disables segmented downloads)"""
+
+        self.staging_directory: Optional[str] = None
+        """Directory on the output's filesystem receiving running downloads (None keeps them next to their file)"""
+
+        self.timeout_policy: TimeoutPolicy = TimeoutPolicy()
+        """Connect, read and total timeouts and the minimum throughput of every download"""
+
+        self.write_behind: bool = False
+        """Whether files are written on background threads, for slow or network-attached storage"""
+
         self._load_color_scheme()
 
     # --- Public Download Methods ---
 
-    def download(self, url: str, output_path: str):
+    def download(self, url: str, output_path: str, expected_hash: Optional[str] = None,
+                 mirrors: Optional[List[str]] = None):
         """
         Download a single file to a specified directory with progress.
 
         Args:
             url: The URL to download.
             output_path: The output directory.
+            expected_hash: Digest the file must match, e.g. 'sha256:9f86d0...'. Mismatches are reported as failures.
+            mirrors: Other URLs serving the same file, used for failover and hedged requests.
         """
         self._reset_single_download_state()
-        filepath_ref = [] # Use list as mutable reference to pass into lambda
 
         downloader = Downloader()
-        downloader.force_download = self.force_download
+        self._configure_downloader(downloader)
         # Add event listeners specific to this single download
-        # Using lambdas captures the current state (downloader, filepath_ref)
         start_id = downloader.add_event(DownloadEventType.STARTED,
-                                  lambda event: self._on_download_start(event, filepath_ref))
+                                  lambda event: self._on_download_start(event))
         prog_id = downloader.add_event(DownloadEventType.PROGRESS,
                                  lambda event: self._on_download_progress(event))
         comp_id = downloader.add_event(DownloadEventType.COMPLETED,
@@ -100,21 +233,16 @@ class DownloaderTool(EventListener):
                                  lambda event: self._on_download_skip(event))
 
         try:
-            downloader.download(url, output_path)
+            downloader.download(url, output_path, expected_hash, mirrors)
         except KeyboardInterrupt:
             if self.progress:
                 self.progress.terminate() # Use terminate for abrupt stop
             downloader.close() # Signal downloader to stop
-            Printer.warning(f"{os.linesep}Keyboard interrupt detected. Cleaning up...")
-            # Attempt cleanup only if filepath was captured
-            if filepath_ref and os.path.exists(filepath_ref[0]):
-                try:
-                    os.remove(filepath_ref[0])
-                    Printer.info(f"Removed partial file: {filepath_ref[0]}")
-                except OSError as e:
-                    Printer.error(f"Could not remove partial file {filepath_ref[0]}: {e}")
+            # The bytes went to the .part file, which is kept with its journal so the next run continues it.
+            # The file under the final name is a complete earlier download (force_download) and stays as well.
+            Printer.warning(f"{os.linesep}Keyboard interrupt detected. The partial download is kept for resuming.")
             # Manually add failure report for interrupted download
-            self._report_data.append(_DownloadReport("", 0, ReportReason.FAILED, url))
+            self._add_report("", 0, ReportReason.FAILED, url, failure_reason="Interrupted")
         finally:
             # Ensure progress bar stops if it was started
             if self.progress and self.progress._active:
@@ -127,50 +255,125 @@ class DownloaderTool(EventListener):
             downloader.remove_event(comp_id)
             downloader.remove_event(fail_id)
             downloader.remove_event(skip_id)
+            downloader.connection_pool.close()
+            downloader.save_manifests()
+            downloader.durability_policy.flush()
+            self._close_report_writer()
+            self._join_pipeline()
 
-        if self.display_report and self._report_data:
+        if self.display_report and self._has_report_activity():
             self._print_report()
 
-    def download_bulk(self, urls: Union[List[str], List[Tuple[str, str]]],
-                      output_path: Optional[str] = None, parallel: int = 4):
+    def download_bulk(self, urls: Iterable[Union[str, Tuple[str, str], DownloadTask]],
+                      output_path: Optional[str] = None, parallel: Union[int, str] = 4,
+                      expected_hashes: Optional[Dict[str, str]] = None,
+                      job_id: Optional[str] = None) -> Optional[str]:
         """
-        Download a list of files concurrently.
+        Download many files concurrently.
+        The input is consumed lazily through a bounded queue (see bulk_queue_size), so generators and
+        DownloadTaskReader streams of any length can be passed without materializing them.
 
         Args:
-            urls: A list of URLs, or a list of (url, output_path) tuples.
-            output_path: The common output directory if urls is a list of strings.
-                         Required in that case. Ignored if urls is list of tuples.
-            parallel: Number of parallel download workers.
+            urls: An iterable of URLs, (url, output_path) tuples or DownloadTask objects (they may be mixed).
+            output_path: The common output directory for plain URLs. Required if the input has any.
+            parallel: Number of parallel download workers, or "auto" to let concurrency_controller adjust it.
+            expected_hashes: Digests keyed by URL that the downloaded files must match.
+            job_id: Id of the job recorded in job_store, a new one is generated if not given.
+
+        Returns:
+            The id of the job recorded in job_store, or None without a job store.
         """
-        if not urls:
+        if isinstance(urls, Sized) and len(urls) == 0:
             Printer.warning("No URLs provided for bulk download.")
-            return
+            return None
+        if self.job_store is not None:
+            job_id = self.job_store.create_job(job_id)
+        self._execute_bulk_download(self._iter_bulk_tasks(urls, output_path, expected_hashes), parallel, job_id)
+        return job_id
 
-        if isinstance(urls[0], tuple):
-            # Input is List[Tuple[str, str]]
-            download_tasks = list(set(urls)) # Remove duplicate url/path pairs
-            self._execute_bulk_download(download_tasks, parallel)
-        elif isinstance(urls[0], str):
-            # Input is List[str]
-            if output_path is None:
-                raise ValueError("output_path must be specified when providing a list of URLs.")
-            # Convert List[str] to List[Tuple[str, str]]
-            download_tasks = list(set([(url, output_path) for url in urls])) # Remove duplicate urls
-            self._execute_bulk_download(download_tasks, parallel)
-        else:
-            raise TypeError("Unsupported format for 'urls'. Expected List[str] or List[Tuple[str, str]].")
+    def resume_job(self, job_id: str, parallel: Union[int, str] = 4, retry_failed: bool = True):
+        """
+        Continues a bulk download recorded in job_store, e.g. after a crash.
+        Tasks that were in flight are downloaded again (partial files are resumed), finished ones are not requested.
+
+        Args:
+            job_id: The id returned by download_bulk.
+            parallel: Number of parallel download workers, or "auto" to let concurrency_controller adjust it.
+            retry_failed: Whether tasks that failed are retried as well.
+        """
+        if self.job_store is None:
+            raise ValueError("job_store must be set to resume a job.")
+        if not self.job_store.has_job(job_id):
+            raise ValueError(f"Unknown job: {job_id}")
+        states = [TaskState.IN_FLIGHT, TaskState.FAILED] if retry_failed else [TaskState.IN_FLIGHT]
+        self.job_store.reset_tasks(job_id, states)
+        self._execute_bulk_download(self.job_store.iter_tasks(job_id, [TaskState.PENDING]), parallel, job_id)
+
+    def cancel(self, url: Optional[str] = None) -> bool:
+        """
+        Cancels the downloads of a URL in the running bulk download, or the whole bulk download if url is None.
+        Queued tasks are dropped and stay pending in job_store. Running ones have their connections shut down,
+        so they stop at once instead of when the next read returns, and are reported as failed with their .part
+        file kept. Returns False if nothing was cancelled.
+        Raises NotImplementedError with process_count > 1, the queues and downloads are in the shard processes.
+        """
+        self._check_not_sharded("cancel")
+        scheduler = self.scheduler
+        if scheduler is None:
+            return False
+        with self._bulk_progress_lock:
+            if url is None:
+                self._bulk_cancelled = True # Also cancels tasks taken from the scheduler but not registered yet
+                scheduler.cancel()
+                removed = 0
+            else:
+                removed = scheduler.remove_url(url)
+                self._total_download_count -= removed
+            tokens = [token for task, token in self._cancel_tokens.values() if url is None or task.url == url]
+        for token in tokens:
+            token.cancel()
+        return url is None or removed > 0 or len(tokens) > 0
+
+    def set_priority(self, url: str, priority: int) -> bool:
+        """
+        Changes the priority of a queued bulk download. Higher priorities start first.
+        Returns False if the URL isn't waiting in the queue of a running bulk download.
+        Raises NotImplementedError with process_count > 1, the queues are in the shard processes.
+        """
+        self._check_not_sharded("set_priority")
+        scheduler = self.scheduler
+        return scheduler is not None and scheduler.set_url_priority(url, priority) > 0
 
     # --- Private Helper Methods ---
 
-    def _execute_bulk_download(self, tasks: List[Tuple[str, str]], parallel: int):
+    def _check_not_sharded(self, operation: str):
+        if self.process_count > 1:
+            raise NotImplementedError(f"{operation}() isn't supported with process_count > 1.")
+
+    def _execute_bulk_download(self, tasks: Iterable[DownloadTask], parallel: Union[int, str],
+                               job_id: Optional[str] = None):
         """Internal method to perform the actual bulk download."""
-        self._reset_bulk_download_state(len(tasks))
-        self.progress = ColorfulProgress(start=0, end=self._total_download_count, value=0)
-        self._configure_progress()
-        self.progress.start()
+        if parallel == "auto":
+            if self.process_count > 1:
+                raise ValueError("parallel='auto' is not supported with process_count > 1.")
+            if self.concurrency_controller is None:
+                self.concurrency_controller = ConcurrencyController()
+            self._tuner = self.concurrency_controller
+            parallel = self._tuner.max_limit # Idle workers wait for a slot of the controller
+        elif not isinstance(parallel, int) or parallel < 1:
+            raise ValueError(f"parallel must be a positive integer or 'auto', got {parallel!r}")
+        if self.process_count > 1:
+            self._execute_sharded_bulk_download(tasks, parallel, job_id)
+            return
+        self._reset_bulk_download_state(0) # Counted while the input is fed to the scheduler
+        self._job_id = job_id
 
         downloader = Downloader() # Single downloader instance for all threads
-        downloader.force_download = self.force_download
+        self._configure_downloader(downloader)
+        # Size the per-host pool so every worker (and each of its segments) keeps its own connection alive
+        pool_size = parallel * max(self.segment_count, 1)
+        downloader.connection_pool = ConnectionPool(pool_size_per_host=pool_size,
+                                                    max_connections=max(pool_size, self.max_connections))
         # Add event listeners ONCE for the shared downloader
         start_id = downloader.add_event(DownloadEventType.STARTED, self._on_bulk_download_start)
         prog_id = downloader.add_event(DownloadEventType.PROGRESS, self._on_bulk_download_progress)
@@ -178,38 +381,31 @@ class DownloaderTool(EventListener):
         fail_id = downloader.add_event(DownloadEventType.FAILED, self._on_bulk_download_failed)
         skip_id = downloader.add_event(DownloadEventType.SKIPPED, self._on_bulk_download_skip)
 
+        # With prefetched sizes the bar counts bytes, otherwise it counts finished files
+        self._bulk_counts_bytes = self.prefetch_metadata
+        self.progress = ColorfulProgress(start=0, end=1, value=0) # The end grows while tasks are fed
+        self._configure_progress()
+        self._bulk_start_time = time.monotonic()
+        self.progress.start()
+
+        self.scheduler = DownloadScheduler(self.max_downloads_per_host, self.scheduling_policy, self.bulk_queue_size)
+        self.scheduler.max_requeues = self.max_requeues
+        feeder_errors: List[BaseException] = []
+        feeder = threading.Thread(target=self._feed_bulk_tasks, args=(downloader, self.scheduler, tasks, feeder_errors),
+                                  name="mizue-bulk-feeder", daemon=True)
+        feeder.start()
+
         try:
             with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
-                futures = [executor.submit(downloader.download, url, path) for url, path in tasks]
+                # Each worker keeps pulling from the scheduler, which skips hosts that are at their limit
+                futures = [executor.submit(self._run_bulk_worker, downloader, self.scheduler) for _ in range(parallel)]
                 try:
-                    # Process futures as they complete
                     for future in concurrent.futures.as_completed(futures):
-                        # Result retrieval can re-raise exceptions from the download task
-                        try:
-                             future.result() # Check for exceptions raised within the download task itself
-                        except Exception as exc:
-                             # This exception likely already triggered a FAILED event via the downloader,
-                             # but log it here for visibility if it wasn't caught/reported by downloader.
-                             # Avoid double-counting failure if FAILED event was already processed.
-                             # TODO: Need a way to correlate future exception with failure event if needed.
-                             Printer.error(f"Error during download future execution: {exc}")
-                             # Consider incrementing failure count here ONLY if not already counted by event? Risky.
-
-                        # Update overall progress after each task finishes (success, fail, or skip)
-                        # Use lock for counter updates
-                        with self._bulk_progress_lock:
-                            self._downloaded_count += 1
-                            current_info_text = self._get_bulk_progress_info() # Get latest info
-                        if self.progress: # Ensure progress exists
-                            self.progress.update_value(self._downloaded_count)
-                            self.progress.info_text = current_info_text
-
+                        future.result()
                 except KeyboardInterrupt:
                     Printer.warning(f"{os.linesep}Keyboard interrupt detected during bulk download. Cancelling...")
-                    # Cancel pending futures - Downloader's _alive flag should handle running ones
-                    for f in futures:
-                        f.cancel()
-                    downloader.close() # Signal running downloads to stop
+                    self.scheduler.cancel() # Drop pending tasks
+                    downloader.close() # Shuts the connections of running downloads down, so they stop at once
                     executor.shutdown(wait=False, cancel_futures=True) # Force shutdown
                     if self.progress:
                         self.progress.terminate() # Abrupt stop for progress bar
@@ -218,7 +414,8 @@ class DownloaderTool(EventListener):
         finally:
             # Ensure progress stops gracefully if not already terminated
             if self.progress and self.progress._active:
-                self.progress.update_value(self._downloaded_count) # Final update
+                self.progress.update_value(max(self._bulk_total_size if self._bulk_counts_bytes
+                                               else self._downloaded_count, 1)) # Final update
                 self.progress.stop()
             self.progress = None # Clear progress instance
 
@@ -228,23 +425,327 @@ class DownloaderTool(EventListener):
             downloader.remove_event(comp_id)
             downloader.remove_event(fail_id)
             downloader.remove_event(skip_id)
+            downloader.connection_pool.close()
+            downloader.save_manifests()
+            downloader.durability_policy.flush()
+            self.scheduler.cancel() # Releases the feeder if the workers stopped before the input was consumed
+            self.scheduler = None
+            self._tuner = None
+            self._close_report_writer()
+            self._join_pipeline()
+            if self._job_id is not None:
+                self.job_store.flush()
+                self._job_id = None
+
+            if self.display_report and self._has_report_activity():
+                self._print_report()
+
+        feeder.join()
+        if feeder_errors:
+            raise feeder_errors[0] # Invalid input, e.g. plain URLs without an output_path
+
+    def _execute_sharded_bulk_download(self, tasks: Iterable[DownloadTask], parallel: int, job_id: Optional[str]):
+        """Performs a bulk download in process_count processes, keeping the progress bar and report in this one."""
+        self._reset_bulk_download_state(0)
+        self._job_id = job_id
+
+        context = multiprocessing.get_context()
+        task_queue = context.Queue(maxsize=max(self.bulk_queue_size, 1))
+        result_queue = context.Queue()
+        processes = [context.Process(target=self._create_shard(shard_id, parallel).run,
+                                     args=(task_queue, result_queue), name=f"mizue-shard-{shard_id}", daemon=True)
+                     for shard_id in range(self.process_count)]
+        for process in processes:
+            process.start()
+
+        downloader = Downloader() # Only used here for prefetching metadata
+        configure_downloader(downloader, self)
+        self._bulk_counts_bytes = self.prefetch_metadata
+        self.progress = ColorfulProgress(start=0, end=1, value=0)
+        self._configure_progress()
+        self._bulk_start_time = time.monotonic()
+        self.progress.start()
 
-            if self.display_report and self._report_data:
+        shard_queue = DownloadShardQueue(task_queue, self.process_count)
+        feeder_errors: List[BaseException] = []
+        feeder = threading.Thread(target=self._feed_bulk_tasks, args=(downloader, shard_queue, tasks, feeder_errors),
+                                  name="mizue-bulk-feeder", daemon=True)
+        feeder.start()
+
+        try:
+            finished_shards = set()
+            while len(finished_shards) < len(processes):
+                try:
+                    result: DownloadShardResult = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # A shard that died without a final result would otherwise be waited for forever
+                    finished_shards.update(shard_id for shard_id, process in enumerate(processes)
+                                           if not process.is_alive() and process.exitcode != 0)
+                    continue
+                self._apply_shard_result(result)
+                if result.finished:
+                    finished_shards.add(result.shard_id)
+        except KeyboardInterrupt:
+            Printer.warning(f"{os.linesep}Keyboard interrupt detected during bulk download. Cancelling...")
+            shard_queue.cancel()
+            for process in processes:
+                process.terminate()
+            if self.progress:
+                self.progress.terminate()
+        finally:
+            if self.progress and self.progress._active:
+                self.progress.update_value(max(self._bulk_total_size if self._bulk_counts_bytes
+                                               else self._downloaded_count, 1))
+                self.progress.stop()
+            self.progress = None
+
+            shard_queue.cancel() # Releases the feeder if the shards stopped before the input was consumed
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            downloader.connection_pool.close()
+            self._close_report_writer()
+            self._join_pipeline()
+            if self._job_id is not None:
+                self.job_store.flush()
+                self._job_id = None
+
+            if self.display_report and self._has_report_activity():
                 self._print_report()
 
+        feeder.join()
+        if feeder_errors:
+            raise feeder_errors[0]
+
+    def _configure_downloader(self, downloader: Downloader):
+        """Applies the settings of the tool to a downloader of this process."""
+        configure_downloader(downloader, self)
+        downloader.bandwidth_limiter = self.bandwidth_limiter
+        downloader.pipeline = self.pipeline
+
+    def _create_shard(self, shard_id: int, parallel: int) -> DownloadShard:
+        shard = DownloadShard(shard_id, parallel)
+        shard.durability_policy = self.durability_policy
+        shard.force_download = self.force_download
+        if self.bandwidth_limiter.global_rate:
+            shard.global_rate = self.bandwidth_limiter.global_rate / self.process_count
+        shard.hash_algorithm = self.hash_algorithm
+        shard.hedge_policy = self.hedge_policy
+        shard.host_rates = {host: rate / self.process_count for host, rate in self.bandwidth_limiter.host_rates.items()}
+        shard.max_connections = max(self.max_connections // self.process_count, 1)
+        if self.max_downloads_per_host > 0:
+            shard.max_per_host = math.ceil(self.max_downloads_per_host / self.process_count)
+        shard.progress_policy = self.progress_policy
+        shard.report_interval = self.progress_policy.interval or 0.1
+        shard.scheduling_policy = self.scheduling_policy
+        shard.max_requeues = self.max_requeues
+        shard.segment_count = self.segment_count
+        shard.skip_known_files = self.skip_known_files
+        shard.staging_directory = self.staging_directory
+        shard.timeout_policy = self.timeout_policy
+        shard.use_directory_index = self.use_directory_index
+        shard.use_manifest = self.use_manifest
+        shard.write_behind = self.write_behind
+        return shard
+
+    def _apply_shard_result(self, result: DownloadShardResult):
+        """Adds the byte delta and the finished downloads of a shard to the progress and the report."""
+        with self._bulk_progress_lock:
+            self._bulk_total_downloaded_size += result.downloaded
+            for record in result.records:
+                reason = self._REPORT_REASONS[record.status]
+                if reason == ReportReason.COMPLETED:
+                    self._success_count += 1
+                elif reason == ReportReason.FAILED:
+                    self._failure_count += 1
+                else:
+                    self._skip_count += 1
+                self._downloaded_count += 1
+                self._add_report(record.filename, record.filesize, reason, record.url, record.status_code,
+                                 record.reason, record.duration)
+                if self._job_id is not None:
+                    state = TaskState.FAILED if reason == ReportReason.FAILED else TaskState.DONE
+                    self.job_store.mark_finished(self._job_id, DownloadTask(record.url, record.output_path), state,
+                                                 record.filesize, record.etag, record.last_modified, record.reason)
+            current_info_text = self._get_bulk_progress_info()
+        if self.progress:
+            if self._bulk_counts_bytes:
+                self.progress.update_value(min(self._bulk_total_downloaded_size, self._bulk_total_size))
+            else:
+                self.progress.update_value(self._downloaded_count)
+            self.progress.info_text = current_info_text
+        if self.pipeline is not None:
+            # Files of the shards are processed here, the submit waits while the stages are full
+            for record in result.records:
+                if record.status == DownloadEventType.COMPLETED:
+                    self.pipeline.submit(os.path.join(record.output_path, record.filename), record.url)
+
+    def _feed_bulk_tasks(self, downloader: Downloader, scheduler: Union[DownloadScheduler, DownloadShardQueue],
+                         tasks: Iterable[DownloadTask], errors: List[BaseException]):
+        """
+        Moves tasks from the input into the scheduler, skipping duplicates and blocking while its queue is full.
+        With prefetch_metadata the sizes of each batch are resolved before it is queued (runs in feeder thread).
+        """
+        deduplicator = TaskDeduplicator()
+        iterator = iter(tasks)
+        batch_size = max(self.prefetch_parallel * 4, 1) if self._bulk_counts_bytes else 1
+        # Shard processes download with their own Downloader, which would never take the cached entries
+        cache_metadata = not isinstance(scheduler, DownloadShardQueue)
+        try:
+            while True:
+                chunk = list(itertools.islice(iterator, batch_size))
+                if not chunk:
+                    return
+                batch = []
+                for task in chunk:
+                    if deduplicator.add(task.url, task.output_path) or self._is_fingerprint_collision(task, batch):
+                        batch.append(task)
+                if self._job_id is not None:
+                    self.job_store.add_tasks(self._job_id, batch) # Existing tasks of a resumed job are kept as is
+                added_size = 0
+                if self._bulk_counts_bytes and batch:
+                    metadata = downloader.prefetch_metadata([(task.url, task.output_path) for task in batch],
+                                                            self.prefetch_parallel, cache_metadata)
+                    for task in batch:
+                        entry = metadata.get((task.url, task.output_path))
+                        if task.size is None and entry is not None and entry.filesize > 0:
+                            task.size = entry.filesize
+                    added_size = self._get_bulk_total_size(downloader, metadata)
+                with self._bulk_progress_lock:
+                    self._total_download_count += len(batch)
+                    self._bulk_total_size += added_size
+                if self.progress:
+                    self.progress.set_end_value(max(self._bulk_total_size if self._bulk_counts_bytes
+                                                    else self._total_download_count, 1))
+                for task in batch:
+                    if not scheduler.add(task):
+                        return # Cancelled
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            scheduler.close()
+
+    def _is_fingerprint_collision(self, task: DownloadTask, batch: List[DownloadTask]) -> bool:
+        """
+        Checks a task the deduplicator took for a duplicate against the exact pairs recorded in the job store.
+        Without a job store a collision can't be told apart from a duplicate and the task is dropped.
+        Resumed jobs read their tasks back from the store, so a collision among them isn't found either.
+        """
+        if self._job_id is None:
+            return False
+        if any(queued.url == task.url and queued.output_path == task.output_path for queued in batch):
+            return False # Not in the store yet, the batch is added after it's complete
+        if self.job_store.has_task(self._job_id, task.url, task.output_path):
+            return False
+        Printer.warning(f"{os.linesep}Task fingerprint collision, queuing {task.url} although it looked like "
+                        f"a duplicate.")
+        return True
+
+    @staticmethod
+    def _iter_bulk_tasks(urls: Iterable[Union[str, Tuple[str, str], DownloadTask]], output_path: Optional[str],
+                         expected_hashes: Optional[Dict[str, str]]) -> Iterator[DownloadTask]:
+        """Turns the items of a bulk input into tasks as they are consumed."""
+        for item in urls:
+            if isinstance(item, DownloadTask):
+                task = item
+            elif isinstance(item, tuple):
+                task = DownloadTask(item[0], item[1])
+            elif isinstance(item, str):
+                if output_path is None:
+                    raise ValueError("output_path must be specified when providing a list of URLs.")
+                task = DownloadTask(item, output_path)
+            else:
+                raise TypeError("Unsupported item in 'urls'. Expected str, (url, output_path) tuples or DownloadTask.")
+            if expected_hashes and task.expected_hash is None:
+                task.expected_hash = expected_hashes.get(task.url)
+            yield task
+
+    def _run_bulk_worker(self, downloader: Downloader, scheduler: DownloadScheduler):
+        """Downloads scheduler tasks until none are left (runs in worker thread)."""
+        tuner = self._tuner
+        while True:
+            if tuner is not None:
+                tuner.acquire() # Taken before the task, so queued tasks stay reorderable while workers wait
+            task = scheduler.get()
+            if task is None:
+                if tuner is not None:
+                    tuner.release()
+                return
+            job_id = self._job_id
+            if job_id is not None:
+                self._worker_state.outcome = None
+                self.job_store.mark_in_flight(job_id, task)
+            self._worker_state.request_start = time.monotonic()
+            self._worker_state.requeued = False
+            self._worker_state.task = task
+            token = CancellationToken()
+            with self._bulk_progress_lock:
+                self._cancel_tokens[id(token)] = (task, token)
+                if self._bulk_cancelled:
+                    token.cancel()
+            try:
+                downloader.download(task.url, task.output_path, task.expected_hash, task.mirrors, token)
+            except Exception as exc:
+                # Downloader reports its own failures through events, so this is an unexpected error
+                Printer.error(f"Error during download execution: {exc}")
+                self._worker_state.outcome = (TaskState.FAILED, 0, None, None, str(exc))
+                if tuner is not None:
+                    tuner.record_result(False)
+            finally:
+                self._worker_state.task = None
+                with self._bulk_progress_lock:
+                    del self._cancel_tokens[id(token)]
+                scheduler.task_done(task)
+                if tuner is not None:
+                    tuner.release()
+            if self._worker_state.requeued:
+                continue # The task is back in the queue and finishes later
+            if job_id is not None:
+                # Without an outcome the download was cut short, so the task stays in flight for resume_job
+                outcome = self._worker_state.outcome
+                if outcome is not None:
+                    self.job_store.mark_finished(job_id, task, *outcome)
+
+            # Update overall progress after each task finishes (success, fail, or skip)
+            with self._bulk_progress_lock:
+                self._downloaded_count += 1
+                current_info_text = self._get_bulk_progress_info() # Get latest info
+            if self.progress: # Ensure progress exists
+                if not self._bulk_counts_bytes:
+                    self.progress.update_value(self._downloaded_count)
+                self.progress.info_text = current_info_text
+
+
+    def _get_bulk_total_size(self, downloader: Downloader, metadata: Dict[Tuple[str, str], DownloadMetadata]) -> int:
+        """
+        Returns the bytes left to download according to the prefetched metadata.
+        Files that will be skipped because they already exist don't count towards the total. They are looked up
+        in the downloader's directory index when there is one, like its skip checks do.
+        """
+        index = downloader.directory_index
+        exists = index.contains if index is not None else os.path.exists
+        total_size = 0
+        for entry in metadata.values():
+            if self.force_download or self.use_manifest or not exists(entry.filepath):
+                total_size += entry.filesize
+        return total_size
 
     def _reset_single_download_state(self):
         """Reset state specific to single downloads."""
-        self._report_data = [] # Clear previous report
+        self._reset_report_state()
         # Reset single progress bar if necessary (or handle in download method)
         if self.progress:
             self.progress = None
 
     def _reset_bulk_download_state(self, total_tasks: int):
         """Reset state before starting a new bulk download."""
-        self._report_data = []
+        self._reset_report_state()
         self._bulk_active_progress.clear()
+        self._bulk_cancelled = False
         self._bulk_total_downloaded_size = 0
+        self._bulk_counts_bytes = False
+        self._bulk_total_size = 0
         self._downloaded_count = 0
         self._total_download_count = total_tasks
         self._failure_count = 0
@@ -253,6 +754,45 @@ class DownloaderTool(EventListener):
         if self.progress:
             self.progress = None
 
+    def _reset_report_state(self):
+        self._report_data = []
+        self._report_statistics = DownloadStatistics(self.report_top_n)
+        self._report_writer = DownloadRecordWriter(self.report_path) if self.report_path else None
+        self._start_times.clear()
+
+    def _close_report_writer(self):
+        if self._report_writer is not None:
+            self._report_writer.close()
+            self._report_writer = None
+
+    def _add_report(self, filename: str, filesize: int, reason: ReportReason, url: str,
+                    status_code: Optional[int] = None, failure_reason: Optional[str] = None,
+                    duration: Optional[float] = None):
+        """Adds a finished download to the report (bulk handlers must hold the lock)."""
+        start_time = self._start_times.pop(url, None)
+        if not self.aggregate_report:
+            self._report_data.append(_DownloadReport(filename, filesize, reason, url))
+            if self._report_writer is None:
+                return
+        if duration is None:
+            duration = time.monotonic() - start_time if start_time is not None else 0.0
+        record = DownloadRecord(duration=duration,
+                                filename=filename, reason=failure_reason, size=filesize,
+                                status=self._REPORT_EVENT_TYPES[reason], status_code=status_code, url=url)
+        if self.aggregate_report:
+            self._report_statistics.add(record)
+        if self._report_writer is not None:
+            self._report_writer.write(record)
+
+    def _join_pipeline(self):
+        """Waits for the processing stages to finish the downloaded files."""
+        if self.pipeline is not None and self.pipeline.pending_count > 0:
+            Printer.info(f"{os.linesep}Processing {self.pipeline.pending_count} downloaded files...")
+            self.pipeline.join()
+
+    def _has_report_activity(self) -> bool:
+        return bool(self._report_data) or self._report_statistics.total_count > 0
+
     def _load_color_scheme(self):
         """Loads file extension color mapping from JSON."""
         try:
@@ -286,7 +826,7 @@ class DownloaderTool(EventListener):
 
     # --- Event Handlers for Single Download ---
 
-    def _on_download_start(self, event: DownloadStartEvent, filepath_ref: List[str]):
+    def _on_download_start(self, event: DownloadStartEvent):
         """Callback for single download start."""
         # Create progress bar only when download actually starts
         if not self.progress:
@@ -297,8 +837,7 @@ class DownloaderTool(EventListener):
              self.progress.set_end_value(event.filesize if event.filesize > 0 else 1)
              self.progress.update_value(0)
 
-
-        filepath_ref.append(event.filepath) # Store the actual filepath
+        self._start_times[event.url] = time.monotonic()
         self._fire_event(DownloadEventType.STARTED, event)
 
     def _on_download_progress(self, event: ProgressEventArgs):
@@ -332,7 +871,7 @@ class DownloaderTool(EventListener):
             # Don't stop the progress bar here, let the finally block in download() handle it
             # time.sleep(0.5) # Avoid sleep in callback
             # self.progress.stop()
-        self._report_data.append(_DownloadReport(event.filename, event.filesize, ReportReason.COMPLETED, event.url))
+        self._add_report(event.filename, event.filesize, ReportReason.COMPLETED, event.url)
         self._fire_event(DownloadEventType.COMPLETED, event)
 
     def _on_download_failure(self, event: DownloadFailureEvent):
@@ -342,7 +881,7 @@ class DownloaderTool(EventListener):
             self.progress.terminate()
         # Use URL if filename is not available (e.g., error before metadata)
         filename_or_url = event.filepath if event.filepath else event.url # Prefer filepath if known
-        self._report_data.append(_DownloadReport(filename_or_url, 0, ReportReason.FAILED, event.url))
+        self._add_report(filename_or_url, 0, ReportReason.FAILED, event.url, event.status_code, event.reason)
         self._fire_event(DownloadEventType.FAILED, event)
 
     def _on_download_skip(self, event: DownloadSkipEvent):
@@ -350,7 +889,7 @@ class DownloaderTool(EventListener):
         # Stop progress bar if it was somehow started for a skipped file
         if self.progress:
             self.progress.stop()
-        self._report_data.append(_DownloadReport(event.filename, 0, ReportReason.SKIPPED, event.url))
+        self._add_report(event.filename, 0, ReportReason.SKIPPED, event.url, failure_reason=event.reason)
         self._fire_event(DownloadEventType.SKIPPED, event)
 
 
@@ -359,6 +898,12 @@ class DownloaderTool(EventListener):
     def _on_bulk_download_start(self, event: DownloadStartEvent):
         """Callback for bulk download start (runs in worker thread)."""
         # This event isn't strictly needed for bulk progress bar, but forward it
+        now = time.monotonic()
+        with self._bulk_progress_lock:
+            self._start_times[event.url] = now
+        if self._tuner is not None:
+            # The start event fires once the response headers are in
+            self._tuner.record_first_byte(now - self._worker_state.request_start)
         self._fire_event(DownloadEventType.STARTED, event)
 
     def _on_bulk_download_progress(self, event: ProgressEventArgs):
@@ -371,40 +916,67 @@ class DownloaderTool(EventListener):
             self._bulk_total_downloaded_size += size_diff # More efficient total tracking
             # Get latest counts for info text construction
             current_info_text = self._get_bulk_progress_info()
+        if self._tuner is not None:
+            self._tuner.record_bytes(size_diff)
 
         # Update the shared progress bar (UI update, might need main thread if using GUI toolkit)
         if self.progress:
+             if self._bulk_counts_bytes:
+                 self.progress.update_value(min(self._bulk_total_downloaded_size, self._bulk_total_size))
              self.progress.info_text = current_info_text # Update info text frequently
 
         self._fire_event(DownloadEventType.PROGRESS, event)
 
     def _on_bulk_download_complete(self, event: DownloadCompleteEvent):
         """Callback for bulk download completion (runs in worker thread)."""
+        self._worker_state.outcome = (TaskState.DONE, event.filesize, event.etag, event.last_modified, None)
         with self._bulk_progress_lock:
-            self._report_data.append(_DownloadReport(event.filename, event.filesize, ReportReason.COMPLETED, event.url))
+            self._add_report(event.filename, event.filesize, ReportReason.COMPLETED, event.url)
             self._success_count += 1
             # Remove completed download from active progress tracking
             if event.url in self._bulk_active_progress:
                  # Add any remaining size difference (though should be minimal at complete)
                  # self._bulk_total_downloaded_size += event.filesize - self._bulk_active_progress[event.url]
                  del self._bulk_active_progress[event.url]
+        if self._tuner is not None:
+            self._tuner.record_result(True)
         self._fire_event(DownloadEventType.COMPLETED, event)
 
     def _on_bulk_download_failed(self, event: DownloadFailureEvent):
         """Callback for bulk download failure (runs in worker thread)."""
+        if self._requeue_stalled(event):
+            return
+        self._worker_state.outcome = (TaskState.FAILED, 0, None, None, event.reason)
         with self._bulk_progress_lock:
              filename_or_url = event.filepath if event.filepath else event.url
-             self._report_data.append(_DownloadReport(filename_or_url, 0, ReportReason.FAILED, event.url))
+             self._add_report(filename_or_url, 0, ReportReason.FAILED, event.url, event.status_code, event.reason)
              self._failure_count += 1
              # Remove failed download from active progress tracking
              if event.url in self._bulk_active_progress:
                   del self._bulk_active_progress[event.url]
+        if self._tuner is not None:
+            self._tuner.record_result(False, event.status_code)
         self._fire_event(DownloadEventType.FAILED, event)
 
+    def _requeue_stalled(self, event: DownloadFailureEvent) -> bool:
+        """Puts the task of a stalled transfer back into the queue instead of failing it (runs in worker thread)."""
+        if not isinstance(event.exception, TransferTimeoutError) or not event.exception.stalled:
+            return False
+        task = getattr(self._worker_state, "task", None)
+        scheduler = self.scheduler
+        if task is None or scheduler is None or not scheduler.requeue(task):
+            return False
+        self._worker_state.requeued = True
+        with self._bulk_progress_lock:
+            # The progress entry stays, so the bytes of the continued download aren't counted twice
+            self._start_times.pop(event.url, None)
+        return True
+
     def _on_bulk_download_skip(self, event: DownloadSkipEvent):
         """Callback for bulk download skip (runs in worker thread)."""
+        self._worker_state.outcome = (TaskState.DONE, 0, None, None, None)
         with self._bulk_progress_lock:
-            self._report_data.append(_DownloadReport(event.filename, 0, ReportReason.SKIPPED, event.url))
+            self._add_report(event.filename, 0, ReportReason.SKIPPED, event.url, failure_reason=event.reason)
             self._skip_count += 1
             # Remove skipped download from active progress tracking
             if event.url in self._bulk_active_progress:
@@ -426,8 +998,21 @@ class DownloaderTool(EventListener):
         file_progress_text = f'⟪ Files: {downloaded_str}/{self._total_download_count} ⟫'
         # Use the efficiently tracked total size
         size_text = FileUtils.get_readable_file_size(self._bulk_total_downloaded_size)
-        size_progress_text = f'⟪ Size: {size_text} ⟫'
-        return f'{file_progress_text} {size_progress_text}'
+        if self._tuner is not None:
+            file_progress_text = f'{file_progress_text} ⟪ Workers: {self._tuner.limit} ⟫'
+        if not self._bulk_counts_bytes:
+            return f'{file_progress_text} ⟪ Size: {size_text} ⟫'
+        total_text = FileUtils.get_readable_file_size(self._bulk_total_size)
+        return f'{file_progress_text} ⟪ Size: {size_text}/{total_text} ⟫ ⟪ ETA: {self._get_bulk_eta_text()} ⟫'
+
+    def _get_bulk_eta_text(self) -> str:
+        """Estimates the remaining time from the average byte rate so far (needs lock acquired outside)."""
+        elapsed = time.monotonic() - self._bulk_start_time
+        if self._bulk_total_downloaded_size <= 0 or elapsed <= 0:
+            return '--:--:--'
+        remaining = max(self._bulk_total_size - self._bulk_total_downloaded_size, 0)
+        seconds = int(remaining / (self._bulk_total_downloaded_size / elapsed))
+        return f'{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}'
 
     @staticmethod
     def _map_reason_to_event_type_text(reason: ReportReason) -> str:
@@ -495,46 +1080,46 @@ class DownloaderTool(EventListener):
 
     def _print_report(self):
         """Generates and prints the final download report grid."""
-        if not self._report_data:
+        if not self._has_report_activity():
             Printer.info("No download activity to report.")
             return
+        if self.aggregate_report:
+            self._print_aggregated_report()
+            self._print_pipeline_report()
+            return
 
         grid_data_items: list[_DownloadReportGridData] = []
         row_index = 1
-        # Process reports grouped by reason
-        for reason in [ReportReason.COMPLETED, ReportReason.FAILED, ReportReason.SKIPPED]:
-            # Access report data under lock if necessary, though reading might be okay if append is atomic
-            # For safety, copy list if worried about modification during iteration (unlikely here)
-            with self._bulk_progress_lock:
-                 reports_for_reason = [r for r in self._report_data if r.reason == reason]
-
-            for report in reports_for_reason:
-                # Determine filename/extension based on success/failure
-                if report.reason == ReportReason.COMPLETED:
-                     filename, ext = os.path.splitext(report.filename)
-                     display_name = report.filename
-                     filesize_str = FileUtils.get_readable_file_size(report.filesize)
-                else: # Failed or Skipped
-                     # Use URL for display name if filename is empty or not applicable
-                     display_name = report.filename if report.filename else report.url
-                     # Try to get extension from URL for failed/skipped if possible
-                     try:
-                          path_part = urllib.parse.urlparse(report.url).path
-                          _, ext = os.path.splitext(path_part)
-                     except Exception:
-                          ext = "" # Cannot determine extension
-                     filesize_str = "N/A" # Filesize not applicable or unknown
-
-                grid_data_items.append(
-                    _DownloadReportGridData(
-                         ext = ext[1:] if ext else "", # Remove leading dot
-                         filename_or_url = display_name,
-                         filesize_str = filesize_str,
-                         row_index = row_index,
-                         status = report.reason # Pass reason directly
-                     )
-                )
-                row_index += 1
+        # Group reports by reason with a single stable sort, completed first
+        with self._bulk_progress_lock:
+            reports = sorted(self._report_data, key=lambda r: r.reason.value)
+        for report in reports:
+            # Determine filename/extension based on success/failure
+            if report.reason == ReportReason.COMPLETED:
+                 filename, ext = os.path.splitext(report.filename)
+                 display_name = report.filename
+                 filesize_str = FileUtils.get_readable_file_size(report.filesize)
+            else: # Failed or Skipped
+                 # Use URL for display name if filename is empty or not applicable
+                 display_name = report.filename if report.filename else report.url
+                 # Try to get extension from URL for failed/skipped if possible
+                 try:
+                      path_part = urllib.parse.urlparse(report.url).path
+                      _, ext = os.path.splitext(path_part)
+                 except Exception:
+                      ext = "" # Cannot determine extension
+                 filesize_str = "N/A" # Filesize not applicable or unknown
+
+            grid_data_items.append(
+                _DownloadReportGridData(
+                     ext = ext[1:] if ext else "", # Remove leading dot
+                     filename_or_url = display_name,
+                     filesize_str = filesize_str,
+                     row_index = row_index,
+                     status = report.reason # Pass reason directly
+                 )
+            )
+            row_index += 1
 
 
         # Define Grid Columns
@@ -569,9 +1154,105 @@ class DownloaderTool(EventListener):
         print(os.linesep)
         # grid.fill_screen() # Optional: uncomment to make grid fill terminal width
         grid.print()
+        self._print_pipeline_report()
+
+    def _print_aggregated_report(self):
+        """Prints the totals of the aggregated report, whose size doesn't depend on the number of files."""
+        statistics = self._report_statistics
+        size_column = ColumnSettings(title='Size', alignment=Alignment.RIGHT, width=12,
+                                     renderer=self._report_grid_size_column_cell_renderer)
+        files_column = ColumnSettings(title='Files', alignment=Alignment.RIGHT, renderer=self._report_grid_header_renderer)
+        by_status = statistics.get_by_status()
+        status_rows = []
+        for reason, event_type in self._REPORT_EVENT_TYPES.items():
+            count, size = by_status.get(event_type, (0, 0))
+            status_rows.append([self._map_reason_to_event_type_text(reason), str(count),
+                                FileUtils.get_readable_file_size(size)])
+        self._print_report_grid("Status", [
+            ColumnSettings(title='Status', alignment=Alignment.CENTER, width=10,
+                           renderer=self._report_grid_status_column_cell_renderer), files_column, size_column
+        ], status_rows)
+
+        host_rows = [[host, str(count), FileUtils.get_readable_file_size(size)]
+                     for host, count, size in statistics.get_by_host(self.report_top_n)]
+        self._print_report_grid("Hosts", [
+            ColumnSettings(title='Host', wrap=False, renderer=self._report_grid_header_renderer), files_column, size_column
+        ], host_rows)
+
+        type_rows = [[ext, str(count), FileUtils.get_readable_file_size(size)]
+                     for ext, count, size in statistics.get_by_extension(self.report_top_n)]
+        self._print_report_grid("Types", [
+            ColumnSettings(title='Type', alignment=Alignment.CENTER, width=6,
+                           renderer=self._report_grid_file_type_column_cell_renderer), files_column, size_column
+        ], type_rows)
+
+        file_column = ColumnSettings(title='Filename', wrap=False, renderer=self._report_grid_file_column_cell_renderer)
+        largest_rows = [[os.path.basename(record.filename), FileUtils.get_readable_file_size(record.size)]
+                        for record in statistics.get_largest()]
+        self._print_report_grid("Largest files", [file_column, size_column], largest_rows)
+
+        slowest_rows = [[os.path.basename(record.filename), f"{record.duration:.2f} s",
+                         f"{FileUtils.get_readable_file_size(int(record.size / record.duration))}/s"
+                         if record.duration > 0 else "N/A"]
+                        for record in statistics.get_slowest()]
+        self._print_report_grid("Slowest files", [
+            file_column,
+            ColumnSettings(title='Time', alignment=Alignment.RIGHT, renderer=self._report_grid_header_renderer),
+            ColumnSettings(title='Speed', alignment=Alignment.RIGHT, renderer=self._report_grid_header_renderer)
+        ], slowest_rows)
+
+        failure_rows = []
+        for status_code, reasons in sorted(statistics.get_failures().items(), key=lambda item: item[0] or 0):
+            for reason, count in sorted(reasons.items(), key=lambda item: item[1], reverse=True):
+                failure_rows.append([str(status_code) if status_code is not None else "N/A", reason, str(count)])
+        self._print_report_grid("Failures", [
+            ColumnSettings(title='Code', alignment=Alignment.RIGHT, renderer=self._report_grid_header_renderer),
+            ColumnSettings(title='Reason', wrap=False, renderer=self._report_grid_header_renderer),
+            ColumnSettings(title='Count', alignment=Alignment.RIGHT, renderer=self._report_grid_header_renderer)
+        ], failure_rows)
+
+    def _print_pipeline_report(self):
+        """Prints the counts and timings of the processing stages and the failures they reported."""
+        if self.pipeline is None:
+            return
+        stage_rows = [[statistics.name, str(statistics.processed), str(statistics.failed),
+                       f"{statistics.seconds:.2f} s", f"{statistics.seconds / statistics.processed:.3f} s"]
+                      for statistics in self.pipeline.get_statistics() if statistics.processed > 0]
+        plain_column = self._create_plain_column
+        self._print_report_grid("Processing", [
+            plain_column('Stage', Alignment.LEFT), plain_column('Files'), plain_column('Failed'),
+            plain_column('Time'), plain_column('Average')
+        ], stage_rows)
+        error_rows = [[url, stage, error] for url, stage, error in self.pipeline.get_errors()[:self.report_top_n]]
+        self._print_report_grid("Processing failures", [
+            ColumnSettings(title='URL', wrap=False, renderer=self._report_grid_file_column_cell_renderer),
+            plain_column('Stage', Alignment.LEFT), plain_column('Error', Alignment.LEFT)
+        ], error_rows)
+
+    @classmethod
+    def _create_plain_column(cls, title: str, alignment: Alignment = Alignment.RIGHT) -> ColumnSettings:
+        return ColumnSettings(title=title, alignment=alignment, renderer=cls._report_grid_header_renderer)
+
+    @staticmethod
+    def _print_report_grid(title: str, columns: List[ColumnSettings], rows: List[List[str]]):
+        """Prints one titled table of the aggregated report, empty tables are left out."""
+        if not rows:
+            return
+        grid = Grid(columns, rows)
+        grid.border_style = BorderStyle.SINGLE
+        grid.border_color = '#FFCC75'
+        print(os.linesep)
+        Printer.print(title, '#FFCC75', bold=True)
+        grid.print()
 
     # --- Report Grid Cell Renderers ---
 
+    @staticmethod
+    def _report_grid_header_renderer(args: CellRendererArgs) -> str:
+        """Renderer for plain cells, only the header is colored."""
+        if args.is_header: return Colorizer.colorize(args.cell, '#FFCC75', bold=True)
+        return str(args.cell)
+
     def _report_grid_status_column_cell_renderer(self, args: CellRendererArgs) -> str:
         """Renderer for the status column cells."""
         if args.is_header: return Colorizer.colorize(args.cell, '#FFCC75', bold=True)
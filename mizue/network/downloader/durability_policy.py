@@ -0,0 +1,147 @@
+import concurrent.futures
+import errno
+import os
+import shutil
+import threading
+import uuid
+from typing import List, Optional, Tuple
+
+from .sync_mode import SyncMode
+
+
+class DurabilityPolicy:
+    """
+    Moves finished downloads from their staging path to their final path and syncs them according to the mode.
+    The rename is atomic in every mode, so readers of the output never see a partial file, and a crash never leaves
+    one behind under the final name. Syncing additionally protects against power loss, a file is only renamed
+    once its data is on disk. Batched mode makes the same guarantee as per-file mode, but files committed by
+    concurrent downloads share the wait for the disk and each of their directories is synced once per batch.
+    """
+
+    def __init__(self, mode: SyncMode = SyncMode.NONE, batch_size: int = 256, batch_interval: float = 0.0):
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[str, str, concurrent.futures.Future]] = []
+        self._thread: Optional[threading.Thread] = None
+
+        self.batch_interval: float = batch_interval
+        """
+        Seconds a batch that isn't full waits for more files in batched mode. Commits block until their batch is
+        synced, so this delays every download. With 0, the files committed while the previous batch was being synced
+        form the next one.
+        """
+
+        self.batch_size: int = batch_size
+        """Maximum number of files synced together in batched mode"""
+
+        self.mode: SyncMode = mode
+        """Whether files are synced not at all, one by one or in batches"""
+
+    def __getstate__(self):
+        # Locks and threads can't be pickled, e.g. when the policy is sent to download shards
+        return {"batch_interval": self.batch_interval, "batch_size": self.batch_size, "mode": self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of files committed in batched mode that wait for their batch"""
+        return len(self._pending)
+
+    def commit(self, staged_path: str, final_path: str):
+        """
+        Renames a finished file to its final path, syncing it according to the mode.
+        In batched mode it returns once the batch of the file has been synced and renamed.
+        """
+        if self.mode == SyncMode.BATCHED:
+            future = concurrent.futures.Future()
+            with self._condition:
+                self._pending.append((staged_path, final_path, future))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="mizue-durability", daemon=True)
+                    self._thread.start()
+                elif len(self._pending) >= self.batch_size:
+                    self._condition.notify()
+            future.result() # Raises the error of this file, if syncing or renaming it failed
+            return
+        if self.mode == SyncMode.PER_FILE:
+            self._sync_file(staged_path)
+        self._replace(staged_path, final_path, self.mode == SyncMode.PER_FILE)
+        if self.mode == SyncMode.PER_FILE:
+            self._sync_directory(os.path.dirname(os.path.abspath(final_path)))
+
+    def flush(self):
+        """Commits the files waiting for the next batch right away, without waiting for batch_interval."""
+        with self._condition:
+            batch, self._pending = self._pending, []
+        self._commit_batch(batch)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._pending and self.batch_interval > 0:
+                    self._condition.wait_for(lambda: len(self._pending) >= self.batch_size, self.batch_interval)
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                if not batch:
+                    self._thread = None
+                    return
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[Tuple[str, str, concurrent.futures.Future]]):
+        """Syncs every staged file, then renames them, then syncs each of their directories once."""
+        synced = []
+        for staged_path, final_path, future in batch:
+            try:
+                self._sync_file(staged_path)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                synced.append((staged_path, final_path, future))
+        directories = {}
+        for staged_path, final_path, future in synced:
+            try:
+                self._replace(staged_path, final_path, True)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                directories.setdefault(os.path.dirname(os.path.abspath(final_path)), []).append(future)
+        for directory, futures in directories.items():
+            try:
+                self._sync_directory(directory)
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future in futures:
+                    future.set_result(None)
+
+    def _replace(self, staged_path: str, final_path: str, sync: bool):
+        try:
+            os.replace(staged_path, final_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # The staging directory is on another filesystem, so the file is copied next to its final path first
+            temp_path = f"{final_path}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.copyfile(staged_path, temp_path)
+            if sync:
+                self._sync_file(temp_path)
+            os.replace(temp_path, final_path)
+            os.remove(staged_path)
+
+    @staticmethod
+    def _sync_directory(directory: str):
+        """Makes a rename in the directory durable. Windows has no directory handles to sync, NTFS journals renames."""
+        if os.name == "nt":
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _sync_file(path: str):
+        # Opened for writing, since Windows only flushes handles with write access
+        with open(path, "r+b") as f:
+            os.fsync(f.fileno())
@@ -0,0 +1,58 @@
+import threading
+from collections import deque
+from typing import Optional
+
+
+class HedgePolicy:
+    """
+    Decides when a download that is still waiting for its first response starts a request to its next mirror.
+    The threshold is a percentile of the time to first byte observed so far, or a fixed delay until enough
+    downloads have been observed. The first usable response is kept and the other requests are dropped.
+    """
+
+    def __init__(self, delay: float = 1.0, percentile: Optional[float] = 95.0, min_samples: int = 20,
+                 max_requests: int = 2, window: int = 1000):
+        self._delay: Optional[float] = None # Cached percentile, recomputed after new samples
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=window)
+        self._stale_samples = 0
+
+        self.delay: float = delay
+        """Seconds to wait for the first byte before hedging, used until min_samples are observed"""
+
+        self.max_requests: int = max_requests
+        """Maximum number of requests of a single download in flight at the same time"""
+
+        self.min_samples: int = min_samples
+        """Number of observed first-byte times needed before the percentile is used"""
+
+        self.percentile: Optional[float] = percentile
+        """Percentile (0-100) of the observed first-byte times after which a hedged request starts (None for delay)"""
+
+    def __getstate__(self):
+        # Locks can't be pickled, e.g. when the policy is sent to download shards
+        return {"delay": self.delay, "max_requests": self.max_requests, "min_samples": self.min_samples,
+                "percentile": self.percentile, "window": self._samples.maxlen}
+
+    def __setstate__(self, state):
+        window = state.pop("window")
+        self.__init__(window=window, **state)
+
+    def get_delay(self) -> float:
+        """Returns the seconds a request may wait for its first byte before the next mirror is requested."""
+        with self._lock:
+            if self.percentile is None or len(self._samples) < self.min_samples:
+                return self.delay
+            # Sorting the window on every download would cost more than the hedging saves on fast mirrors
+            if self._delay is None or self._stale_samples >= max(len(self._samples) // 20, 1):
+                samples = sorted(self._samples)
+                index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+                self._delay = samples[index]
+                self._stale_samples = 0
+            return self._delay
+
+    def record(self, time_to_first_byte: float):
+        """Adds the seconds a request waited for its response headers."""
+        with self._lock:
+            self._samples.append(time_to_first_byte)
+            self._stale_samples += 1
@@ -0,0 +1,30 @@
+import threading
+from typing import Optional
+
+
+class MemoryBudget:
+    """Thread-safe byte budget that blocks callers while the bytes they hold exceed a limit (None or 0 for no limit)."""
+
+    def __init__(self, limit: Optional[int] = None):
+        self._condition = threading.Condition()
+        self._used = 0
+        self.limit: Optional[int] = limit
+        """Number of bytes that may be held at the same time"""
+
+    @property
+    def used(self) -> int:
+        """Number of bytes currently held"""
+        return self._used
+
+    def acquire(self, amount: int):
+        """Blocks until the amount fits into the budget, then takes it."""
+        with self._condition:
+            # A single request larger than the limit is let through once nothing else is held, instead of blocking forever
+            while self.limit and self._used > 0 and self._used + amount > self.limit:
+                self._condition.wait()
+            self._used += amount
+
+    def release(self, amount: int):
+        with self._condition:
+            self._used -= amount
+            self._condition.notify_all()
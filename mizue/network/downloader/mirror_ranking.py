@@ -0,0 +1,70 @@
+import threading
+import urllib.parse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class MirrorRanking:
+    """
+    Orders the mirrors of a download by the throughput observed from their hosts, fastest first.
+    Hosts without observations come first, so every mirror gets measured, and failures lower a host's score.
+    A host that failed before it was ever measured ranks like the fastest measured host lowered by the penalty
+    of each failure, so it is tried again once the others fail or slow down instead of ranking last for good.
+    """
+
+    def __init__(self, smoothing: float = 0.3, failure_penalty: float = 0.5):
+        self._failures: Dict[str, int] = {} # Failures of hosts without a measured throughput
+        self._lock = threading.Lock()
+        self._throughputs: Dict[str, float] = {}
+
+        self.failure_penalty: float = failure_penalty
+        """Factor the score of a host is multiplied with when a request to it fails"""
+
+        self.smoothing: float = smoothing
+        """Weight (0-1) of the newest observation in the moving average of a host's throughput"""
+
+    def get_throughput(self, url: str) -> Optional[float]:
+        """Returns the average bytes per second observed from the URL's host, or None if it's unknown."""
+        with self._lock:
+            return self._throughputs.get(self._get_host(url))
+
+    def rank(self, urls: Iterable[str]) -> List[str]:
+        """Returns the URLs ordered by their expected throughput. URLs of equal rank keep their order."""
+        with self._lock:
+            fastest = max(self._throughputs.values(), default=None)
+            scores = {url: self._get_score(self._get_host(url), fastest) for url in urls}
+        return sorted(scores, key=lambda url: scores[url], reverse=True)
+
+    def record_failure(self, url: str):
+        """Lowers the score of the URL's host. Only report failures of the host, not of a single file (e.g. 404)."""
+        with self._lock:
+            host = self._get_host(url)
+            if host in self._throughputs:
+                self._throughputs[host] *= self.failure_penalty
+            else:
+                self._failures[host] = self._failures.get(host, 0) + 1
+
+    def record_transfer(self, url: str, size: int, seconds: float):
+        """Adds the throughput of a finished transfer from the URL's host."""
+        if size <= 0 or seconds <= 0:
+            return
+        throughput = size / seconds
+        with self._lock:
+            host = self._get_host(url)
+            self._failures.pop(host, None)
+            previous = self._throughputs.get(host)
+            self._throughputs[host] = throughput if previous is None else \
+                previous + self.smoothing * (throughput - previous)
+
+    def _get_score(self, host: str, fastest: Optional[float]) -> Tuple[float, int]:
+        """Returns the sort key of a host, failure counts break ties between unmeasured hosts (lock must be held)."""
+        throughput = self._throughputs.get(host)
+        if throughput is not None:
+            return throughput, 0
+        failures = self._failures.get(host, 0)
+        if failures == 0 or fastest is None:
+            return float("inf"), -failures
+        return fastest * self.failure_penalty ** failures, -failures
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        return urllib.parse.urlparse(url).netloc.lower()
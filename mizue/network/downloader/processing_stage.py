@@ -0,0 +1,26 @@
+from typing import Callable, Optional
+
+
+class ProcessingStage:
+    """
+    A step of a DownloadPipeline, e.g. decompressing, extracting or transcoding a downloaded file.
+    The function receives the path of the downloaded file (or the output of the previous stage) and returns
+    the path handed to the next stage, or None to end the pipeline for that file.
+    """
+
+    def __init__(self, name: str, function: Callable[[str], Optional[str]], workers: int = 1,
+                 use_processes: bool = False, queue_size: int = 64):
+        self.function: Callable[[str], Optional[str]] = function
+        """Processes one file. With use_processes it must be picklable, i.e. a module-level function."""
+
+        self.name: str = name
+        """Name of the stage shown in the report"""
+
+        self.queue_size: int = queue_size
+        """Number of files that may wait for this stage before the previous stage (or the downloads) is held back"""
+
+        self.use_processes: bool = use_processes
+        """Whether the function runs in a process pool instead of threads, for CPU-bound work"""
+
+        self.workers: int = workers
+        """Number of files processed concurrently by this stage"""
@@ -0,0 +1,30 @@
+from typing import Optional
+
+
+class ProgressPolicy:
+    """
+    Decides when a download fires its next PROGRESS event.
+    Events are coalesced by time and by bytes, so their number depends on the transfer time of a download
+    rather than on its size, chunk size or whether its size is known. The last event of a download is always fired.
+    """
+
+    def __init__(self, interval: Optional[float] = 0.1, byte_step: Optional[int] = None):
+        self.byte_step: Optional[int] = byte_step
+        """Bytes after which an event is due even if the interval hasn't passed yet (None to only use the interval)"""
+
+        self.interval: Optional[float] = interval
+        """Seconds after which an event is due (None to only use byte_step)"""
+
+    def is_due(self, elapsed: float, pending_bytes: int) -> bool:
+        """
+        Checks whether a progress event should be fired now.
+
+        Args:
+            elapsed: Seconds since the previous event (or since the start of the download).
+            pending_bytes: Bytes written since the previous event.
+        """
+        if pending_bytes <= 0:
+            return False
+        if self.interval is not None and elapsed >= self.interval:
+            return True
+        return self.byte_step is not None and pending_bytes >= self.byte_step
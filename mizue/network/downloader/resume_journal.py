@@ -0,0 +1,58 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+from .download_metadata import get_range_validator
+
+
+@dataclass
+class ResumeJournal:
+    """Sidecar record that lets an interrupted download continue from its .part file."""
+    url: str
+    filesize: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    committed: int = 0
+    """Bytes known to be flushed to the .part file (single stream downloads)"""
+    segments: Optional[List[List[int]]] = None
+    """[start, end, committed] for every byte range of a segmented download"""
+
+    @property
+    def validator(self) -> Optional[str]:
+        """The value to send in If-Range, see get_range_validator"""
+        return get_range_validator(self.etag, self.last_modified)
+
+    def save(self, part_path: str):
+        """Writes the journal next to the .part file, replacing the previous one atomically."""
+        journal_path = self.get_path(part_path)
+        temp_path = f"{journal_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(temp_path, journal_path)
+
+    @staticmethod
+    def delete(part_path: str):
+        """Removes the journal belonging to the given .part file."""
+        try:
+            os.remove(ResumeJournal.get_path(part_path))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def get_part_path(filepath: str) -> str:
+        """Returns the default .part file of a target file, next to it."""
+        return f"{filepath}.part"
+
+    @staticmethod
+    def get_path(part_path: str) -> str:
+        return f"{part_path}.json"
+
+    @staticmethod
+    def load(part_path: str) -> Optional["ResumeJournal"]:
+        """Loads the journal of the given .part file, or returns None if there is no usable one."""
+        try:
+            with open(ResumeJournal.get_path(part_path), "r", encoding="utf-8") as f:
+                return ResumeJournal(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
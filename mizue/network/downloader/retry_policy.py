@@ -0,0 +1,82 @@
+import email.utils
+import random
+import time
+from typing import Mapping, Optional, Set
+
+
+class RetryPolicy:
+    """Decides whether a failed request or a broken transfer is retried and how long to wait before it."""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 jitter: float = 0.5, retry_statuses: Optional[Set[int]] = None,
+                 respect_retry_after: bool = True, deadline: Optional[float] = None):
+        self.backoff_base: float = backoff_base
+        """Delay in seconds before the first retry, doubled for every following retry"""
+
+        self.backoff_max: float = backoff_max
+        """Upper limit in seconds for a single backoff delay, also applied to Retry-After"""
+
+        self.deadline: Optional[float] = deadline
+        """Seconds after the start of a download after which no more retries are made (None for no limit)"""
+
+        self.jitter: float = jitter
+        """Fraction (0 to 1) of the backoff delay that is randomized so clients don't retry in lockstep"""
+
+        self.max_retries: int = max_retries
+        """The number of times a request or a broken transfer is retried"""
+
+        self.respect_retry_after: bool = respect_retry_after
+        """Whether to wait as long as the server's Retry-After header asks for, up to backoff_max"""
+
+        self.retry_statuses: Set[int] = retry_statuses if retry_statuses is not None else {429, 500, 502, 503, 504}
+        """HTTP status codes that are treated as temporary and retried"""
+
+    def allows_retry(self, attempt: int, delay: float, deadline: Optional[float]) -> bool:
+        """
+        Checks whether another retry may be made.
+
+        Args:
+            attempt: Zero-based number of the retry that is about to be made.
+            delay: Seconds that will be waited before the retry.
+            deadline: Monotonic time after which the download must not be retried, or None.
+        """
+        if attempt >= self.max_retries:
+            return False
+        return deadline is None or time.monotonic() + delay < deadline
+
+    def get_deadline(self) -> Optional[float]:
+        """Returns the monotonic deadline for a download that starts now, or None if there is none."""
+        return time.monotonic() + self.deadline if self.deadline is not None else None
+
+    def get_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Returns the seconds to wait before the given zero-based retry attempt.
+
+        Args:
+            attempt: Zero-based number of the retry that is about to be made.
+            headers: Headers of the response that triggered the retry, checked for Retry-After.
+        """
+        if headers is not None and self.respect_retry_after:
+            retry_after = self._get_retry_after(headers)
+            if retry_after is not None:
+                # Capped like the backoff, so a header asking for hours or days doesn't park the download
+                return min(retry_after, self.backoff_max)
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return backoff - random.uniform(0, backoff * self.jitter)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+    @staticmethod
+    def _get_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+        """Parses Retry-After given either in seconds or as an HTTP date."""
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
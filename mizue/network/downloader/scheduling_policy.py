@@ -0,0 +1,17 @@
+from enum import Enum
+
+
+class SchedulingPolicy(str, Enum):
+    """Order in which a DownloadScheduler starts the queued tasks of equal priority."""
+
+    FIFO = "fifo"
+    """Tasks start in the order they were added"""
+
+    HOST_ROUND_ROBIN = "host_round_robin"
+    """Hosts take turns, and the tasks of one host start in the order they were added"""
+
+    LARGEST_FIRST = "largest_first"
+    """The largest known files start first so they don't dominate the end of a run. Unknown sizes go last."""
+
+    SHORTEST_FIRST = "shortest_first"
+    """The smallest known files start first for quick results. Unknown sizes go last."""
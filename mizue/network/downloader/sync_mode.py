@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class SyncMode(str, Enum):
+    """How a DurabilityPolicy syncs finished downloads to disk."""
+
+    BATCHED = "batched"
+    """Like PER_FILE, but the files of concurrent downloads are synced in groups and each directory once per group"""
+
+    NONE = "none"
+    """Files are renamed into place without syncing, leaving it to the operating system"""
+
+    PER_FILE = "per_file"
+    """Every file is synced before it is renamed into place, and its directory after"""
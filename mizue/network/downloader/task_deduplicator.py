@@ -0,0 +1,51 @@
+import hashlib
+from array import array
+
+
+class TaskDeduplicator:
+    """
+    Remembers which (url, output_path) pairs have been seen in a stream of tasks.
+    Pairs are stored as 64-bit fingerprints in an open-addressing table, about 16 bytes per pair
+    instead of the strings themselves, so millions of tasks can be checked without materializing them.
+    Two distinct pairs with the same fingerprint are taken for one, so the second is reported as seen.
+    For n pairs that happens with a probability of about n² / 2⁶⁵ (3 in a million for 10 million pairs);
+    callers that have the exact pairs elsewhere, like a job store, can check a rejected pair there.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._count = 0
+        self._slots = array("Q", bytes(8 * max(1 << (capacity - 1).bit_length(), 8)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, url: str, output_path: str) -> bool:
+        """Records a pair and returns whether it was new, or False for a fingerprint collision (see the class)."""
+        digest = hashlib.blake2b(f"{url}\0{output_path}".encode("utf-8"), digest_size=8).digest()
+        fingerprint = int.from_bytes(digest, "little") or 1 # 0 marks an empty slot
+        if (self._count + 1) * 2 > len(self._slots):
+            self._grow()
+        if not self._insert(self._slots, fingerprint):
+            return False
+        self._count += 1
+        return True
+
+    def _grow(self):
+        slots = array("Q", bytes(8 * len(self._slots) * 2))
+        for fingerprint in self._slots:
+            if fingerprint:
+                self._insert(slots, fingerprint)
+        self._slots = slots
+
+    @staticmethod
+    def _insert(slots: array, fingerprint: int) -> bool:
+        mask = len(slots) - 1
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == 0:
+                slots[index] = fingerprint
+                return True
+            if current == fingerprint:
+                return False
+            index = (index + 1) & mask # Linear probing
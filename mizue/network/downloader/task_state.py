@@ -0,0 +1,17 @@
+from enum import Enum
+
+
+class TaskState(str, Enum):
+    """State of a bulk download task in a DownloadJobStore."""
+
+    DONE = "done"
+    """The file has been downloaded or already existed"""
+
+    FAILED = "failed"
+    """The last attempt failed"""
+
+    IN_FLIGHT = "in_flight"
+    """A worker is downloading the file. Left over after a crash until the job is resumed."""
+
+    PENDING = "pending"
+    """The task hasn't been started yet"""
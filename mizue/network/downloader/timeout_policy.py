@@ -0,0 +1,35 @@
+import time
+from typing import Optional, Tuple
+
+
+class TimeoutPolicy:
+    """Limits how long a download waits for the server, how long it may take and how slow it may get."""
+
+    def __init__(self, connect: Optional[float] = None, read: Optional[float] = None, total: Optional[float] = None,
+                 min_throughput: Optional[float] = None, throughput_window: float = 10.0):
+        self.connect: Optional[float] = connect
+        """Seconds to wait for a connection to be established (None uses Downloader.timeout)"""
+
+        self.min_throughput: Optional[float] = min_throughput
+        """
+        Bytes per second a download must average over throughput_window, slower ones are aborted as stalled
+        and can be continued later from their .part file (None for no limit). Keep it below any bandwidth limit.
+        """
+
+        self.read: Optional[float] = read
+        """Seconds to wait for the response headers and between two reads of the body (None uses Downloader.timeout)"""
+
+        self.throughput_window: float = throughput_window
+        """Seconds of transfer the throughput is averaged over, also the grace period of a new response"""
+
+        self.total: Optional[float] = total
+        """Seconds a download may take including its retries, after which it is aborted (None for no limit)"""
+
+    def get_deadline(self) -> Optional[float]:
+        """Returns the monotonic time at which a download that starts now is aborted, or None if there is none."""
+        return time.monotonic() + self.total if self.total is not None else None
+
+    def get_request_timeout(self, default: float) -> Tuple[float, float]:
+        """Returns the (connect, read) timeout passed to requests."""
+        return (self.connect if self.connect is not None else default,
+                self.read if self.read is not None else default)
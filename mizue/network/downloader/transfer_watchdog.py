@@ -0,0 +1,148 @@
+import collections
+import socket
+import threading
+import time
+from typing import Deque, List, Optional, Set, Tuple
+
+import requests
+
+
+class TransferTimeoutError(Exception):
+    """Reported through the FAILED event when a download ran past its total timeout or fell below its minimum throughput."""
+
+    def __init__(self, message: str, stalled: bool):
+        super().__init__(message)
+        self.stalled: bool = stalled
+        """Whether the transfer was too slow rather than too long, so trying it again later may succeed"""
+
+
+class WatchedTransfer:
+    """Bytes received and open responses of one download, checked by a TransferWatchdog and aborted on cancellation."""
+
+    def __init__(self, deadline: Optional[float], min_throughput: Optional[float], window: float):
+        self._aborted = threading.Event()
+        self._lock = threading.Lock()
+        self._responses: Set[requests.Response] = set()
+        self._samples: Deque[Tuple[float, int]] = collections.deque()
+        self.deadline: Optional[float] = deadline
+        self.error: Optional[Exception] = None
+        self.min_throughput: Optional[float] = min_throughput
+        self.received: int = 0 # Updated without a lock by segment threads, it only has to be roughly right
+        self.window: float = window
+
+    @property
+    def is_limited(self) -> bool:
+        """Whether the watchdog has to poll the transfer"""
+        return self.deadline is not None or bool(self.min_throughput)
+
+    def abort(self, error: Exception):
+        """Makes the download raise error, shutting its connections down so blocked reads return at once."""
+        with self._lock:
+            if self.error is not None:
+                return
+            self.error = error
+            self._aborted.set()
+            for response in self._responses:
+                self._shutdown(response)
+
+    def add_response(self, response: requests.Response):
+        """Registers a response whose body is being read, so an abort can wake up a read blocked on it."""
+        with self._lock:
+            self._responses.add(response)
+            if self.error is not None:
+                self._shutdown(response)
+
+    def check(self):
+        """Raises the error of an aborted transfer."""
+        if self.error is not None:
+            raise self.error
+
+    def poll(self, now: float):
+        """Aborts the transfer if it is past its deadline or has been too slow over the last window."""
+        if self.error is not None:
+            return
+        if self.deadline is not None and now >= self.deadline:
+            self.abort(TransferTimeoutError("Total timeout exceeded", stalled=False))
+            return
+        if not self.min_throughput or not self._responses and not self._samples:
+            return # The throughput window starts with the first response body
+        samples = self._samples
+        samples.append((now, self.received))
+        while len(samples) > 1 and samples[1][0] <= now - self.window:
+            samples.popleft() # The oldest sample left is the last one at or before the window start
+        start_time, start_received = samples[0]
+        if now - start_time < self.window:
+            return
+        throughput = (self.received - start_received) / (now - start_time)
+        if throughput < self.min_throughput:
+            self.abort(TransferTimeoutError(
+                f"Stalled at {throughput:.0f} B/s, below the minimum of {self.min_throughput:.0f} B/s", stalled=True))
+
+    def remove_response(self, response: requests.Response):
+        with self._lock:
+            self._responses.discard(response)
+
+    def wait(self, seconds: float):
+        """Sleeps like time.sleep, but raises the error as soon as the transfer is aborted."""
+        self._aborted.wait(seconds)
+        self.check()
+
+    @staticmethod
+    def _shutdown(response: requests.Response):
+        """Shuts the socket of a response down, which makes a read blocked on it in another thread return."""
+        sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass # Already closed
+
+
+class TransferWatchdog:
+    """
+    Keeps track of the running transfers of a downloader, so they can be aborted all at once. Those with a deadline
+    or a minimum throughput are checked from one background thread, which only runs while there are any.
+    A read blocked on a server that drips a byte every few seconds never times out and can't check a deadline
+    itself, so the watchdog aborts such transfers by shutting their sockets down.
+    """
+
+    def __init__(self, poll_interval: float = 0.5):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._transfers: List[WatchedTransfer] = []
+
+        self.poll_interval: float = poll_interval
+        """Seconds between two checks of the transfers"""
+
+    def abort_all(self, error: Exception):
+        with self._lock:
+            transfers = list(self._transfers)
+        for transfer in transfers:
+            transfer.abort(error)
+
+    def unwatch(self, transfer: WatchedTransfer):
+        with self._lock:
+            self._transfers.remove(transfer)
+
+    def watch(self, deadline: Optional[float], min_throughput: Optional[float], window: float) -> WatchedTransfer:
+        """Starts watching a download that is aborted at deadline or when it falls below min_throughput."""
+        transfer = WatchedTransfer(deadline, min_throughput, window)
+        with self._lock:
+            self._transfers.append(transfer)
+            if transfer.is_limited and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mizue-transfer-watchdog", daemon=True)
+                self._thread.start()
+        return transfer
+
+    def _run(self):
+        while True:
+            with self._lock:
+                transfers = [transfer for transfer in self._transfers if transfer.is_limited]
+                if not transfers:
+                    self._thread = None
+                    return
+            now = time.monotonic()
+            for transfer in transfers:
+                transfer.poll(now)
+            time.sleep(self.poll_interval)
@@ -0,0 +1,116 @@
+import collections
+import threading
+from typing import BinaryIO, Deque, Optional, Union
+
+from .memory_budget import MemoryBudget
+
+
+class WriteBehindWriter:
+    """
+    Writes to a file on a background thread, so a slow disk doesn't stall the thread that reads the socket.
+    The bytes waiting to be written are capped per writer by max_buffer and across writers by a shared budget.
+    Errors of the writer thread are raised by the next call to write, flush or close.
+    """
+
+    FLUSH_SIZE: int = 1024 * 1024
+    """Bytes written between two flushes of the file while the queue is not empty"""
+
+    def __init__(self, file: BinaryIO, max_buffer: int = 1024 * 1024 * 8, budget: Optional[MemoryBudget] = None):
+        self._budget = MemoryBudget(max_buffer)
+        self._closed = False
+        self._condition = threading.Condition()
+        self._error: Optional[BaseException] = None
+        self._error_raised = False
+        self._file = file
+        self._global_budget = budget
+        self._position = file.tell()
+        self._queue: Deque[bytes] = collections.deque()
+        self._writing = False
+        self.committed: int = self._position
+        """File position up to which all bytes have been flushed to the operating system"""
+
+        self._thread = threading.Thread(target=self._run, name="mizue-write-behind", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Writes the remaining bytes, stops the writer thread and closes the file."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._file.close()
+        self._raise_error()
+
+    def flush(self):
+        """Blocks until every queued byte has been written and flushed."""
+        with self._condition:
+            while self._queue or self._writing:
+                self._condition.wait()
+        self._raise_error()
+
+    def seek(self, offset: int) -> int:
+        self.flush()
+        self._position = self.committed = self._file.seek(offset)
+        return self._position
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        self.flush()
+        return self._file.truncate(size)
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> int:
+        """Queues a copy of the data, blocking while the per-writer or the global buffer limit is reached."""
+        self._raise_error()
+        size = len(data)
+        self._budget.acquire(size)
+        if self._global_budget is not None:
+            self._global_budget.acquire(size)
+        # The caller may reuse its buffer as soon as this returns, so the bytes are copied
+        with self._condition:
+            self._queue.append(bytes(data))
+            self._condition.notify_all()
+        return size
+
+    def _raise_error(self):
+        if self._error is not None and not self._error_raised:
+            self._error_raised = True
+            raise self._error
+
+    def _release(self, size: int):
+        self._budget.release(size)
+        if self._global_budget is not None:
+            self._global_budget.release(size)
+
+    def _run(self):
+        unflushed = 0
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    break
+                data = self._queue.popleft()
+                self._writing = True
+                drained = not self._queue
+            try:
+                if self._error is None:
+                    self._file.write(data)
+                    self._position += len(data)
+                    unflushed += len(data)
+                    if drained or unflushed >= self.FLUSH_SIZE:
+                        self._file.flush()
+                        self.committed = self._position
+                        unflushed = 0
+            except BaseException as e:
+                # Later bytes are dropped, but still released so blocked writers can see the error
+                self._error = e
+            finally:
+                self._release(len(data))
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+        if self._error is None and unflushed:
+            try:
+                self._file.flush()
+                self.committed = self._position
+            except BaseException as e:
+                self._error = e
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mizue.network.downloader import AsyncDownloader, DownloadEventType, RetryPolicy
+
+BODY = bytes(i % 251 for i in range(200_000))
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves BODY with range support and records how many requests are in flight at the same time."""
+
+    protocol_version = "HTTP/1.1"
+    broken_paths = set()
+    """Paths whose next response is cut after 50 KB"""
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    range_starts = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            self._send_body()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _send_body(self):
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+            self.range_starts.append(start)
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(len(BODY) - start))
+        self.send_header("ETag", '"v1"')
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.end_headers()
+        time.sleep(0.05) # Keeps the transfers overlapping so the concurrency limit is reached
+        if self.path in self.broken_paths:
+            self.broken_paths.discard(self.path)
+            self.wfile.write(BODY[:50_000])
+            self.close_connection = True
+            return
+        self.wfile.write(BODY[start:])
+
+
+class AsyncDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        _RangeHandler.broken_paths = set()
+        _RangeHandler.in_flight = 0
+        _RangeHandler.max_in_flight = 0
+        _RangeHandler.range_starts = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.output = tempfile.TemporaryDirectory()
+        self.events = []
+        self.downloader = AsyncDownloader()
+        self.downloader.retry_policy = RetryPolicy(max_retries=0)
+        for event_type in (DownloadEventType.STARTED, DownloadEventType.COMPLETED, DownloadEventType.FAILED):
+            self.downloader.add_event(event_type, lambda event, t=event_type: self.events.append((t, event)))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.output.cleanup()
+
+    def _url(self, filename: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/{filename}"
+
+    def _read(self, filename: str) -> bytes:
+        with open(os.path.join(self.output.name, filename), "rb") as f:
+            return f.read()
+
+    def test_download(self):
+        asyncio.run(self.downloader.download(self._url("single.bin"), self.output.name))
+
+        self.assertEqual([DownloadEventType.STARTED, DownloadEventType.COMPLETED], [t for t, _ in self.events])
+        self.assertEqual(len(BODY), self.events[1][1].filesize)
+        self.assertEqual(BODY, self._read("single.bin"))
+        self.assertEqual(["single.bin"], os.listdir(self.output.name))
+
+    def test_download_bulk_keeps_the_concurrency_limit(self):
+        self.downloader.max_concurrency = 3
+        filenames = [f"file-{i}.bin" for i in range(12)]
+
+        asyncio.run(self.downloader.download_bulk([self._url(name) for name in filenames], self.output.name))
+
+        completed = sorted(event.filename for t, event in self.events if t == DownloadEventType.COMPLETED)
+        self.assertEqual(sorted(filenames), completed)
+        self.assertEqual(12, sum(1 for t, _ in self.events if t == DownloadEventType.STARTED))
+        self.assertLessEqual(_RangeHandler.max_in_flight, 3)
+        self.assertGreater(_RangeHandler.max_in_flight, 1)
+        for name in filenames:
+            self.assertEqual(BODY, self._read(name))
+        self.assertEqual(sorted(filenames), sorted(os.listdir(self.output.name)))
+
+    def test_failed_download_continues_from_the_part_file(self):
+        _RangeHandler.broken_paths = {"/resumed.bin"}
+
+        asyncio.run(self.downloader.download(self._url("resumed.bin"), self.output.name))
+        self.assertEqual(DownloadEventType.FAILED, self.events[-1][0])
+        self.assertTrue(os.path.exists(os.path.join(self.output.name, "resumed.bin.part")))
+
+        asyncio.run(self.downloader.download(self._url("resumed.bin"), self.output.name))
+        self.assertEqual(DownloadEventType.COMPLETED, self.events[-1][0])
+        self.assertEqual([50_000], _RangeHandler.range_starts)
+        self.assertEqual(BODY, self._read("resumed.bin"))
+        self.assertEqual(["resumed.bin"], os.listdir(self.output.name))
+
+
+if __name__ == "__main__":
+    unittest.main()
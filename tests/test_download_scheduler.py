@@ -0,0 +1,48 @@
+import unittest
+
+from mizue.network.downloader import DownloadScheduler, DownloadTask, SchedulingPolicy
+
+
+def _drain(scheduler: DownloadScheduler) -> list:
+    scheduler.close()
+    order = []
+    while True:
+        task = scheduler.get()
+        if task is None:
+            return order
+        order.append(task.url.split("//", 1)[1])
+        scheduler.task_done(task)
+
+
+class DownloadSchedulerTest(unittest.TestCase):
+    def _create_tasks(self, scheduler: DownloadScheduler) -> dict:
+        tasks = {}
+        for name in ("a/1", "a/2", "b/1", "b/2"):
+            tasks[name] = DownloadTask(url=f"http://{name}", output_path=".")
+        for name in ("a/1", "b/1", "a/2", "b/2"):
+            scheduler.add(tasks[name])
+        return tasks
+
+    def test_round_robin_alternates_hosts(self):
+        scheduler = DownloadScheduler()
+        self._create_tasks(scheduler)
+        self.assertEqual(["a/1", "b/1", "a/2", "b/2"], _drain(scheduler))
+
+    def test_priority_applies_across_hosts(self):
+        for policy in SchedulingPolicy:
+            with self.subTest(policy=policy):
+                scheduler = DownloadScheduler(policy=policy)
+                tasks = self._create_tasks(scheduler)
+                scheduler.set_priority(tasks["b/1"], 10)
+                self.assertEqual("b/1", _drain(scheduler)[0])
+
+    def test_round_robin_rotates_among_equal_priorities(self):
+        scheduler = DownloadScheduler()
+        tasks = self._create_tasks(scheduler)
+        scheduler.set_priority(tasks["a/2"], 5)
+        scheduler.set_priority(tasks["b/2"], 5)
+        self.assertEqual(["a/2", "b/2", "a/1", "b/1"], _drain(scheduler))
+
+
+if __name__ == "__main__":
+    unittest.main()
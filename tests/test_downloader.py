@@ -0,0 +1,163 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import requests
+
+from mizue.network.downloader import (CancellationToken, ConnectionPool, DownloadCancelledError, Downloader,
+                                      DownloadEventType, RetryPolicy, TimeoutPolicy, TransferTimeoutError)
+
+BODY = bytes(i % 251 for i in range(200_000))
+
+
+class _BrokenStreamHandler(BaseHTTPRequestHandler):
+    """Serves BODY with range support, cutting the connection after 50 KB on the first request of each path."""
+
+    protocol_version = "HTTP/1.1"
+    requests_per_path = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        count = self.requests_per_path[self.path] = self.requests_per_path.get(self.path, 0) + 1
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(len(BODY) - start))
+        self.send_header("ETag", '"v1"')
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.end_headers()
+        if count == 1:
+            self.wfile.write(BODY[:50_000])
+            self.close_connection = True
+            return
+        self.wfile.write(BODY[start:])
+
+
+class _UnavailableHandler(BaseHTTPRequestHandler):
+    """Answers /unavailable/... with 503 and holds /silent/... requests without ever sending headers."""
+
+    protocol_version = "HTTP/1.1"
+    release = threading.Event()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/silent/"):
+            self.release.wait(30)
+            self.close_connection = True
+            return
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        _BrokenStreamHandler.requests_per_path = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _BrokenStreamHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.output = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.output.cleanup()
+
+    def test_broken_stream_is_retried_while_the_pool_is_full(self):
+        # The broken response holds the only connection of the host, the retry needs it back
+        for reuse_read_buffer in (True, False):
+            with self.subTest(reuse_read_buffer=reuse_read_buffer):
+                downloader = Downloader()
+                downloader.connection_pool = ConnectionPool(pool_size_per_host=1, pool_timeout=5.0)
+                downloader.retry_policy = RetryPolicy(backoff_base=0.01)
+                downloader.reuse_read_buffer = reuse_read_buffer
+                results = []
+                downloader.add_event(DownloadEventType.COMPLETED, lambda event: results.append("completed"))
+                downloader.add_event(DownloadEventType.FAILED, lambda event: results.append(event.reason))
+                filename = f"file-{reuse_read_buffer}.bin"
+                url = f"http://127.0.0.1:{self.server.server_port}/{filename}"
+
+                thread = threading.Thread(target=downloader.download, args=(url, self.output.name), daemon=True)
+                thread.start()
+                thread.join(10)
+
+                self.assertFalse(thread.is_alive(), "download hung waiting for a pooled connection")
+                self.assertEqual(["completed"], results)
+                with open(os.path.join(self.output.name, filename), "rb") as f:
+                    self.assertEqual(BODY, f.read())
+
+
+
+class MirrorAbortTest(unittest.TestCase):
+    """Mirrored downloads are requested from race threads, which must still stop when the transfer is aborted."""
+
+    def setUp(self):
+        _UnavailableHandler.release = threading.Event()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.output = tempfile.TemporaryDirectory()
+        self.downloader = Downloader()
+        # Retrying the last mirror would take 2 + 4 + 8 seconds
+        self.downloader.retry_policy = RetryPolicy(max_retries=3, backoff_base=2, jitter=0)
+        self.failures = []
+        self.downloader.add_event(DownloadEventType.FAILED, self.failures.append)
+
+    def tearDown(self):
+        _UnavailableHandler.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.output.cleanup()
+
+    def _download(self, kind: str, cancel_after: Optional[float] = None) -> float:
+        """Downloads from two mirrors of the given kind and returns how long it took."""
+        base = f"http://127.0.0.1:{self.server.server_port}/{kind}"
+        token = CancellationToken()
+        thread = threading.Thread(target=self.downloader.download, daemon=True,
+                                  args=(f"{base}/a.bin", self.output.name, None, [f"{base}/b.bin"], token))
+        start = time.monotonic()
+        thread.start()
+        if cancel_after is not None:
+            time.sleep(cancel_after)
+            token.cancel()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), "mirrored download wasn't aborted")
+        return time.monotonic() - start
+
+    def test_cancel_stops_a_mirror_race(self):
+        for kind in ("unavailable", "silent"): # Waiting in a backoff, and for response headers
+            with self.subTest(kind=kind):
+                self.failures.clear()
+                elapsed = self._download(kind, cancel_after=0.5)
+
+                self.assertLess(elapsed, 2)
+                self.assertEqual(1, len(self.failures))
+                self.assertIsInstance(self.failures[0].exception, DownloadCancelledError)
+
+    def test_total_timeout_stops_a_mirror_race(self):
+        self.downloader.timeout = 30
+        self.downloader.timeout_policy = TimeoutPolicy(total=1.0)
+        # A backoff past the deadline isn't started, the last 503 is reported instead
+        for kind, error in (("unavailable", requests.exceptions.HTTPError), ("silent", TransferTimeoutError)):
+            with self.subTest(kind=kind):
+                self.failures.clear()
+                elapsed = self._download(kind)
+
+                self.assertLess(elapsed, 3)
+                self.assertEqual(1, len(self.failures))
+                self.assertIsInstance(self.failures[0].exception, error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from mizue.network.downloader import DurabilityPolicy, SyncMode
+
+
+class DurabilityPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+        self.calls = []
+        self.policy = DurabilityPolicy(SyncMode.BATCHED, batch_size=8, batch_interval=0.2)
+        sync_file, sync_directory = DurabilityPolicy._sync_file, DurabilityPolicy._sync_directory
+        replace = self.policy._replace
+        patches = [
+            mock.patch.object(DurabilityPolicy, "_sync_file",
+                              side_effect=lambda path: (self.calls.append(("sync", path)), sync_file(path))),
+            mock.patch.object(DurabilityPolicy, "_sync_directory",
+                              side_effect=lambda path: (self.calls.append(("sync_dir", path)), sync_directory(path))),
+            mock.patch.object(self.policy, "_replace",
+                              side_effect=lambda staged, final, sync: (self.calls.append(("replace", staged)),
+                                                                       replace(staged, final, sync))),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.output.cleanup()
+
+    def _stage(self, name: str) -> str:
+        path = os.path.join(self.output.name, f"{name}.part")
+        with open(path, "wb") as f:
+            f.write(name.encode())
+        return path
+
+    def test_batched_commit_syncs_before_renaming(self):
+        staged = [self._stage(f"file-{i}") for i in range(4)]
+        threads = [threading.Thread(target=self.policy.commit, args=(path, path[:-len(".part")])) for path in staged]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        # One batch: every staged file is synced, then renamed, then the directory is synced once
+        self.assertEqual(["sync"] * 4 + ["replace"] * 4 + ["sync_dir"], [call for call, _ in self.calls])
+        self.assertEqual(sorted(staged), sorted(path for call, path in self.calls if call == "sync"))
+        self.assertEqual(sorted(f"file-{i}" for i in range(4)), sorted(os.listdir(self.output.name)))
+        self.assertEqual(0, self.policy.pending_count)
+
+    def test_batched_commit_reports_errors_to_the_committer(self):
+        missing = os.path.join(self.output.name, "missing.part")
+        with self.assertRaises(FileNotFoundError):
+            self.policy.commit(missing, os.path.join(self.output.name, "missing"))
+        self.assertNotIn("replace", [call for call, _ in self.calls])
+
+
+if __name__ == "__main__":
+    unittest.main()